@@ -1,6 +1,33 @@
-import sys, pathlib
+#!/usr/bin/env python3
+"""
+Replace typographic punctuation (smart quotes, dashes, ellipsis, odd spaces)
+with ASCII equivalents across the repo's text trees.
 
-FILES = list(pathlib.Path("docs/_archive").rglob("*.md"))
+Usage:
+  python3 scripts/normalize_ascii.py                 # default globs, rewrite
+  python3 scripts/normalize_ascii.py --check         # exit 1 if anything would change
+  python3 scripts/normalize_ascii.py 'docs/_archive/**/*.md'
+
+Pure-ASCII files are skipped from raw bytes without decoding; the rest go
+through one precompiled str.translate table. Files are processed in a thread
+pool; output order is stable (sorted paths). Non-UTF-8 files are reported and
+left untouched.
+
+*.jsonl files are normalized line by line with JSON_TABLE, which turns smart
+double quotes into \" (they can only be string text in valid JSON). A line
+is rewritten only if the result still parses; anything else, including lines
+that did not parse to begin with, is left as it was.
+"""
+import argparse, glob, json, os, sys, pathlib
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+
+DEFAULT_GLOBS = [
+    "content/**/*.md", "content/**/*.jsonl",
+    "prompts/**/*.txt", "prompts/**/*.md",
+    "docs/**/*.md",
+]
 
 MAP = {
     "\u2018": "'", "\u2019": "'", "\u201A": "'", "\u201B": "'",
@@ -12,17 +39,78 @@ MAP = {
     "\u00A0": " ",   # no-break space
     "\u2009": " ", "\u200A": " ", "\u200B": "",  # thin/hair/zero-width
 }
+TABLE = str.maketrans(MAP)
+JSON_TABLE = str.maketrans({**MAP, "\u201C": '\\"', "\u201D": '\\"', "\u201E": '\\"'})
+BOM = "\ufeff"
 
 def normalize_text(s: str) -> str:
-    return "".join(MAP.get(ch, ch) for ch in s)
-
-changed = False
-for p in FILES:
-    text = p.read_text(encoding="utf-8", errors="ignore")
-    new  = normalize_text(text)
-    if new != text:
-        p.write_text(new, encoding="utf-8")
-        print(f"normalized: {p}")
-        changed = True
-
-sys.exit(0)
+    return s.translate(TABLE)
+
+def _parses(line: str) -> bool:
+    try:
+        json.loads(line)
+        return True
+    except ValueError:
+        return False
+
+def normalize_jsonl(s: str) -> str:
+    out = []
+    for line in s.split("\n"):
+        new = line.translate(JSON_TABLE)
+        # only a line that parsed before and still parses afterwards is rewritten
+        if new != line and not (_parses(line.removeprefix(BOM)) and _parses(new.removeprefix(BOM))):
+            new = line
+        out.append(new)
+    return "\n".join(out)
+
+def expand(patterns):
+    seen = set()
+    for pat in patterns:
+        for rel in glob.glob(pat, root_dir=REPO_ROOT, recursive=True):
+            p = REPO_ROOT / rel
+            if p not in seen and p.is_file():
+                seen.add(p)
+    return sorted(seen)
+
+def process(p: pathlib.Path, write: bool):
+    """Return 'changed', 'skip' (not UTF-8) or None (nothing to do)."""
+    data = p.read_bytes()
+    if data.isascii():
+        return None
+    try:
+        text = data.decode("utf-8")
+    except UnicodeDecodeError:
+        return "skip"
+    new = normalize_jsonl(text) if p.suffix == ".jsonl" else normalize_text(text)
+    if new == text:
+        return None
+    if write:
+        p.write_bytes(new.encode("utf-8"))
+    return "changed"
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="normalize_ascii", description=__doc__.strip().splitlines()[0])
+    ap.add_argument("globs", nargs="*", help="repo-relative globs (default: content, prompts, docs)")
+    ap.add_argument("--check", action="store_true", help="do not write; exit 1 if any file would change")
+    ap.add_argument("--jobs", "-j", type=int, default=None, metavar="N", help="worker threads")
+    args = ap.parse_args(argv)
+
+    files = expand(args.globs or DEFAULT_GLOBS)
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        results = list(pool.map(lambda p: process(p, not args.check), files))
+
+    changed = 0
+    for p, res in zip(files, results):
+        rel = os.path.relpath(p, REPO_ROOT)
+        if res == "changed":
+            changed += 1
+            print(f"{'would normalize' if args.check else 'normalized'}: {rel}")
+        elif res == "skip":
+            print(f"skipped (not UTF-8): {rel}", file=sys.stderr)
+    if args.check and changed:
+        print(f"{changed} file(s) need ASCII normalization", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# Shared single-pass parser/model for prompts/dispatcher/_ALL.txt.
+#
+# Used by fix_dispatcher_format.py and sync_dispatcher_allowlists.py.
+#
+# Grammar (one pass over lines after one linear regex scan for block starts):
+# - A block opens at a _BLOCK_START match, i.e. "module_id: <id>" with a valid
+#   id ([a-z0-9_]+, nothing else on the line); the id is the rest, stripped.
+#   (As in the old formatter regex, "module_id:" with an empty id opens a block
+#   too when the next non-blank line is a bare token; that block's id is "".)
+#   Lines before the first block are kept as the preamble.
+# - Inside a block, any other "module_id:" line replaces the block's id, as the
+#   old formatter did; elsewhere such lines are plain preamble text.
+# - Inside a block, tabs -> 4 spaces and trailing spaces are ignored; blank lines are skipped.
+# - "short_scope: <text>" sets the scope.
+# - A line equal to (after strip) or starting with a list header switches to that list:
+#     spotkind_allowlist:   target_tokens_allowlist:
+# - Other non-blank lines are items of the current list (stripped, trailing ':'
+#   removed, consecutive duplicates dropped); stray lines before any header are ignored.
+#
+# Dispatcher.get(module_id) is a dict lookup; a repeated module_id keeps the last block.
+# block_spans()/splice() locate and rewrite single blocks without parsing the rest.
+
+from __future__ import annotations
+import re
+from typing import Dict, List, Optional, Tuple
+
+SPOT_HDR = "spotkind_allowlist:"
+TGT_HDR = "target_tokens_allowlist:"
+SPOT_DEFAULT = "l2_core_rules_check"
+TGT_DEFAULT = "none"
+SHORT_DEFAULT = "TODO"
+
+_BLOCK_START = re.compile(r"^module_id:\s*([a-z0-9_]+)\s*$", re.M)
+
+
+class Block:
+    __slots__ = ("module_id", "short", "spot", "tgt", "_parts", "_start", "_end", "_final_nl")
+
+    def __init__(self, module_id: str, parts: List[str], start: int):
+        self.module_id = module_id
+        self.short: Optional[str] = None
+        self.spot: List[str] = []
+        self.tgt: List[str] = []
+        self._parts = parts
+        self._start = start
+        self._end = start + 1
+        self._final_nl = True
+
+    @property
+    def text(self) -> str:
+        """Source text of the block (LF newlines), as in the file."""
+        body = "\n".join(self._parts[self._start:self._end])
+        return body + "\n" if self._final_nl else body
+
+
+class Dispatcher:
+    def __init__(self) -> None:
+        self.preamble: List[str] = []
+        self.blocks: List[Block] = []
+        self.by_id: Dict[str, Block] = {}
+
+    def get(self, module_id: str) -> Optional[Block]:
+        return self.by_id.get(module_id)
+
+    def __contains__(self, module_id: str) -> bool:
+        return module_id in self.by_id
+
+    def __len__(self) -> int:
+        return len(self.blocks)
+
+
+def normalize_lf(s: str) -> str:
+    return s.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def parse(text: str) -> Dispatcher:
+    d = Dispatcher()
+    text = normalize_lf(text)
+    starts = {m.start() for m in _BLOCK_START.finditer(text)}
+    parts = text.split("\n")
+    final_nl = parts[-1] == ""
+    if final_nl:
+        parts.pop()
+    cur: Optional[Block] = None
+    state: Optional[List[str]] = None
+    pos = 0
+    for i, raw in enumerate(parts):
+        at, pos = pos, pos + len(raw) + 1
+        if at in starts:
+            if cur is not None:
+                cur._end = i
+                d.by_id[cur.module_id] = cur
+            cur = Block(raw[10:].strip(), parts, i)
+            d.blocks.append(cur)
+            state = None
+            continue
+        if cur is None:
+            d.preamble.append(raw)
+            continue
+        if "\t" in raw:
+            raw = raw.replace("\t", "    ")
+        s = raw.strip()
+        if not s:
+            continue
+        if raw.startswith("module_id:"):
+            cur.module_id = raw[10:].strip()
+            state = None
+        elif raw.startswith("short_scope:"):
+            cur.short = raw[12:].strip()
+            state = None
+        elif s == SPOT_HDR or raw.startswith(SPOT_HDR):
+            state = cur.spot
+        elif s == TGT_HDR or raw.startswith(TGT_HDR):
+            state = cur.tgt
+        elif state is not None:
+            item = s.rstrip(":")
+            if item and (not state or state[-1] != item):
+                state.append(item)
+    if cur is not None:
+        cur._end = len(parts)
+        cur._final_nl = final_nl
+        d.by_id[cur.module_id] = cur
+    return d
+
+
+def render_block(module_id: str, short: str, spot: List[str], tgt: List[str],
+                 blank_after_lists: bool = False) -> List[str]:
+    lines = [f"module_id: {module_id}\n", f"short_scope: {short}\n", SPOT_HDR + "\n"]
+    lines.extend(f"  {it}\n" for it in spot)
+    if blank_after_lists:
+        lines.append("\n")
+    lines.append(TGT_HDR + "\n")
+    lines.extend(f"  {it}\n" for it in tgt)
+    if blank_after_lists:
+        lines.append("\n")
+    return lines
+
+
+def block_spans(text: str) -> Dict[str, Tuple[int, int]]:
+    """module_id -> (start, end) offsets of its block in LF text (last block wins)."""
+    starts = [m.start() for m in _BLOCK_START.finditer(text)]
+    spans: Dict[str, Tuple[int, int]] = {}
+    for i, start in enumerate(starts):
+        eol = text.find("\n", start)
+        mid = text[start + 10:eol if eol >= 0 else len(text)].strip()
+        spans[mid] = (start, starts[i + 1] if i + 1 < len(starts) else len(text))
+    return spans
+
+
+def splice(text: str, spans: Dict[str, Tuple[int, int]], blocks: Dict[str, List[str]]) -> str:
+    """LF text with the blocks of the given module ids replaced by rendered lines."""
+    out: List[str] = []
+    pos = 0
+    for start, end, mid in sorted((spans[mid] + (mid,) for mid in blocks)):
+        out.append(text[pos:start])
+        out.extend(blocks[mid])
+        pos = end
+    out.append(text[pos:])
+    return "".join(out)
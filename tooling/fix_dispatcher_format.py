@@ -14,111 +14,44 @@
 # - target_tokens_allowlist: if empty, must be exactly 'none' (no blank line after).
 # - If a block has 0 items -> insert the default item (spot: l2_core_rules_check, tokens: none).
 # - Idempotent. Atomic replace. One .bak per run.
+# - Parsing is shared with sync_dispatcher_allowlists.py (dispatcher_model.py).
 
 from __future__ import annotations
 import argparse, os, sys, tempfile
-import re
 from itertools import zip_longest
 
-SPOT_HDR = "spotkind_allowlist:"
-TGT_HDR  = "target_tokens_allowlist:"
-SPOT_DEFAULT = "l2_core_rules_check"
-TGT_DEFAULT  = "none"
+from dispatcher_model import (SHORT_DEFAULT, SPOT_DEFAULT, TGT_DEFAULT,
+                              normalize_lf, parse, render_block)
+
+def _strip_trailing_spaces(s: str) -> str:
+    return "\n".join(ln.rstrip().replace("\t", "    ") for ln in s.splitlines()) + ("\n" if s.endswith("\n") else "")
 
 def _normalize(lines: list[str]):
-    # Join to text for easier block splitting and capture original blocks for change tracking
     raw_text = "".join(s if s.endswith("\n") else s + "\n" for s in lines)
-    raw_text = raw_text.replace("\r\n", "\n").replace("\r", "\n")
+    raw_text = normalize_lf(raw_text)
 
-    # Split into blocks by module_id line
-    mod_re = re.compile(r"^module_id:\s*([a-z0-9_]+)\s*$", re.M)
-    matches = list(mod_re.finditer(raw_text))
-    if not matches:
+    disp = parse(raw_text)
+    if not disp.blocks:
         # nothing to do
         return raw_text, [], 0
 
     out_lines: list[str] = []
     modules_changed: list[str] = []
-
-    def strip_trailing_spaces(s: str) -> str:
-        return "\n".join(ln.rstrip().replace("\t", "    ") for ln in s.splitlines()) + ("\n" if s.endswith("\n") else "")
-
-    def parse_block(block_text: str) -> dict:
-        # Normalize tabs/spaces and strip trailing spaces for parsing
-        norm = block_text.replace("\t", "    ")
-        lines = [ln.rstrip("\n\r ") for ln in norm.splitlines()]
-        mid = None
-        short = None
-        spot: list[str] = []
-        tgt: list[str] = []
-        state = None  # 'spot' | 'tgt' | None
-        for ln in lines:
-            if not ln:
-                # No blank lines inside blocks: skip
-                continue
-            if ln.startswith("module_id:"):
-                mid = ln.split(":", 1)[1].strip()
-                state = None
-                continue
-            if ln.startswith("short_scope:"):
-                short = ln.split(":", 1)[1].strip()
-                state = None
-                continue
-            if ln.strip() == SPOT_HDR or ln.startswith(SPOT_HDR):
-                state = 'spot'
-                continue
-            if ln.strip() == TGT_HDR or ln.startswith(TGT_HDR):
-                state = 'tgt'
-                continue
-            # items inside current list
-            if state == 'spot':
-                item = ln.strip().rstrip(":")
-                if item and (not spot or spot[-1] != item):
-                    spot.append(item)
-            elif state == 'tgt':
-                item = ln.strip().rstrip(":")
-                if item and (not tgt or tgt[-1] != item):
-                    tgt.append(item)
-            else:
-                # ignore stray lines
-                pass
-        if not short:
-            short = "TODO"
-        if not spot:
-            spot = [SPOT_DEFAULT]
-        if not tgt:
-            tgt = [TGT_DEFAULT]
-        return {"module_id": mid or "", "short": short, "spot": spot, "tgt": tgt}
-
-    def render_block(data: dict) -> list[str]:
-        lines: list[str] = []
-        lines.append(f"module_id: {data['module_id']}\n")
-        lines.append(f"short_scope: {data['short']}\n")
-        lines.append(SPOT_HDR + "\n")
-        for it in data['spot']:
-            lines.append(f"  {it}\n")
-        lines.append(TGT_HDR + "\n")
-        for it in data['tgt']:
-            lines.append(f"  {it}\n")
-        return lines
-
-    # Iterate blocks
-    for idx, m in enumerate(matches):
-        start = m.start()
-        end = matches[idx + 1].start() if idx + 1 < len(matches) else len(raw_text)
-        block_text = raw_text[start:end]
-        original_block_norm = strip_trailing_spaces(block_text)
-        data = parse_block(block_text)
-        rendered = render_block(data)
+    for block in disp.blocks:
+        rendered = render_block(
+            block.module_id,
+            block.short or SHORT_DEFAULT,
+            block.spot or [SPOT_DEFAULT],
+            block.tgt or [TGT_DEFAULT],
+        )
         # no blank lines between modules
         out_lines.extend(rendered)
-        if "".join(rendered) != original_block_norm:
-            if data["module_id"]:
-                modules_changed.append(data["module_id"])
+        if block.module_id and "".join(rendered) != _strip_trailing_spaces(block.text):
+            modules_changed.append(block.module_id)
 
     normalized_text = "".join(out_lines)
-    # compute line delta roughly
-    lines_changed = sum(1 for a,b in zip_longest(raw_text.splitlines(True), normalized_text.splitlines(True)) if (a or "") != (b or ""))
+    # line delta: one linear pass over both texts
+    lines_changed = sum(1 for a,b in zip_longest(raw_text.splitlines(True), out_lines) if (a or "") != (b or ""))
     return normalized_text, modules_changed, lines_changed
 
 def main() -> int:
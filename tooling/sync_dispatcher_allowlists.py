@@ -11,18 +11,28 @@ Rules:
   use its non-empty, de-duplicated tokens; else keep existing if non-empty; else ["none"].
 - 2-space indent for list items. LF line endings. Tabs → spaces.
 - Idempotent. Supports --check and --in-place.
+- Dispatcher parsing is shared with fix_dispatcher_format.py (dispatcher_model.py).
+- update_entries(path, ids) re-renders only the existing blocks of the given modules
+  (used by tools/allowlists_sync.py --staged); other lines are left untouched.
+- build/cache/manifest.json (tools/manifest.py) records the allowlist hash each block
+  was rendered from. While the dispatcher and SSOT are untouched since the last run,
+  only blocks whose allowlist changed are re-rendered; a no-op run only stats files.
 """
 from __future__ import annotations
 import argparse, re, sys, os, pathlib, tempfile
 from typing import List, Dict, Tuple
 
+from dispatcher_model import SHORT_DEFAULT, SPOT_DEFAULT, TGT_DEFAULT, block_spans, normalize_lf, parse, render_block, splice
+
 ROOT = pathlib.Path(__file__).resolve().parents[1]
 DISP = ROOT / "prompts" / "dispatcher" / "_ALL.txt"
 SSOT = ROOT / "tooling" / "curriculum_ids.dart"
 ALLOWLIST_DIR = ROOT / "tooling" / "allowlists"
+MANIFEST_VERSION = "1"
 
-SPOT_DEFAULT = "l2_core_rules_check"
-TGT_DEFAULT = "none"
+if str(ROOT / "tools") not in sys.path:
+    sys.path.append(str(ROOT / "tools"))
+from manifest import Manifest, manifest_path  # noqa: E402
 
 ID_PATTERNS = (
     "core_", "cash_", "mtt_", "icm_", "hu_", "math_", "live_", "online_", "exploit_", "donk_", "spr_"
@@ -48,36 +58,11 @@ def parse_ssot_ids(ssot_text: str) -> List[str]:
     return ids
 
 def parse_dispatcher(disp_text: str) -> Dict[str, dict]:
-    res: Dict[str, dict] = {}
-    if not disp_text.strip():
-        return res
-    # разрезаем на блоки по module_id
-    blocks = re.split(r'(?m)^(?=module_id:\s*)', disp_text)
-    for b in blocks:
-        if not b.strip(): continue
-        m = re.match(r'(?m)^module_id:\s*(\S+)\s*$', b)
-        if not m:  # попробуем с переносом
-            m = re.match(r'(?m)^module_id:\s*(\S+)\s*\n', b)
-        if not m: continue
-        mid = m.group(1)
-        # short_scope
-        ms = re.search(r'(?m)^short_scope:\s*(.*)$', b)
-        short = (ms.group(1).strip() if ms else "TODO") or "TODO"
-        # collect lists
-        def collect(section: str) -> List[str]:
-            mm = re.search(rf'(?m)^{section}\s*$([\s\S]*?)(?=^module_id:|^spotkind_allowlist:|^target_tokens_allowlist:|\Z)', b)
-            out: List[str] = []
-            if mm:
-                for ln in mm.group(1).splitlines():
-                    s = ln.replace("\t", "    ").strip()
-                    if s and not s.endswith(":"):
-                        if not out or out[-1] != s:
-                            out.append(s)
-            return out
-        spot = collect("spotkind_allowlist:")
-        tgt  = collect("target_tokens_allowlist:")
-        res[mid] = {"short": short, "spot": spot, "tgt": tgt}
-    return res
+    # один проход общим парсером (dispatcher_model); повтор module_id -> последний блок
+    return {
+        mid: {"short": b.short or SHORT_DEFAULT, "spot": b.spot, "tgt": b.tgt}
+        for mid, b in parse(disp_text).by_id.items()
+    }
 
 def read_target_allowlist(mid: str) -> List[str]:
     f = ALLOWLIST_DIR / f"target_tokens_allowlist_{mid}.txt"
@@ -90,37 +75,63 @@ def read_target_allowlist(mid: str) -> List[str]:
             out.append(s)
     return out
 
+def build_entry(mid: str, prev: dict) -> List[str]:
+    short = prev["short"] or "TODO"
+    spot_items: List[str] = prev["spot"][:]
+    tgt_items:  List[str] = prev["tgt"][:]
+
+    if not spot_items:
+        spot_items = [SPOT_DEFAULT]
+
+    file_targets = read_target_allowlist(mid)
+    if file_targets:
+        tgt_items = file_targets
+    elif not tgt_items:
+        tgt_items = [TGT_DEFAULT]
+
+    return render_block(mid, short, spot_items, tgt_items, blank_after_lists=True)
+
 def build_dispatcher(ids: List[str], old: Dict[str, dict]) -> str:
     lines: List[str] = []
     for mid in ids:
-        prev = old.get(mid, {"short":"TODO", "spot":[], "tgt":[]})
-        short = prev["short"] or "TODO"
-        spot_items: List[str] = prev["spot"][:]
-        tgt_items:  List[str] = prev["tgt"][:]
-
-        if not spot_items:
-            spot_items = [SPOT_DEFAULT]
-
-        file_targets = read_target_allowlist(mid)
-        if file_targets:
-            tgt_items = file_targets
-        elif not tgt_items:
-            tgt_items = [TGT_DEFAULT]
-
-        lines.append(f"module_id: {mid}\n")
-        lines.append(f"short_scope: {short}\n")
-        lines.append("spotkind_allowlist:\n")
-        for it in spot_items:
-            lines.append(f"  {it}\n")
-        lines.append("\n")
-        lines.append("target_tokens_allowlist:\n")
-        for it in tgt_items:
-            lines.append(f"  {it}\n")
-        lines.append("\n")
+        lines.extend(build_entry(mid, old.get(mid, {"short":"TODO", "spot":[], "tgt":[]})))
     return "".join(lines)
 
-def normalize_lf(s: str) -> str:
-    return s.replace("\r\n", "\n").replace("\r", "\n")
+def write_atomic(path: pathlib.Path, text: str) -> None:
+    if not path.parent.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent))
+    os.close(fd)
+    pathlib.Path(tmp).write_text(text, encoding="utf-8", newline="\n")
+    os.replace(tmp, path)
+
+def update_entries(disp_path: pathlib.Path, ids: List[str]) -> List[str]:
+    """Re-render the blocks of ids already in the dispatcher; return the ids that changed.
+
+    Only those blocks are parsed, so the cost does not grow with the dispatcher.
+    """
+    text = normalize_lf(read_text(disp_path))
+    spans = block_spans(text)
+    blocks = {}
+    for mid in ids:
+        if mid not in spans: continue
+        start, end = spans[mid]
+        b = parse(text[start:end]).blocks[0]
+        lines = build_entry(mid, {"short": b.short or SHORT_DEFAULT, "spot": b.spot, "tgt": b.tgt})
+        if "".join(lines) != text[start:end]:
+            blocks[mid] = lines
+    if blocks:
+        write_atomic(disp_path, splice(text, spans, blocks))
+    return sorted(blocks)
+
+def allowlist_hash(manifest: Manifest, mid: str) -> str:
+    f = ALLOWLIST_DIR / f"target_tokens_allowlist_{mid}.txt"
+    ent = manifest.fresh(f)
+    if ent is not None:
+        return ent["sha1"]
+    if not f.exists():
+        return ""
+    return manifest.record(f)["sha1"]
 
 def main() -> int:
     ap = argparse.ArgumentParser()
@@ -131,31 +142,50 @@ def main() -> int:
     args = ap.parse_args()
 
     disp_path = pathlib.Path(args.path)
+    manifest = Manifest("sync_dispatcher_allowlists", MANIFEST_VERSION, manifest_path(ROOT))
+
+    # fast path: dispatcher and SSOT as we last left them -> only allowlist changes matter
+    d_ent, s_ent = manifest.fresh(disp_path), manifest.fresh(SSOT)
+    if d_ent is not None and s_ent is not None:
+        inputs = d_ent["data"]["inputs"]
+        current = {mid: allowlist_hash(manifest, mid) for mid in inputs}
+        changed = [mid for mid in inputs if current[mid] != inputs[mid]]
+        if not changed:
+            manifest.save()
+            print(f"dispatcher up to date: modules={len(inputs)}" if args.in_place else "OK")
+            return 0
+        if args.in_place:
+            update_entries(disp_path, changed)
+            manifest.record(disp_path, None, {"inputs": current})
+            manifest.save()
+            print(f"dispatcher updated: blocks={len(changed)} modules={len(inputs)}")
+            return 0
+
     ssot_text = read_text(SSOT)
     ids = parse_ssot_ids(ssot_text)
     if not ids:
         print("ERROR: no module ids parsed from SSOT", file=sys.stderr)
         return 2
 
-    old = parse_dispatcher(read_text(disp_path))
+    cur = normalize_lf(read_text(disp_path))
+    old = parse_dispatcher(cur)
     new_text = normalize_lf(build_dispatcher(ids, old))
+    changed = cur != new_text
 
     if args.in_place:
-        if not disp_path.parent.exists():
-            disp_path.parent.mkdir(parents=True, exist_ok=True)
-        # атомарная запись
-        fd, tmp = tempfile.mkstemp(dir=str(disp_path.parent))
-        os.close(fd)
-        pathlib.Path(tmp).write_text(new_text, encoding="utf-8", newline="\n")
-        os.replace(tmp, disp_path)
-        print(f"dispatcher rebuilt: modules={len(ids)} (from SSOT)")
-        return 0
+        if changed:
+            # атомарная запись
+            write_atomic(disp_path, new_text)
+        print(f"dispatcher rebuilt: modules={len(ids)} (from SSOT)" if changed
+              else f"dispatcher up to date: modules={len(ids)}")
     else:
         # check mode: diff by length only to be concise
-        cur = read_text(disp_path)
-        changed = normalize_lf(cur) != new_text
         print("CHANGED" if changed else "OK")
-        return 1 if changed else 0
+    if args.in_place or not changed:
+        manifest.record(SSOT, ssot_text)
+        manifest.record(disp_path, new_text, {"inputs": {mid: allowlist_hash(manifest, mid) for mid in ids}})
+        manifest.save()
+    return 1 if changed and not args.in_place else 0
 
 if __name__ == "__main__":
-    sys.exit(main())
\ No newline at end of file
+    sys.exit(main())
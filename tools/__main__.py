@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Single entry point for the content tools over one shared corpus.
+
+Usage:
+  python3 -m tools <subcommand> [<subcommand> ...]
+
+Subcommands run in the order given against the same in-memory corpus, so each
+content file is read and parsed once per invocation no matter how many tools
+run. A fixer that rewrites a file refreshes it in the corpus for later steps.
+
+  guard             jsonl_guard --check over drills files
+  guard-fix         jsonl_guard --fix over drills files
+  validate          validate_content checks (theory, demos, drills)
+  allowlists-check  allowlists_sync --check
+  allowlists-write  allowlists_sync --write
+  migrate-tokens    migrate_tokens target migration (rewrites files)
+  dupes             dupes: duplicate ids (error) and (near-)duplicate text
+  ensure-mentions   ensure_mentions: append the size family note to theory.md (rewrites files)
+
+Example (what the pre-commit hook and CI chain today):
+  python3 -m tools guard-fix allowlists-write validate
+
+Options (anywhere on the command line):
+  --timings FILE    write per-phase wall/CPU times and counters as JSON
+  --profile FILE    write cProfile stats for the whole run
+
+Exit code is the highest exit code returned by any step.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+from typing import Callable, Dict, List
+
+TOOLS_DIR = Path(__file__).resolve().parent
+REPO_ROOT = TOOLS_DIR.parent
+
+# Tools import their siblings as top-level modules (tools/ is not a package)
+if str(TOOLS_DIR) not in sys.path:
+    sys.path.insert(0, str(TOOLS_DIR))
+
+from corpus import Corpus  # noqa: E402
+from instrument import METRICS, pop_arguments, session  # noqa: E402
+
+
+def _guard(fix: bool) -> Callable[[Corpus], int]:
+    def step(corpus: Corpus) -> int:
+        import jsonl_guard
+        rc = jsonl_guard.validate_files(corpus.files("drills"), fix=fix)
+        if rc == 0:
+            print("OK")
+        return rc
+    return step
+
+
+def _validate(corpus: Corpus) -> int:
+    import validate_content
+    return validate_content.run(corpus, use_cache=True)
+
+
+def _allowlists(mode: str) -> Callable[[Corpus], int]:
+    def step(corpus: Corpus) -> int:
+        import allowlists_sync
+        return allowlists_sync.sync(mode, corpus)
+    return step
+
+
+def _migrate(corpus: Corpus) -> int:
+    import migrate_tokens
+    migrate_tokens.run(corpus)
+    return 0
+
+
+def _dupes(corpus: Corpus) -> int:
+    import dupes
+    index = dupes.scan(corpus, ("drills", "demos"), threshold=0.8, min_words=6, jobs=os.cpu_count() or 1)
+    errs, _ = dupes.report(index)
+    return 1 if errs else 0
+
+
+def _ensure_mentions(corpus: Corpus) -> int:
+    import ensure_mentions
+    ensure_mentions.run(corpus)
+    return 0
+
+
+STEPS: Dict[str, Callable[[Corpus], int]] = {
+    "guard": _guard(fix=False),
+    "guard-fix": _guard(fix=True),
+    "validate": _validate,
+    "allowlists-check": _allowlists("--check"),
+    "allowlists-write": _allowlists("--write"),
+    "migrate-tokens": _migrate,
+    "dupes": _dupes,
+    "ensure-mentions": _ensure_mentions,
+}
+
+
+def main(argv: List[str]) -> int:
+    argv, timings, profile = pop_arguments(argv)
+    if not argv or argv[0] in ("-h", "--help"):
+        print(__doc__.strip())
+        return 0 if argv else 2
+    unknown = [a for a in argv if a not in STEPS]
+    if unknown:
+        print(f"unknown subcommand(s): {' '.join(unknown)}", file=sys.stderr)
+        print(f"choose from: {' '.join(STEPS)}", file=sys.stderr)
+        return 2
+
+    # Tools use repo-relative paths (content/, tooling/allowlists/)
+    os.chdir(REPO_ROOT)
+    rc = 0
+    with session("tools " + " ".join(argv), timings=timings, profile=profile):
+        corpus = Corpus(Path("content"))
+        for name in argv:
+            with METRICS.phase(f"step.{name}"):
+                rc = max(rc, STEPS[name](corpus))
+    return rc
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,10 +1,19 @@
 #!/usr/bin/env python3
-import sys, json, pathlib
-from typing import List
+import argparse, sys, pathlib, subprocess
+from typing import List, Optional
 
 ROOT = pathlib.Path(".")
 CONTENT = ROOT / "content"
 ALLOWDIR = ROOT / "tooling" / "allowlists"
+INDEX = ROOT / "build" / "cache" / "content_index.sqlite"
+DISPATCHER = ROOT / "prompts" / "dispatcher" / "_ALL.txt"
+ALLOW_PREFIX = "tooling/allowlists/target_tokens_allowlist_"
+# staged changes to these affect every module -> full run
+STAGED_ALL = {
+    "tools/allowlists_sync.py", "tools/jsonl_guard.py", "tools/corpus.py",
+    "tools/records.py", "tools/spec.py", "tools/jsoncodec.py", "tools/manifest.py",
+    "tooling/dispatcher_model.py", "tooling/sync_dispatcher_allowlists.py",
+}
 
 # Allow importing sibling tools without making tools/ a package
 if str((ROOT / "tools").resolve()) not in sys.path:
@@ -13,6 +22,15 @@ try:
     import jsonl_guard  # type: ignore
 except Exception:
     jsonl_guard = None  # Fallback: still run, but parsing errors will be surfaced below
+from corpus import Corpus, ContentFile  # type: ignore
+from instrument import METRICS, pop_arguments, session  # type: ignore
+from cache import content_hash  # type: ignore
+from manifest import Manifest, manifest_path  # type: ignore
+import shard  # type: ignore
+from records import BAD_JSON, NOT_STR, OK, DrillTable  # type: ignore
+
+# bump when collect_targets or the allowlist format changes
+MANIFEST_VERSION = "1"
 
 def is_ascii(s: str) -> bool:
     try:
@@ -21,58 +39,228 @@ def is_ascii(s: str) -> bool:
     except:
         return False
 
-def collect_targets(drills_path: pathlib.Path):
-    out = []
-    for idx, ln in enumerate(drills_path.read_text(encoding="utf-8").splitlines(), start=1):
-        ln = ln.strip()
-        if not ln:
-            continue
-        try:
-            obj = json.loads(ln)
-        except json.JSONDecodeError as e:
-            col = getattr(e, "colno", 1) or 1
-            # Mirror guard message style
-            caret = " " * (col - 1) + "^"
-            msg = f"BAD {drills_path}:{idx}:{col} -> {e.msg}\n{ln}\n{caret}"
-            print(msg)
-            sys.exit(1)
-        t = obj.get("target","")
-        if t:
-            out.append(t)
-    return sorted(set(out))
+class BadDrill(Exception):
+    """A drills line collect_targets cannot take targets from; str() is the guard-style message."""
+    def __init__(self, path, line: int, col: int, reason: str, raw: str):
+        super().__init__(f"BAD {path}:{line}:{col} -> {reason}\n{raw}\n" + " " * (col - 1) + "^")
+        self.path, self.line, self.col, self.reason = path, line, col, reason
+
+def collect_targets(drills: ContentFile):
+    # компактные записи (records.py): строки не кешируются, таргеты -- коды символов
+    table = DrillTable([drills])
+    for rec in table.bad(0):
+        if rec.status != BAD_JSON:
+            raise BadDrill(drills.path, rec.line, 1, "not a JSON object", rec.raw)
+        e = rec.error
+        raise BadDrill(drills.path, rec.line, getattr(e, "colno", 1) or 1, e.msg, rec.raw)
+    out = table.targets(0)
+    if out and out[-1] is None:
+        bad = next(r for r in table if r.status == OK and table.target[r.i] == NOT_STR)
+        raise BadDrill(drills.path, bad.line, 1, "target must be a string", bad.raw)
+    return out
+
+def _indexed_targets(corpus: Corpus, drill_files: List[ContentFile]):
+    """Targets per module from the SQLite index; only changed files are read.
 
-def sync(mode: str) -> int:
-    errors = []
-    # Validate drills with the JSONL guard first (auto-fix by default)
-    drill_files: List[str] = [str(p) for p in CONTENT.glob("*/v1/drills.jsonl")]
-    if jsonl_guard is not None and drill_files:
-        rc = jsonl_guard.validate_paths(drill_files, fix=True)
+    Returns (rc, {module: targets}); modules missing from the mapping still
+    need collect_targets (their drills have lines the guard could not fix, or
+    records it rejects), which reports them exactly as a full scan does.
+    """
+    from content_index import ContentIndex  # type: ignore
+    index = ContentIndex(INDEX, CONTENT)
+    try:
+        index.refresh(corpus)
+        dirty = set(index.dirty_files("drills"))
+        if dirty and jsonl_guard is not None:
+            # same fixes as the full-corpus guard pass, limited to files that need them
+            with METRICS.phase("allowlists.guard"):
+                rc = jsonl_guard.validate_files([f for f in drill_files if str(f.path) in dirty], fix=True)
+            if rc != 0:
+                return rc, {}
+            index.refresh(corpus)
+            dirty = set(index.dirty_files("drills"))
+        dirty.update(index.invalid_files("drills"))
+        return 0, {f.module: index.targets(f.module) for f in drill_files if str(f.path) not in dirty}
+    finally:
+        index.close()
+
+def _fresh_targets(manifest: Optional[Manifest], drills: ContentFile):
+    # targets recorded for an unchanged drills file (only clean files are recorded)
+    if manifest is None:
+        return None
+    ent = manifest.fresh(drills.path)
+    return ent["data"] if ent is not None else None
+
+def sync(mode: str, corpus: Optional[Corpus] = None, use_index: bool = False,
+         found: Optional[list] = None) -> int:
+    errors = []  # (module, message); found, if given, receives them too (--json)
+    bad = []     # (module, BadDrill): printed at once, the module is skipped, rc 1
+    if corpus is None:
+        corpus = Corpus(CONTENT)
+    drill_files: List[ContentFile] = corpus.files("drills")
+    # inputs/outputs unchanged since the last run are neither read nor written
+    manifest = None if use_index else Manifest("allowlists_sync", MANIFEST_VERSION, manifest_path(ROOT))
+    known = {}
+    indexed = {}
+    if use_index and drill_files:
+        rc, indexed = _indexed_targets(corpus, drill_files)
         if rc != 0:
             return rc
-    for drills in CONTENT.glob("*/v1/drills.jsonl"):
-        module = drills.parts[1]  # content/<module>/v1/...
-        targets = collect_targets(drills)
+    else:
+        for f in drill_files:
+            t = _fresh_targets(manifest, f)
+            if t is not None:
+                known[f.module] = t
+        # Validate drills with the JSONL guard first (auto-fix by default)
+        todo = [f for f in drill_files if f.module not in known]
+        if jsonl_guard is not None and todo:
+            with METRICS.phase("allowlists.guard"):
+                rc = jsonl_guard.validate_files(todo, fix=True)
+            if rc != 0:
+                return rc
+    for drills in drill_files:
+        module = drills.module
+        with METRICS.phase("allowlists.collect"):
+            if module in indexed:
+                targets = indexed[module]
+            elif module in known:
+                targets = known[module]
+                METRICS.count("allowlists.inputs_unchanged")
+            else:
+                ent = manifest.lookup(drills.path, drills.text) if manifest is not None else None
+                try:
+                    targets = ent["data"] if ent is not None else collect_targets(drills)
+                except BadDrill as e:
+                    print(e)
+                    bad.append((module, e))
+                    continue
+                if manifest is not None and ent is None:
+                    manifest.record(drills.path, drills.text, targets)
         if not targets:
-            errors.append(f"[no-targets] content/{module}/v1/drills.jsonl")
+            errors.append((module, f"[no-targets] content/{module}/v1/drills.jsonl"))
             continue
-        ALLOWDIR.mkdir(parents=True, exist_ok=True)
         allow = ALLOWDIR / f"target_tokens_allowlist_{module}.txt"
         want = "\n".join(targets) + "\n"
-        have = allow.read_text(encoding="utf-8") if allow.exists() else ""
+        ent = manifest.fresh(allow) if manifest is not None else None
+        unchanged = ent is not None and ent["sha1"] == content_hash(want)
+        if unchanged:
+            have = want  # allowlist untouched since we last saw it holding want
+        else:
+            have = allow.read_text(encoding="utf-8") if allow.exists() else ""
         if not is_ascii(want):
-            errors.append(f"[non-ascii] {allow}")
+            errors.append((module, f"[non-ascii] {allow}"))
         if mode == "--check":
             if want != have:
-                errors.append(f"[outdated] {allow} (run tools/allowlists_sync.py --write)")
-        else:
-            allow.write_text(want, encoding="utf-8")
+                errors.append((module, f"[outdated] {allow} (run tools/allowlists_sync.py --write)"))
+        elif want != have:
+            ALLOWDIR.mkdir(parents=True, exist_ok=True)
+            with METRICS.phase("allowlists.write"):
+                allow.write_text(want, encoding="utf-8")
+            METRICS.count("allowlists_written")
+            METRICS.count("bytes_written", len(want.encode("utf-8")))
+        if manifest is not None and not unchanged and (want == have or mode != "--check"):
+            manifest.record(allow, want)  # the file now holds want
+    if manifest is not None:
+        manifest.save()
+    if found is not None:
+        found.extend(errors)
+        found.extend(bad)
     if mode == "--check" and errors:
-        print("\n".join(errors))
+        print("\n".join(msg for _, msg in errors))
         return 1
+    return 1 if bad else 0
+
+def staged_modules() -> Optional[List[str]]:
+    """Modules touched by staged paths (git index); None means all modules."""
+    try:
+        out = subprocess.run(["git", "diff", "--cached", "--name-only", "-z"],
+                             capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"[staged] git diff failed ({e}); checking all modules", file=sys.stderr)
+        return None
+    mods = set()
+    for p in out.split("\0"):
+        parts = p.split("/")
+        if len(parts) >= 3 and parts[0] == "content":
+            mods.add(parts[1])
+        elif p.startswith(ALLOW_PREFIX) and p.endswith(".txt"):
+            mods.add(p[len(ALLOW_PREFIX):-4])
+        elif p in STAGED_ALL:
+            return None
+    return sorted(mods)
+
+def sync_staged() -> int:
+    """Pre-commit mode: guard, write and check allowlists of staged modules only,
+    refresh their dispatcher blocks and stage what was written."""
+    mods = staged_modules()
+    if mods == []:
+        return 0
+    corpus = Corpus(CONTENT, modules=mods)
+    rc = sync("--write", corpus) or sync("--check", corpus)
+    if rc != 0:
+        return rc
+    names = [m.name for m in corpus.modules]
+    written = [str(ALLOWDIR / f"target_tokens_allowlist_{m.name}.txt") for m in corpus.modules if "drills" in m.files]
+    if DISPATCHER.exists():
+        tooling = str((ROOT / "tooling").resolve())
+        if tooling not in sys.path:
+            sys.path.append(tooling)
+        import sync_dispatcher_allowlists  # type: ignore
+        with METRICS.phase("allowlists.dispatcher"):
+            if sync_dispatcher_allowlists.update_entries(DISPATCHER, names):
+                written.append(str(DISPATCHER))
+    if written:
+        subprocess.run(["git", "add", "--", *written], check=False)
     return 0
 
+def sync_shard(spec, json_path: Optional[str]) -> int:
+    """--check over the modules of one shard (tools/shard.py); --json writes the shard result."""
+    mods = shard.modules(CONTENT, ["drills.jsonl"], spec) if spec else None
+    corpus = Corpus(CONTENT, modules=mods)
+    found = []
+    rc = sync("--check", corpus, found=found)
+    if json_path:
+        result = shard.ShardResult("allowlists_sync", spec, [m.name for m in corpus.modules])
+        if jsonl_guard is not None:
+            for path, no, col, reason in jsonl_guard.reported:
+                result.add("ERR", "jsonl.bad-line", path.parent.parent.name, str(path), no, f"{reason} (col {col})")
+        for module, msg in found:
+            if isinstance(msg, BadDrill):
+                result.add("ERR", "allowlists.bad-line", module, str(msg.path), msg.line, f"{msg.reason} (col {msg.col})")
+                continue
+            kind, _, rest = msg[1:].partition("] ")
+            result.add("ERR", f"allowlists.{kind}", module, rest.split(" ")[0], None, msg)
+        result.save(json_path, rc)
+    return rc
+
 if __name__ == "__main__":
-    mode = sys.argv[1] if len(sys.argv) > 1 else "--check"
-    if mode not in ("--check","--write"):
-        print("usage: tools/allowlists_sync.py [--check|--write]"); sys.exit(2)
-    sys.exit(sync(mode))
+    args, timings, profile = pop_arguments(sys.argv[1:])
+    use_index = "--index" in args
+    args = [a for a in args if a != "--index"]
+    spec = json_path = None
+    rest = []
+    it = iter(args)
+    try:
+        for a in it:
+            key, eq, val = a.partition("=")
+            if key == "--shard":
+                spec = shard.parse_spec(val if eq else next(it))
+            elif key == "--json":
+                json_path = val if eq else next(it)
+            else:
+                rest.append(a)
+    except (StopIteration, argparse.ArgumentTypeError) as e:
+        print(f"allowlists_sync: {e or 'missing value'}"); sys.exit(2)
+    args = rest
+    mode = args[0] if args else "--check"
+    if mode not in ("--check","--write","--staged") or len(args) > 1 or \
+            ((spec or json_path) and (mode != "--check" or use_index)):
+        print("usage: tools/allowlists_sync.py [--check [--shard I/N] [--json FILE]|--write|--staged] [--index] [--timings FILE] [--profile FILE]"); sys.exit(2)
+    with session("allowlists_sync", timings=timings, profile=profile):
+        if mode == "--staged":
+            rc = sync_staged()
+        elif spec or json_path:
+            rc = sync_shard(spec, json_path)
+        else:
+            rc = sync(mode, use_index=use_index)
+    sys.exit(rc)
@@ -1,43 +1,69 @@
 # tools/autofix_content.py
-from pathlib import Path
-import re
+import argparse, re, sys
 from spec import CONTENT_DIR
+from corpus import Corpus, ContentFile
 
+# (pattern, replacement, prefilter literals): one of the literals occurs
+# (case-insensitively) in any text the pattern can match
 REPLACERS = [
     # нормализация chk–chk / check—check → chk-chk
-    (re.compile(r"chk[\-–—]chk|check[\-–—]check", re.I), "chk-chk"),
+    (re.compile(r"chk[\-–—]chk|check[\-–—]check", re.I), "chk-chk", ("chk", "check")),
     # Fv75 / Fv 75 / FV75 → Fv75
-    (re.compile(r"\bF\s*V\s*75\b", re.I), "Fv75"),
-    (re.compile(r"\bF\s*V\s*50\b", re.I), "Fv50"),
+    (re.compile(r"\bF\s*V\s*75\b", re.I), "Fv75", ("75",)),
+    (re.compile(r"\bF\s*V\s*50\b", re.I), "Fv50", ("50",)),
     # пробелы/дефисы
-    (re.compile(r"\bturn\s*probe\b", re.I), "probe_turns"),
+    (re.compile(r"\bturn\s*probe\b", re.I), "probe_turns", ("probe",)),
     # частые опечатки токенов
-    (re.compile(r"\bsize-?down-?dry\b", re.I), "size_down_dry"),
-    (re.compile(r"\bsize-?up-?wet\b", re.I), "size_up_wet"),
-    (re.compile(r"\bsmall[\s_]?cbet[\s_]?33\b", re.I), "small_cbet_33"),
-    (re.compile(r"\bhalf[\s_]?pot[\s_]?50\b", re.I), "half_pot_50"),
-    (re.compile(r"\bbig[\s_]?bet[\s_]?75\b", re.I), "big_bet_75"),
+    (re.compile(r"\bsize-?down-?dry\b", re.I), "size_down_dry", ("dry",)),
+    (re.compile(r"\bsize-?up-?wet\b", re.I), "size_up_wet", ("wet",)),
+    (re.compile(r"\bsmall[\s_]?cbet[\s_]?33\b", re.I), "small_cbet_33", ("33",)),
+    (re.compile(r"\bhalf[\s_]?pot[\s_]?50\b", re.I), "half_pot_50", ("50",)),
+    (re.compile(r"\bbig[\s_]?bet[\s_]?75\b", re.I), "big_bet_75", ("75",)),
 ]
 
-def fix_file(p: Path):
-    s = p.read_text(encoding="utf-8")
-    orig = s
-    for pat, repl in REPLACERS:
-        s = pat.sub(repl, s)
-    if s != orig:
-        p.write_text(s, encoding="utf-8")
-        return True
-    return False
+# Все правила одним проходом: альтернация именованных групп + таблица замен.
+# Замены не пересекаются между правилами и не порождают новых совпадений,
+# поэтому один проход даёт тот же результат, что и цепочка re.sub.
+COMBINED = re.compile(
+    "|".join(f"(?P<r{i}>{pat.pattern})" for i, (pat, _, _) in enumerate(REPLACERS)),
+    re.I,
+)
+DISPATCH = {f"r{i}": repl for i, (_, repl, _) in enumerate(REPLACERS)}
+PREFILTER = re.compile("|".join(sorted({re.escape(lit) for _, _, lits in REPLACERS for lit in lits})), re.I)
+
+def fix_text(s: str) -> str:
+    if not PREFILTER.search(s):
+        return s
+    return COMBINED.sub(lambda m: DISPATCH[m.lastgroup], s)
+
+def fix_file(f: ContentFile, write: bool = True) -> bool:
+    s = f.text
+    new = fix_text(s)
+    if new == s:
+        return False
+    if write:
+        f.write_text(new)
+    return True
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="autofix_content", description="Normalize token typos in theory/demos/drills.")
+    ap.add_argument("--check", action="store_true", help="report files that would change, do not write (exit 1 if any)")
+    args = ap.parse_args(argv)
 
-def main():
     changed = 0
-    for mod in CONTENT_DIR.glob("*/*"):
-        if mod.name != "v1": continue
-        for f in (mod/"theory.md", mod/"demos.jsonl", mod/"drills.jsonl"):
-            if f.exists() and fix_file(f):
-                print(f"[fixed] {f}")
+    corpus = Corpus(CONTENT_DIR)
+    corpus.preload()
+    for mod in corpus.modules:
+        for kind in ("theory", "demos", "drills"):
+            f = mod.get(kind)
+            if f is not None and fix_file(f, write=not args.check):
+                print(f"[{'would fix' if args.check else 'fixed'}] {f.path}")
                 changed += 1
+    if args.check:
+        print(f"\nAutofix check. Files to change: {changed}")
+        return 1 if changed else 0
     print(f"\nAutofix done. Files changed: {changed}")
+    return 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
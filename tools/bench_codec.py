@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark JSON parse backends on the real content corpus.
+
+Loads every non-blank line of content/*/v1/{demos,drills}.jsonl (optionally
+repeated to simulate large generated drill sets), parses all lines with each
+available backend and prints lines/s and the speed-up over stdlib json.
+Also checks that jsoncodec.loads returns exactly what json.loads returns and
+raises the same errors (message, line, column) for every line.
+
+Usage:
+  python3 tools/bench_codec.py [--repeat N] [--rounds R] [--json OUT]
+
+Stdlib only; optional backends are measured when installed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import jsoncodec
+from corpus import Corpus
+from spec import CONTENT_DIR
+
+
+def _corpus_lines(root: Path) -> List[str]:
+    out: List[str] = []
+    corpus = Corpus(root)
+    for kind in ("demos", "drills"):
+        for f in corpus.files(kind):
+            out.extend(ln for ln in f.text.splitlines() if ln.strip())
+    return out
+
+
+def _backends() -> Dict[str, Callable[[str], Any]]:
+    found: Dict[str, Callable[[str], Any]] = {"json": json.loads}
+    try:
+        import orjson  # type: ignore
+        found["orjson"] = orjson.loads
+    except ImportError:
+        pass
+    found[f"jsoncodec({jsoncodec.BACKEND})"] = jsoncodec.loads
+    return found
+
+
+def _time(fn: Callable[[str], Any], lines: List[str], rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        for ln in lines:
+            try:
+                fn(ln)
+            except ValueError:
+                pass
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _parity(lines: List[str]) -> int:
+    """Count lines where jsoncodec.loads differs from json.loads."""
+    bad = 0
+    for ln in lines:
+        try:
+            want: Any = ("ok", json.loads(ln))
+        except json.JSONDecodeError as e:
+            want = ("err", e.msg, e.lineno, e.colno)
+        try:
+            got: Any = ("ok", jsoncodec.loads(ln))
+        except json.JSONDecodeError as e:
+            got = ("err", e.msg, e.lineno, e.colno)
+        if got != want:
+            bad += 1
+    return bad
+
+
+def main(argv: List[str]) -> int:
+    ap = argparse.ArgumentParser(prog="bench_codec", description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--root", default=str(CONTENT_DIR), help="content root (default: repo content/)")
+    ap.add_argument("--repeat", type=int, default=1, help="replicate the corpus N times")
+    ap.add_argument("--rounds", type=int, default=3, help="timing rounds per backend (best is kept)")
+    ap.add_argument("--json", dest="json_out", help="write results as JSON to this path")
+    args = ap.parse_args(argv)
+
+    lines = _corpus_lines(Path(args.root)) * max(args.repeat, 1)
+    if not lines:
+        print("no JSONL lines found", file=sys.stderr)
+        return 2
+    nbytes = sum(len(ln.encode("utf-8")) for ln in lines)
+
+    mismatches = _parity(lines)
+    results = []
+    base = None
+    for name, fn in _backends().items():
+        secs = _time(fn, lines, args.rounds)
+        base = base if base is not None else secs
+        results.append({
+            "backend": name,
+            "seconds": round(secs, 6),
+            "lines_per_s": round(len(lines) / secs) if secs else None,
+            "mb_per_s": round(nbytes / secs / 1e6, 2) if secs else None,
+            "speedup": round(base / secs, 2) if secs else None,
+        })
+
+    print(f"lines={len(lines)} bytes={nbytes} active={jsoncodec.BACKEND} parity_mismatches={mismatches}")
+    print(f"{'backend':<22} {'seconds':>9} {'lines/s':>11} {'MB/s':>8} {'x json':>7}")
+    for r in results:
+        print(f"{r['backend']:<22} {r['seconds']:>9.4f} {r['lines_per_s']:>11} {r['mb_per_s']:>8} {r['speedup']:>7}")
+
+    if args.json_out:
+        Path(args.json_out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.json_out).write_text(json.dumps({
+            "lines": len(lines), "bytes": nbytes, "active_backend": jsoncodec.BACKEND,
+            "parity_mismatches": mismatches, "results": results,
+        }, indent=2) + "\n", encoding="utf-8")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
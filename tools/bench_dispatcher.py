@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Benchmark the shared dispatcher parser against the regex parsers it replaced.
+
+Builds messy synthetic dispatchers (tabs, trailing spaces, blank lines, empty
+lists, stray lines; see synth_corpus._dispatcher_block) with N modules, then
+times, best of --rounds:
+
+  sync  regex re.split + lazy per-section search (old parse_dispatcher)
+        vs sync_dispatcher_allowlists.parse_dispatcher (dispatcher_model)
+  fix   finditer block split + per-block parser (old _normalize)
+        vs fix_dispatcher_format._normalize (dispatcher_model)
+
+and checks that old and new return the same result. us/module staying flat
+as N grows means linear time. --fuzz N also compares the old and new
+fix_dispatcher_format._normalize on N random malformed dispatchers built from
+FUZZ_LINES (invalid and empty ids, stray module_id: lines, tabs, blanks).
+
+Usage:
+  python3 tools/bench_dispatcher.py [--modules 1000,10000,100000] [--rounds 3] [--fuzz 5000] [--json OUT]
+
+Stdlib only.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import sys
+import time
+from itertools import zip_longest
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import synth_corpus
+from spec import REPO_ROOT
+
+sys.path.insert(0, str(REPO_ROOT / "tooling"))
+import fix_dispatcher_format  # noqa: E402
+import sync_dispatcher_allowlists  # noqa: E402
+
+
+# --- previous implementations, kept verbatim as the reference ---------------
+
+def legacy_parse_dispatcher(disp_text: str) -> Dict[str, dict]:
+    res: Dict[str, dict] = {}
+    if not disp_text.strip():
+        return res
+    blocks = re.split(r'(?m)^(?=module_id:\s*)', disp_text)
+    for b in blocks:
+        if not b.strip(): continue
+        m = re.match(r'(?m)^module_id:\s*(\S+)\s*$', b)
+        if not m:
+            m = re.match(r'(?m)^module_id:\s*(\S+)\s*\n', b)
+        if not m: continue
+        mid = m.group(1)
+        ms = re.search(r'(?m)^short_scope:\s*(.*)$', b)
+        short = (ms.group(1).strip() if ms else "TODO") or "TODO"
+        def collect(section: str) -> List[str]:
+            mm = re.search(rf'(?m)^{section}\s*$([\s\S]*?)(?=^module_id:|^spotkind_allowlist:|^target_tokens_allowlist:|\Z)', b)
+            out: List[str] = []
+            if mm:
+                for ln in mm.group(1).splitlines():
+                    s = ln.replace("\t", "    ").strip()
+                    if s and not s.endswith(":"):
+                        if not out or out[-1] != s:
+                            out.append(s)
+            return out
+        spot = collect("spotkind_allowlist:")
+        tgt  = collect("target_tokens_allowlist:")
+        res[mid] = {"short": short, "spot": spot, "tgt": tgt}
+    return res
+
+
+def legacy_normalize(lines: List[str]):
+    SPOT_HDR = "spotkind_allowlist:"
+    TGT_HDR = "target_tokens_allowlist:"
+    raw_text = "".join(s if s.endswith("\n") else s + "\n" for s in lines)
+    raw_text = raw_text.replace("\r\n", "\n").replace("\r", "\n")
+    mod_re = re.compile(r"^module_id:\s*([a-z0-9_]+)\s*$", re.M)
+    matches = list(mod_re.finditer(raw_text))
+    if not matches:
+        return raw_text, [], 0
+    out_lines: List[str] = []
+    modules_changed: List[str] = []
+
+    def strip_trailing_spaces(s: str) -> str:
+        return "\n".join(ln.rstrip().replace("\t", "    ") for ln in s.splitlines()) + ("\n" if s.endswith("\n") else "")
+
+    def parse_block(block_text: str) -> dict:
+        norm = block_text.replace("\t", "    ")
+        mid = short = None
+        spot: List[str] = []
+        tgt: List[str] = []
+        state = None
+        for ln in (ln.rstrip("\n\r ") for ln in norm.splitlines()):
+            if not ln:
+                continue
+            if ln.startswith("module_id:"):
+                mid = ln.split(":", 1)[1].strip(); state = None; continue
+            if ln.startswith("short_scope:"):
+                short = ln.split(":", 1)[1].strip(); state = None; continue
+            if ln.strip() == SPOT_HDR or ln.startswith(SPOT_HDR):
+                state = 'spot'; continue
+            if ln.strip() == TGT_HDR or ln.startswith(TGT_HDR):
+                state = 'tgt'; continue
+            if state == 'spot':
+                item = ln.strip().rstrip(":")
+                if item and (not spot or spot[-1] != item):
+                    spot.append(item)
+            elif state == 'tgt':
+                item = ln.strip().rstrip(":")
+                if item and (not tgt or tgt[-1] != item):
+                    tgt.append(item)
+        return {"module_id": mid or "", "short": short or "TODO",
+                "spot": spot or ["l2_core_rules_check"], "tgt": tgt or ["none"]}
+
+    def render_block(data: dict) -> List[str]:
+        out = [f"module_id: {data['module_id']}\n", f"short_scope: {data['short']}\n", SPOT_HDR + "\n"]
+        out += [f"  {it}\n" for it in data['spot']]
+        out.append(TGT_HDR + "\n")
+        out += [f"  {it}\n" for it in data['tgt']]
+        return out
+
+    for idx, m in enumerate(matches):
+        end = matches[idx + 1].start() if idx + 1 < len(matches) else len(raw_text)
+        block_text = raw_text[m.start():end]
+        data = parse_block(block_text)
+        rendered = render_block(data)
+        out_lines.extend(rendered)
+        if "".join(rendered) != strip_trailing_spaces(block_text) and data["module_id"]:
+            modules_changed.append(data["module_id"])
+    normalized_text = "".join(out_lines)
+    lines_changed = sum(1 for a, b in zip_longest(raw_text.splitlines(True), normalized_text.splitlines(True))
+                        if (a or "") != (b or ""))
+    return normalized_text, modules_changed, lines_changed
+
+
+# ---------------------------------------------------------------------------
+
+def dispatcher_text(modules: int, seed: int = 1) -> str:
+    rng = random.Random(seed)
+    return "".join(synth_corpus._dispatcher_block(rng, m) for m in synth_corpus.module_ids(modules))
+
+
+FUZZ_LINES = (
+    "module_id: core_a", "module_id: ok_1", "module_id:core_c ", "module_id: \tcash_1\t",
+    "module_id: Core-B", "module_id:", "module_id:   ", "module_id: x y", "module_id: a.b",
+    "short_scope: s", "short_scope:", "spotkind_allowlist:", "target_tokens_allowlist:",
+    "  l2_core_rules_check", "\tprobe_turns", "none", "x:", "", "   ", "junk line",
+)
+
+
+def fuzz(cases: int, seed: int = 7) -> int:
+    """Number of random malformed dispatchers on which old and new _normalize differ."""
+    rng = random.Random(seed)
+    differ = 0
+    for _ in range(cases):
+        text = "\n".join(rng.choice(FUZZ_LINES) for _ in range(rng.randint(0, 14))) + rng.choice(("", "\n"))
+        lines = text.splitlines(True)
+        differ += legacy_normalize(lines) != fix_dispatcher_format._normalize(lines)
+    return differ
+
+
+def _best(fn: Callable, arg, rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(argv: List[str]) -> int:
+    ap = argparse.ArgumentParser(prog="bench_dispatcher", description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--modules", default="1000,10000,100000", help="comma-separated dispatcher sizes")
+    ap.add_argument("--rounds", type=int, default=3, help="timing rounds per case (best is kept)")
+    ap.add_argument("--fuzz", type=int, default=0, metavar="N", help="also check fix parity on N malformed inputs")
+    ap.add_argument("--json", dest="json_out", help="write results as JSON to this path")
+    args = ap.parse_args(argv)
+
+    cases = (
+        ("sync", legacy_parse_dispatcher, sync_dispatcher_allowlists.parse_dispatcher, False),
+        ("fix", legacy_normalize, fix_dispatcher_format._normalize, True),
+    )
+    results, mismatches = [], 0
+    print(f"{'case':<5} {'modules':>8} {'legacy s':>9} {'new s':>9} {'x':>6} {'us/mod new':>11} parity")
+    for n in (int(x) for x in args.modules.split(",") if x.strip()):
+        text = dispatcher_text(n)
+        lines = text.splitlines(True)
+        for name, old, new, wants_lines in cases:
+            arg = lines if wants_lines else text
+            same = old(arg) == new(arg)
+            mismatches += not same
+            t_old, t_new = _best(old, arg, args.rounds), _best(new, arg, args.rounds)
+            results.append({"case": name, "modules": n, "legacy_s": round(t_old, 6), "new_s": round(t_new, 6),
+                            "speedup": round(t_old / t_new, 2) if t_new else None, "parity": same})
+            print(f"{name:<5} {n:>8} {t_old:>9.4f} {t_new:>9.4f} {t_old / t_new:>6.2f} "
+                  f"{t_new / n * 1e6:>11.2f} {'ok' if same else 'MISMATCH'}")
+
+    fuzzed = None
+    if args.fuzz:
+        fuzzed = {"cases": args.fuzz, "differing": fuzz(args.fuzz)}
+        mismatches += fuzzed["differing"]
+        print(f"fuzz  {args.fuzz:>8} malformed inputs, {fuzzed['differing']} differing")
+
+    if args.json_out:
+        Path(args.json_out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.json_out).write_text(json.dumps({"results": results, "fuzz": fuzzed}, indent=2) + "\n", encoding="utf-8")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Benchmark the content tools on synthetic corpora at several scales.
+
+For each scale (default 1x, 10x, 100x today's corpus) a synthetic tree is
+generated with tools/synth_corpus.py, then each tool runs as a subprocess
+(its real CLI, interpreter start-up included) and the best wall time of
+--repeat runs is kept. Tools that rewrite files get a fresh copy of the
+tree for every run.
+
+Results go to --out as JSON; --compare checks them against a stored
+baseline and exits 1 when a tool got slower than --tolerance allows.
+
+Usage:
+  python3 tools/bench_tools.py [--scales 1,10,100] [--repeat 3]
+                               [--out build/bench/tools.json]
+                               [--compare ci/bench/baseline_tools.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import jsoncodec
+import synth_corpus
+from spec import REPO_ROOT
+
+SCHEMA = 1
+DEFAULT_OUT = REPO_ROOT / "build" / "bench" / "tools.json"
+DEFAULT_BASELINE = REPO_ROOT / "ci" / "bench" / "baseline_tools.json"
+
+# name -> (argv after the interpreter, runs with cwd=tree, rewrites files)
+# "{tree}" is replaced with the synthetic tree root
+TOOLS: Dict[str, tuple] = {
+    "validate_content": (["tools/validate_content.py", "--no-cache", "--root", "{tree}/content"], False, False),
+    "jsonl_guard": (["tools/jsonl_guard.py", "--check", "{tree}/content/*/v1/drills.jsonl"], False, False),
+    "allowlists_sync": (["tools/allowlists_sync.py", "--write"], True, True),
+    "fix_dispatcher_format": (["tooling/fix_dispatcher_format.py", "--check", "{tree}/prompts/dispatcher/_ALL.txt"], False, False),
+}
+
+
+def _run(argv: List[str], tree: Path, in_tree: bool) -> tuple:
+    cmd = [sys.executable] + [
+        str(REPO_ROOT / a) if i == 0 else a.replace("{tree}", str(tree))
+        for i, a in enumerate(argv)
+    ]
+    t0 = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=str(tree if in_tree else REPO_ROOT),
+                          stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - t0, proc.returncode
+
+
+def bench(scales: List[float], tools: List[str], repeat: int, workdir: Path) -> List[dict]:
+    results = []
+    for scale in scales:
+        pristine = workdir / f"scale_{scale:g}" / "pristine"
+        shutil.rmtree(pristine.parent, ignore_errors=True)
+        modules = max(1, round(synth_corpus.BASE_MODULES * scale))
+        stats = synth_corpus.generate(pristine, modules, synth_corpus.BASE_DRILLS, synth_corpus.BASE_DEMOS)
+        for name in tools:
+            argv, in_tree, mutates = TOOLS[name]
+            best, rc = float("inf"), 0
+            for _ in range(repeat):
+                tree = pristine
+                if mutates:
+                    tree = pristine.parent / "run"
+                    shutil.rmtree(tree, ignore_errors=True)
+                    shutil.copytree(pristine, tree)
+                secs, rc = _run(argv, tree, in_tree)
+                best = min(best, secs)
+            results.append({
+                "tool": name, "scale": scale, "modules": stats["modules"],
+                "drills": stats["drills"], "demos": stats["demos"],
+                "seconds": round(best, 4), "runs": repeat, "rc": rc,
+            })
+            print(f"{name:<24} x{scale:<6g} modules={stats['modules']:<6} {best:8.3f}s rc={rc}", flush=True)
+        shutil.rmtree(pristine.parent, ignore_errors=True)
+    return results
+
+
+def compare(results: List[dict], baseline: dict, tolerance: float, min_delta: float) -> List[str]:
+    """Return one message per (tool, scale) slower than baseline*(1+tolerance)."""
+    base = {(r["tool"], r["scale"]): r["seconds"] for r in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        old = base.get((r["tool"], r["scale"]))
+        if old is None:
+            continue
+        if r["seconds"] > old * (1 + tolerance) and r["seconds"] - old > min_delta:
+            regressions.append(f"{r['tool']} x{r['scale']:g}: {old:.3f}s -> {r['seconds']:.3f}s "
+                               f"(+{(r['seconds'] / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main(argv: List[str]) -> int:
+    ap = argparse.ArgumentParser(prog="bench_tools", description="Benchmark content tools on synthetic corpora.")
+    ap.add_argument("--scales", default="1,10,100", help="comma-separated multiples of today's corpus size")
+    ap.add_argument("--tools", default=",".join(TOOLS), help=f"subset of: {','.join(TOOLS)}")
+    ap.add_argument("--repeat", type=int, default=3, help="runs per tool and scale (best is kept)")
+    ap.add_argument("--out", default=str(DEFAULT_OUT), help="results JSON path")
+    ap.add_argument("--workdir", default=None, help="where synthetic trees are generated (default: temp dir)")
+    ap.add_argument("--compare", nargs="?", const=str(DEFAULT_BASELINE), default=None, metavar="BASELINE",
+                    help=f"fail on regressions against a baseline (default {DEFAULT_BASELINE.relative_to(REPO_ROOT)})")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown ratio (0.25 = 25%%)")
+    ap.add_argument("--min-delta", type=float, default=0.05, help="ignore slowdowns below this many seconds")
+    args = ap.parse_args(argv)
+
+    scales = [float(s) for s in args.scales.split(",") if s.strip()]
+    tools = [t.strip() for t in args.tools.split(",") if t.strip()]
+    unknown = [t for t in tools if t not in TOOLS]
+    if unknown:
+        print(f"unknown tool(s): {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    if args.workdir:
+        workdir = Path(args.workdir)
+        workdir.mkdir(parents=True, exist_ok=True)
+        results = bench(scales, tools, max(args.repeat, 1), workdir)
+    else:
+        with tempfile.TemporaryDirectory(prefix="bench_tools.") as tmp:
+            results = bench(scales, tools, max(args.repeat, 1), Path(tmp))
+
+    report = {
+        "schema": SCHEMA,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "json_backend": jsoncodec.BACKEND,
+        "results": results,
+    }
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    print(f"wrote {out}")
+
+    if args.compare:
+        try:
+            baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            print(f"baseline not usable ({e}); nothing to compare", file=sys.stderr)
+            return 0
+        regressions = compare(results, baseline, args.tolerance, args.min_delta)
+        for msg in regressions:
+            print(f"REGRESSION {msg}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
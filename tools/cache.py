@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Persistent per-file result cache for the content tools.
+
+Entries are keyed by file path and hold a content hash plus the tool's result
+for that content. A cache file is only trusted when its namespace matches,
+so bumping a tool version or editing the rule set (spec.py) invalidates every
+entry at once.
+
+Layout (JSON):
+  {"namespace": "<tool>:<tool version>:<ruleset version>",
+   "files": {"<path>": {"sha1": "<hex>", "result": <json>}}}
+
+Writes are atomic (temp file + os.replace). A missing, unreadable or foreign
+cache file is treated as empty. Stdlib only.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from spec import REPO_ROOT
+
+CACHE_DIR = REPO_ROOT / "build" / "cache"
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, path: Path, namespace: str):
+        self.path = Path(path)
+        self.namespace = namespace
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict) and data.get("namespace") == self.namespace:
+            files = data.get("files")
+            if isinstance(files, dict):
+                self.files = files
+
+    def get(self, key: str, digest: str) -> Optional[Any]:
+        """Return the cached result for key if its content hash matches."""
+        ent = self.files.get(key)
+        if ent is not None and ent.get("sha1") == digest:
+            self.hits += 1
+            return ent.get("result")
+        self.misses += 1
+        return None
+
+    def put(self, key: str, digest: str, result: Any) -> None:
+        ent = self.files.get(key)
+        if ent is None or ent.get("sha1") != digest or ent.get("result") != result:
+            self.files[key] = {"sha1": digest, "result": result}
+            self._dirty = True
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        payload = json.dumps(
+            {"namespace": self.namespace, "files": self.files},
+            ensure_ascii=True, sort_keys=True,
+        )
+        fd, tmp = tempfile.mkstemp(dir=str(self.path.parent), prefix=self.path.name + ".")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                fh.write(payload)
+            os.replace(tmp, self.path)
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+        self._dirty = False
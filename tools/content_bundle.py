@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Packed, indexed content bundle: content/*/v1/ compiled into one file.
+
+The app reads one file instead of four assets per module: the header and the
+index come first, so startup is one open and one read of the front of the
+file, and a module (or a single drill/demo record) is decompressed on demand.
+
+  python3 tools/content_bundle.py build  [--root content] [--out build/content.bundle]
+                                         [--codec zlib|lzma|none]
+  python3 tools/content_bundle.py verify [--bundle FILE] [--against content]
+  python3 tools/content_bundle.py info   [--bundle FILE]
+  python3 tools/content_bundle.py cat    MODULE KIND [--record N] [--bundle FILE]
+
+Builds are deterministic (no timestamps; modules sorted by name), and the
+output is rewritten only when its bytes change.
+
+Binary layout (version 1). All integers are little-endian and unsigned.
+
+  Header, 32 bytes at offset 0:
+    0   8s   magic            b"CBUNDLE\\0"
+    8   u16  version          1
+    10  u8   codec            0 none, 1 zlib, 2 lzma (xz container)
+    11  u8   reserved         0
+    12  u32  module_count
+    16  u32  index_size       bytes of the compressed index that follows
+    20  u32  index_raw_size   bytes of the index once decompressed
+    24  u64  data_offset      32 + index_size: where section blocks start
+
+  Index (compressed with the codec), four tables back to back:
+    u32 module_count, u32 section_count, u32 record_count, u32 names_size
+    modules[module_count], 16 bytes each, sorted by name (binary search):
+      u32 name_offset, u32 name_length    into names (UTF-8)
+      u32 first_section, u32 section_count
+    sections[section_count], 32 bytes each, one per file of a module:
+      u8  kind                 0 theory.md, 1 demos.jsonl, 2 drills.jsonl, 3 spec.yml
+      3x  reserved             0
+      u32 crc32                zlib.crc32 of the uncompressed file bytes
+      u64 offset               of the compressed block, from data_offset
+      u32 compressed_size
+      u32 size                 uncompressed: the file's bytes exactly
+      u32 first_record, u32 record_count   (0, 0 for theory.md / spec.yml)
+    records[record_count], 12 bytes each, one per non-blank JSONL line:
+      u32 offset, u32 length   of the line in the uncompressed section,
+                               newline and a line-1 BOM excluded
+      u32 line                 1-based line number in the source file
+    names[names_size]
+
+  Data: the section blocks, each compressed on its own.
+
+A record is decoded by decompressing its section (one module's drills or
+demos, a few KB) and slicing it; compressing records one by one would lose
+most of the ratio. Stdlib only.
+"""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import lzma
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import jsoncodec
+import loader
+from corpus import BOM, split_lines
+from spec import CONTENT_DIR, REPO_ROOT
+
+MAGIC = b"CBUNDLE\0"
+VERSION = 1
+KINDS = ("theory.md", "demos.jsonl", "drills.jsonl", "spec.yml")
+JSONL_KINDS = {1, 2}
+CODECS = {"none": 0, "zlib": 1, "lzma": 2}
+DEFAULT_OUT = REPO_ROOT / "build" / "content.bundle"
+
+HEADER = struct.Struct("<8sHBBIIIQ")
+COUNTS = struct.Struct("<IIII")
+MODULE = struct.Struct("<IIII")
+SECTION = struct.Struct("<B3xIQIIII")
+RECORD = struct.Struct("<III")
+
+
+class BundleError(Exception):
+    pass
+
+
+def compress(codec: int, data: bytes) -> bytes:
+    if codec == 1:
+        return zlib.compress(data, 9)
+    if codec == 2:
+        return lzma.compress(data, preset=9)
+    return data
+
+
+def decompress(codec: int, data: bytes, what: str = "block") -> bytes:
+    """Inverse of compress(); corrupt input raises BundleError naming what."""
+    try:
+        if codec == 1:
+            return zlib.decompress(data)
+        if codec == 2:
+            return lzma.decompress(data)
+    except (zlib.error, lzma.LZMAError) as e:
+        raise BundleError(f"{what} does not decompress ({e})") from None
+    if codec != 0:
+        raise BundleError(f"unknown codec {codec}")
+    return data
+
+
+def jsonl_records(data: bytes) -> List[Tuple[int, int, int]]:
+    """(offset, length, line) of every non-blank line of a JSONL file's bytes."""
+    out = []
+    pos = 0
+    text = data.decode("utf-8")
+    for no, (raw, nl) in enumerate(split_lines(text), start=1):
+        size = len(raw.encode("utf-8"))
+        start = pos
+        pos += size + len(nl.encode("utf-8"))
+        if no == 1 and raw.startswith(BOM):
+            raw = raw[1:]
+            start += len(BOM.encode("utf-8"))
+            size -= len(BOM.encode("utf-8"))
+        if raw.strip():
+            out.append((start, size, no))
+    return out
+
+
+def build(root: Path, codec: str = "zlib") -> Tuple[bytes, Dict[str, int]]:
+    """Compile root/<module>/v1/ into bundle bytes; return (bytes, stats)."""
+    code = CODECS[codec]
+    modules, sections, records = [], [], []
+    names = bytearray()
+    blocks: List[bytes] = []
+    data_size = raw_size = 0
+    for name, _, present in loader.discover(Path(root), KINDS):
+        first = len(sections)
+        for kind, fname in enumerate(KINDS):
+            path = present.get(fname)
+            if path is None:
+                continue
+            raw = path.read_bytes()
+            recs = jsonl_records(raw) if kind in JSONL_KINDS else []
+            block = compress(code, raw)
+            sections.append((kind, zlib.crc32(raw), data_size, len(block), len(raw),
+                             len(records) if recs else 0, len(recs)))
+            records.extend(recs)
+            blocks.append(block)
+            data_size += len(block)
+            raw_size += len(raw)
+        enc = name.encode("utf-8")
+        modules.append((len(names), len(enc), first, len(sections) - first))
+        names += enc
+    index = bytearray(COUNTS.pack(len(modules), len(sections), len(records), len(names)))
+    for m in modules:
+        index += MODULE.pack(*m)
+    for s in sections:
+        index += SECTION.pack(*s)
+    for r in records:
+        index += RECORD.pack(*r)
+    index += names
+    packed = compress(code, bytes(index))
+    header = HEADER.pack(MAGIC, VERSION, code, 0, len(modules), len(packed), len(index), HEADER.size + len(packed))
+    out = b"".join([header, packed, *blocks])
+    return out, {"modules": len(modules), "sections": len(sections), "records": len(records),
+                 "source_bytes": raw_size, "bundle_bytes": len(out), "index_bytes": len(packed)}
+
+
+def write_if_changed(path: Path, data: bytes) -> bool:
+    """Atomically replace path with data unless it already holds exactly data."""
+    path = Path(path)
+    try:
+        if path.stat().st_size == len(data) and path.read_bytes() == data:
+            return False
+    except OSError:
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=path.name + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        try:
+            shutil.copymode(path, tmp)
+        except OSError:
+            os.chmod(tmp, 0o644)  # mkstemp creates 0600; a build artifact is world-readable
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+    return True
+
+
+class Bundle:
+    """Reader: one open file; header and index read up front, sections on demand."""
+
+    def __init__(self, path: Path = DEFAULT_OUT):
+        self.path = Path(path)
+        self._fh = open(self.path, "rb")
+        try:
+            self._read_index()
+        except BaseException:
+            self._fh.close()
+            raise
+        self._cache: Tuple[int, bytes] = (-1, b"")
+
+    def _read_index(self) -> None:
+        head = self._fh.read(HEADER.size)
+        if len(head) != HEADER.size:
+            raise BundleError(f"{self.path}: truncated header")
+        magic, version, self.codec, _, count, isize, iraw, self.data_offset = HEADER.unpack(head)
+        if magic != MAGIC:
+            raise BundleError(f"{self.path}: not a content bundle")
+        if version != VERSION:
+            raise BundleError(f"{self.path}: bundle version {version}, reader supports {VERSION}")
+        try:
+            index = decompress(self.codec, self._fh.read(isize), "index")
+        except BundleError as e:
+            raise BundleError(f"{self.path}: {e}") from None
+        if len(index) != iraw or len(index) < COUNTS.size:
+            raise BundleError(f"{self.path}: index size {len(index)} != {iraw}")
+        n_mod, n_sec, n_rec, n_names = COUNTS.unpack_from(index, 0)
+        if n_mod != count:
+            raise BundleError(f"{self.path}: module count {n_mod} != header {count}")
+        need = COUNTS.size + n_mod * MODULE.size + n_sec * SECTION.size + n_rec * RECORD.size + n_names
+        if need != len(index):
+            raise BundleError(f"{self.path}: index tables take {need} bytes, index has {len(index)}")
+        pos = COUNTS.size
+        self.modules = [MODULE.unpack_from(index, pos + i * MODULE.size) for i in range(n_mod)]
+        pos += n_mod * MODULE.size
+        self.sections = [SECTION.unpack_from(index, pos + i * SECTION.size) for i in range(n_sec)]
+        pos += n_sec * SECTION.size
+        self._records = memoryview(index)[pos:pos + n_rec * RECORD.size]
+        self.record_total = n_rec
+        pos += n_rec * RECORD.size
+        names = bytes(index[pos:pos + n_names])
+        try:
+            self.names = [names[o:o + n].decode("utf-8") for o, n, _, _ in self.modules]
+        except UnicodeDecodeError:
+            raise BundleError(f"{self.path}: module names are not UTF-8") from None
+        if any(first + n > n_sec for _, _, first, n in self.modules) or \
+                any(first + n > n_rec for *_, first, n in self.sections):
+            raise BundleError(f"{self.path}: index points past its own tables")
+
+    def close(self) -> None:
+        self._fh.close()
+
+    def __enter__(self) -> "Bundle":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def module_index(self, name: str) -> int:
+        i = bisect.bisect_left(self.names, name)
+        if i == len(self.names) or self.names[i] != name:
+            raise KeyError(f"no module {name!r}")
+        return i
+
+    def section_index(self, name: str, kind: str) -> int:
+        _, _, first, count = self.modules[self.module_index(name)]
+        k = KINDS.index(kind)
+        for s in range(first, first + count):
+            if self.sections[s][0] == k:
+                return s
+        raise KeyError(f"no {kind} in module {name!r}")
+
+    def section_bytes(self, s: int) -> bytes:
+        """Uncompressed bytes of section s (the last one read is cached)."""
+        if self._cache[0] == s:
+            return self._cache[1]
+        kind, crc, offset, csize, size, _, _ = self.sections[s]
+        self._fh.seek(self.data_offset + offset)
+        data = decompress(self.codec, self._fh.read(csize), f"{self.path}: section {s} ({KINDS[kind]})")
+        if len(data) != size or zlib.crc32(data) != crc:
+            raise BundleError(f"{self.path}: section {s} ({KINDS[kind]}) is corrupt")
+        self._cache = (s, data)
+        return data
+
+    def file(self, name: str, kind: str) -> bytes:
+        """The original bytes of content/<name>/v1/<kind>."""
+        return self.section_bytes(self.section_index(name, kind))
+
+    def module(self, name: str) -> Dict[str, bytes]:
+        _, _, first, count = self.modules[self.module_index(name)]
+        return {KINDS[self.sections[s][0]]: self.section_bytes(s) for s in range(first, first + count)}
+
+    def record_count(self, name: str, kind: str) -> int:
+        return self.sections[self.section_index(name, kind)][6]
+
+    def record(self, name: str, kind: str, i: int) -> Tuple[int, Any]:
+        """(line, decoded object) of the i-th non-blank line of a JSONL section."""
+        s = self.section_index(name, kind)
+        _, _, _, _, _, first, count = self.sections[s]
+        if not 0 <= i < count:
+            raise IndexError(f"{name}/{kind}: no record {i} ({count} records)")
+        offset, length, line = RECORD.unpack_from(self._records, (first + i) * RECORD.size)
+        data = self.section_bytes(s)
+        return line, jsoncodec.loads(data[offset:offset + length].decode("utf-8"))
+
+
+def verify(bundle: Bundle, against: Optional[Path] = None) -> List[str]:
+    """Check every section (crc, sizes, record spans) and optionally compare with a source tree."""
+    problems = []
+    if bundle.names != sorted(bundle.names):
+        problems.append("module table is not sorted by name")
+    for m, (name, (_, _, first, count)) in enumerate(zip(bundle.names, bundle.modules)):
+        for s in range(first, first + count):
+            kind, _, _, _, _, rfirst, rcount = bundle.sections[s]
+            try:
+                data = bundle.section_bytes(s)
+            except BundleError as e:
+                problems.append(f"{name}/{KINDS[kind]}: {e}")
+                continue
+            for r in range(rfirst, rfirst + rcount):
+                offset, length, line = RECORD.unpack_from(bundle._records, r * RECORD.size)
+                if offset + length > len(data):
+                    problems.append(f"{name}/{KINDS[kind]}:{line}: record outside its section")
+                    continue
+                try:
+                    jsoncodec.loads(data[offset:offset + length].decode("utf-8"))
+                except ValueError as e:
+                    problems.append(f"{name}/{KINDS[kind]}:{line}: record does not decode ({e})")
+    if against is not None:
+        source = {name: present for name, _, present in loader.discover(Path(against), KINDS)}
+        for name in sorted(set(source) - set(bundle.names)):
+            problems.append(f"{name}: in {against} but not in the bundle")
+        for name in sorted(set(bundle.names) - set(source)):
+            problems.append(f"{name}: in the bundle but not in {against}")
+        for name in sorted(set(source) & set(bundle.names)):
+            have = bundle.module(name)
+            for fname in KINDS:
+                path = source[name].get(fname)
+                if path is None and fname not in have:
+                    continue
+                if path is None or fname not in have or path.read_bytes() != have[fname]:
+                    problems.append(f"{name}/{fname}: differs from {against}")
+    return problems
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="content_bundle", description="Build, verify and read the packed content bundle.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="compile content/*/v1/ into one bundle")
+    b.add_argument("--root", default=str(CONTENT_DIR), help="content root (default: repo content/)")
+    b.add_argument("--out", default=str(DEFAULT_OUT), help=f"bundle path (default: {DEFAULT_OUT.relative_to(REPO_ROOT)})")
+    b.add_argument("--codec", choices=CODECS, default="zlib", help="block compression (default: zlib)")
+    v = sub.add_parser("verify", help="check a bundle (and compare it with a content tree)")
+    v.add_argument("--bundle", default=str(DEFAULT_OUT))
+    v.add_argument("--against", metavar="ROOT", help="content root the bundle must match byte for byte")
+    i = sub.add_parser("info", help="print header and index totals")
+    i.add_argument("--bundle", default=str(DEFAULT_OUT))
+    c = sub.add_parser("cat", help="print one module file, or one record of a JSONL file")
+    c.add_argument("module")
+    c.add_argument("kind", choices=KINDS)
+    c.add_argument("--record", type=int, metavar="N", help="0-based record of a JSONL file, printed as JSON")
+    c.add_argument("--bundle", default=str(DEFAULT_OUT))
+    args = ap.parse_args(argv)
+
+    if args.cmd == "build":
+        data, stats = build(Path(args.root), args.codec)
+        changed = write_if_changed(Path(args.out), data)
+        print(f"{'wrote' if changed else 'up to date'} {args.out}: {stats['modules']} modules, "
+              f"{stats['records']} records, {stats['source_bytes']} -> {stats['bundle_bytes']} bytes")
+        return 0
+    try:
+        with Bundle(Path(args.bundle)) as bundle:
+            if args.cmd == "info":
+                print(f"{args.bundle}: version {VERSION}, codec "
+                      f"{next(k for k, v in CODECS.items() if v == bundle.codec)}, {len(bundle.names)} modules, "
+                      f"{len(bundle.sections)} sections, {bundle.record_total} records, data at {bundle.data_offset}")
+                return 0
+            if args.cmd == "cat":
+                if args.record is None:
+                    sys.stdout.buffer.write(bundle.file(args.module, args.kind))
+                else:
+                    line, obj = bundle.record(args.module, args.kind, args.record)
+                    print(jsoncodec.dumps(obj, ensure_ascii=False))
+                return 0
+            problems = verify(bundle, Path(args.against) if args.against else None)
+    except BundleError as e:
+        if args.cmd != "verify":
+            print(f"content_bundle: {e}", file=sys.stderr)
+            return 2
+        problems = [str(e)]  # a bundle that cannot be opened is a verify finding
+    except (OSError, KeyError, IndexError, ValueError) as e:
+        print(f"content_bundle: {e.args[0] if isinstance(e, KeyError) else e}", file=sys.stderr)
+        return 2
+    for p in problems:
+        print(f"[BAD] {p}")
+    print(f"verify: {len(problems)} problem(s)")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
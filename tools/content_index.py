@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Queryable SQLite index of every drill and demo record.
+
+One row per parsed JSONL line of content/*/v1/{drills,demos}.jsonl:
+
+  records(id, module, kind, file, line, offset, target, spot_kind, sha1)
+
+offset is the byte offset of the line in its file and sha1 hashes the line
+body, so a record can be re-read or compared without parsing the file.
+id, target and spot_kind are NULL unless the value is a string. A files
+table keeps (path, mtime_ns, size, sha1, bad_lines, bom, invalid_records)
+per file; invalid_records counts lines that parse but are not objects or
+have a non-string target (collect_targets rejects those files).
+
+refresh() is incremental: files whose mtime and size are unchanged are not
+opened, files whose content hash is unchanged are not re-parsed, and rows of
+deleted files are dropped. The index lives in build/cache/content_index.sqlite
+and is rebuilt from scratch when the schema version or content root changes.
+
+Usage:
+  python3 tools/content_index.py refresh
+  python3 tools/content_index.py modules --target probe_turns
+  python3 tools/content_index.py records --spot-kind l3_turn_probe [--kind drills]
+  python3 tools/content_index.py sql "SELECT target, COUNT(*) FROM records GROUP BY 1"
+
+Every query refreshes the index first unless --no-refresh is given.
+
+Stdlib only.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from cache import CACHE_DIR
+from corpus import BOM, Corpus, ContentFile, preload
+from instrument import METRICS, add_arguments, session
+from spec import CONTENT_DIR
+
+SCHEMA_VERSION = 2
+INDEX_PATH = CACHE_DIR / "content_index.sqlite"
+INDEXED_KINDS = ("drills", "demos")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    module TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha1 TEXT NOT NULL,
+    bad_lines INTEGER NOT NULL,
+    bom INTEGER NOT NULL,
+    invalid_records INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS records (
+    id TEXT,
+    module TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    file TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    target TEXT,
+    spot_kind TEXT,
+    sha1 TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS records_file ON records(file);
+CREATE INDEX IF NOT EXISTS records_module ON records(module, kind);
+CREATE INDEX IF NOT EXISTS records_target ON records(target);
+CREATE INDEX IF NOT EXISTS records_spot_kind ON records(spot_kind);
+CREATE INDEX IF NOT EXISTS records_id ON records(id);
+"""
+
+
+def _field(obj, key: str) -> Optional[str]:
+    # non-string values (e.g. a list target) are stored as NULL, see _invalid
+    v = obj.get(key) if isinstance(obj, dict) else None
+    return v if isinstance(v, str) else None
+
+
+def _invalid(obj) -> bool:
+    # what allowlists_sync.collect_targets rejects in a line that parses
+    return not isinstance(obj, dict) or obj.get("target") is not None and not isinstance(obj["target"], str)
+
+
+def _rows(cf: ContentFile) -> Tuple[List[tuple], int, int]:
+    """Return (record rows, bad line count, invalid record count) for one parsed file."""
+    rows, bad, invalid, offset = [], 0, 0, 0
+    path = str(cf.path)
+    for ln in cf.lines:
+        start = offset
+        offset += len(ln.raw.encode("utf-8")) + len(ln.nl)
+        if ln.blank:
+            continue
+        if not ln.ok:
+            bad += 1
+            continue
+        obj = ln.obj
+        invalid += _invalid(obj)
+        rows.append((
+            _field(obj, "id"), cf.module, cf.kind, path, ln.no, start,
+            _field(obj, "target"), _field(obj, "spot_kind"),
+            hashlib.sha1(ln.body.encode("utf-8")).hexdigest(),
+        ))
+    return rows, bad, invalid
+
+
+class ContentIndex:
+    def __init__(self, path: Path = INDEX_PATH, root: Path = CONTENT_DIR):
+        self.path = Path(path)
+        self.root = Path(root)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path))
+        self._open()
+
+    def _open(self) -> None:
+        version = self.db.execute("PRAGMA user_version").fetchone()[0]
+        root = str(self.root.resolve())
+        stale = version != SCHEMA_VERSION
+        if not stale:
+            row = self.db.execute("SELECT value FROM meta WHERE key = 'root'").fetchone()
+            stale = row is None or row[0] != root
+        if stale:
+            self.db.executescript(
+                "DROP TABLE IF EXISTS records; DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS meta;"
+            )
+        self.db.executescript(SCHEMA)
+        self.db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.db.execute("INSERT OR REPLACE INTO meta(key, value) VALUES ('root', ?)", (root,))
+        self.db.commit()
+
+    def close(self) -> None:
+        self.db.close()
+
+    def refresh(self, corpus: Optional[Corpus] = None) -> Dict[str, int]:
+        """Bring the index up to date with the corpus; return change stats."""
+        if corpus is None:
+            corpus = Corpus(self.root)
+        stats = {"files": 0, "unchanged": 0, "touched": 0, "reindexed": 0, "removed": 0}
+        known = {
+            path: (mtime_ns, size, sha1)
+            for path, mtime_ns, size, sha1 in self.db.execute("SELECT path, mtime_ns, size, sha1 FROM files")
+        }
+        seen = set()
+        with METRICS.phase("index.refresh"), self.db:
+            stale = []
+            for kind in INDEXED_KINDS:
+                for cf in corpus.files(kind):
+                    path = str(cf.path)
+                    seen.add(path)
+                    stats["files"] += 1
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    old = known.get(path)
+                    if old is not None and old[0] == st.st_mtime_ns and old[1] == st.st_size:
+                        stats["unchanged"] += 1
+                        continue
+                    stale.append((cf, st, old))
+            preload([cf for cf, _, _ in stale])
+            for cf, st, old in stale:
+                path = str(cf.path)
+                text = cf.text
+                if cf.read_error is not None:
+                    continue
+                digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+                if old is not None and old[2] == digest:
+                    self.db.execute("UPDATE files SET mtime_ns = ?, size = ? WHERE path = ?",
+                                    (st.st_mtime_ns, st.st_size, path))
+                    stats["touched"] += 1
+                    continue
+                self._index_file(cf, st, digest)
+                stats["reindexed"] += 1
+            for path in set(known) - seen:
+                self.db.execute("DELETE FROM records WHERE file = ?", (path,))
+                self.db.execute("DELETE FROM files WHERE path = ?", (path,))
+                stats["removed"] += 1
+        METRICS.count("index.files_reindexed", stats["reindexed"])
+        return stats
+
+    def _index_file(self, cf: ContentFile, st: os.stat_result, digest: str) -> None:
+        path = str(cf.path)
+        rows, bad, invalid = _rows(cf)
+        self.db.execute("DELETE FROM records WHERE file = ?", (path,))
+        self.db.executemany("INSERT INTO records VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        self.db.execute(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (path, cf.module, cf.kind, st.st_mtime_ns, st.st_size, digest, bad, int(cf.text.startswith(BOM)), invalid),
+        )
+
+    def dirty_files(self, kind: str) -> List[str]:
+        """Paths of files with unparsable lines or a BOM (what jsonl_guard would touch)."""
+        return [p for (p,) in self.db.execute(
+            "SELECT path FROM files WHERE kind = ? AND (bad_lines > 0 OR bom = 1) ORDER BY path", (kind,))]
+
+    def invalid_files(self, kind: str) -> List[str]:
+        """Paths of files with records that parse but are not usable (see _invalid)."""
+        return [p for (p,) in self.db.execute(
+            "SELECT path FROM files WHERE kind = ? AND invalid_records > 0 ORDER BY path", (kind,))]
+
+    def targets(self, module: str) -> List[str]:
+        """Distinct drill targets of a module, sorted (allowlist content)."""
+        return [t for (t,) in self.db.execute(
+            "SELECT DISTINCT target FROM records WHERE kind = 'drills' AND module = ? "
+            "AND target IS NOT NULL AND target != '' ORDER BY target", (module,))]
+
+    def modules_using(self, target: str, kind: Optional[str] = None) -> List[str]:
+        sql = "SELECT DISTINCT module FROM records WHERE target = ?"
+        args: list = [target]
+        if kind:
+            sql += " AND kind = ?"
+            args.append(kind)
+        return [m for (m,) in self.db.execute(sql + " ORDER BY module", args)]
+
+    def records(self, target: Optional[str] = None, spot_kind: Optional[str] = None,
+                module: Optional[str] = None, kind: Optional[str] = None) -> List[tuple]:
+        where, args = [], []
+        for col, val in (("target", target), ("spot_kind", spot_kind), ("module", module), ("kind", kind)):
+            if val is not None:
+                where.append(f"{col} = ?")
+                args.append(val)
+        sql = "SELECT id, module, kind, file, line, offset, target, spot_kind FROM records"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        return self.db.execute(sql + " ORDER BY file, line", args).fetchall()
+
+
+def main(argv: List[str]) -> int:
+    ap = argparse.ArgumentParser(prog="content_index", description="SQLite index of drills and demos.")
+    ap.add_argument("--db", default=str(INDEX_PATH), help="index file (default: build/cache/content_index.sqlite)")
+    ap.add_argument("--root", default=str(CONTENT_DIR), help="content root (default: repo content/)")
+    ap.add_argument("--no-refresh", action="store_true", help="query the index as is")
+    add_arguments(ap)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("refresh", help="update the index for changed files")
+    q = sub.add_parser("modules", help="modules whose records use a target")
+    q.add_argument("--target", required=True)
+    q.add_argument("--kind", choices=INDEXED_KINDS)
+    q = sub.add_parser("records", help="records matching all given filters")
+    q.add_argument("--target")
+    q.add_argument("--spot-kind")
+    q.add_argument("--module")
+    q.add_argument("--kind", choices=INDEXED_KINDS)
+    q = sub.add_parser("sql", help="run a read-only SQL query")
+    q.add_argument("query")
+    args = ap.parse_args(argv)
+
+    with session("content_index", timings=args.timings, profile=args.profile):
+        index = ContentIndex(Path(args.db), Path(args.root))
+        try:
+            if args.cmd == "refresh" or not args.no_refresh:
+                stats = index.refresh()
+                if args.cmd == "refresh":
+                    print(" ".join(f"{k}={v}" for k, v in stats.items()))
+                    return 0
+            if args.cmd == "modules":
+                for m in index.modules_using(args.target, args.kind):
+                    print(m)
+            elif args.cmd == "records":
+                for rid, module, kind, path, line, offset, target, spot in index.records(
+                        args.target, args.spot_kind, args.module, args.kind):
+                    print(f"{path}:{line}\t{rid}\t{target}\t{spot}")
+            else:
+                ro = sqlite3.connect(f"file:{index.path}?mode=ro", uri=True)
+                try:
+                    for row in ro.execute(args.query):
+                        print("\t".join("" if v is None else str(v) for v in row))
+                except sqlite3.Error as e:
+                    print(f"sql error: {e}", file=sys.stderr)
+                    return 2
+                finally:
+                    ro.close()
+        finally:
+            index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
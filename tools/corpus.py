@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+In-memory content corpus shared by the content tools.
+
+Every content/<module>/v1/ file is read at most once and every JSONL line is
+parsed at most once by ContentFile.lines. Passes over the whole corpus that
+do not need the lines again (validate_content, dupes, allowlists_sync) read
+them through records.py instead, which does not cache them.
+
+Checks, fixers and generators (validate_content, jsonl_guard,
+allowlists_sync, migrate_tokens) take a Corpus or ContentFile instead of
+walking the tree and re-reading files on their own.
+
+theory.md files are indexed the same way: ContentFile.theory is the
+theory_index.parse() of the text, built on first use.
+
+Fixers that rewrite a file go through ContentFile.write_text() so later
+consumers of the same corpus see the new content.
+
+Modules are discovered and files read through loader.py: one os.scandir per
+directory, and Corpus.preload() reads many files concurrently for tools that
+are about to touch them all.
+
+Stdlib only.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import jsoncodec
+import loader
+import theory_index
+from instrument import METRICS
+from spec import CONTENT_DIR
+
+BOM = "\ufeff"
+
+# kind -> file name inside content/<module>/v1/
+FILENAMES = {
+    "theory": "theory.md",
+    "demos": "demos.jsonl",
+    "drills": "drills.jsonl",
+}
+KINDS = tuple(FILENAMES)
+
+
+class Line:
+    """One physical line of a JSONL file, parsed once.
+
+    raw   -- line content without the newline (BOM kept, as read)
+    body  -- raw with a leading BOM removed on line 1
+    nl    -- the original newline ("\\n", "\\r\\n", "\\r" or "")
+    obj   -- parsed value, or None for blank/bad lines
+    error -- JSONDecodeError for bad lines, else None
+    """
+
+    __slots__ = ("no", "raw", "body", "nl", "obj", "error")
+
+    def __init__(self, no: int, raw: str, nl: str):
+        self.no = no
+        self.raw = raw
+        self.body = raw[1:] if no == 1 and raw.startswith(BOM) else raw
+        self.nl = nl
+        self.obj: Any = None
+        self.error: Optional[jsoncodec.JSONDecodeError] = None
+        if self.body.strip():
+            try:
+                self.obj = jsoncodec.loads(self.body)
+            except jsoncodec.JSONDecodeError as e:
+                self.error = e
+
+    @property
+    def blank(self) -> bool:
+        return not self.body.strip()
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def split_lines(text: str) -> List[Tuple[str, str]]:
+    """Split text into (content, newline) pairs, preserving newline style."""
+    out: List[Tuple[str, str]] = []
+    for raw in text.splitlines(keepends=True):
+        if raw.endswith("\r\n"):
+            out.append((raw[:-2], "\r\n"))
+        elif raw.endswith("\n") or raw.endswith("\r"):
+            out.append((raw[:-1], raw[-1]))
+        else:
+            out.append((raw, ""))
+    return out
+
+
+def atomic_write(path: Path, text: str) -> None:
+    """Replace path with text via a temp file in the same directory."""
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=path.name + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as fh:
+            fh.write(text)
+        try:
+            shutil.copymode(path, tmp)
+        except OSError:
+            pass
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+
+
+class ContentFile:
+    """A single content file; text and parsed lines are loaded lazily and cached."""
+
+    def __init__(self, path: Path, module: str = "", kind: str = ""):
+        self.path = Path(path)
+        self.module = module
+        self.kind = kind
+        self.read_error: Optional[Exception] = None
+        self._text: Optional[str] = None
+        self._lines: Optional[List[Line]] = None
+        self._theory: Optional[theory_index.TheoryIndex] = None
+
+    def __repr__(self) -> str:
+        return f"ContentFile({str(self.path)!r})"
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            with METRICS.phase("read"):
+                try:
+                    # newline="" keeps \r\n / \r so fixers can write them back as-is
+                    with open(self.path, "r", encoding="utf-8", newline="") as fh:
+                        text, error = fh.read(), None
+                except Exception as e:
+                    text, error = "", e
+            self._loaded(text, error)
+        return self._text
+
+    @property
+    def loaded(self) -> bool:
+        return self._text is not None
+
+    def _loaded(self, text: str, error: Optional[Exception]) -> None:
+        self._text = text
+        self.read_error = error
+        METRICS.count("files_read")
+        METRICS.count("chars_read", len(text))
+
+    @property
+    def has_bom(self) -> bool:
+        return self.text.startswith(BOM)
+
+    @property
+    def parsed(self) -> bool:
+        """True once lines have been split and parsed (they are then cached)."""
+        return self._lines is not None
+
+    @property
+    def lines(self) -> List[Line]:
+        if self._lines is None:
+            text = self.text
+            with METRICS.phase("parse"):
+                self._lines = [
+                    Line(no, raw, nl)
+                    for no, (raw, nl) in enumerate(split_lines(text), start=1)
+                ]
+            METRICS.count("lines_parsed", len(self._lines))
+            METRICS.count("parse_errors", sum(1 for ln in self._lines if ln.error is not None))
+        return self._lines
+
+    @property
+    def theory(self) -> theory_index.TheoryIndex:
+        """Heading tree, mentions and sizing hits of a theory.md (theory_index.parse), built once."""
+        if self._theory is None:
+            text = self.text
+            with METRICS.phase("parse"):
+                self._theory = theory_index.parse(text)
+            METRICS.count("theory_indexed")
+        return self._theory
+
+    def records(self) -> Iterator[Tuple[int, Any]]:
+        """Yield (line_no, obj) for every line that parsed."""
+        for ln in self.lines:
+            if not ln.blank and ln.ok:
+                yield ln.no, ln.obj
+
+    def write_text(self, text: str, atomic: bool = False) -> None:
+        """Write new content and refresh the cached view of this file.
+
+        atomic=True writes a temp file next to the original and renames it
+        over, so readers never see a half-written file.
+        """
+        with METRICS.phase("write"):
+            if atomic:
+                atomic_write(self.path, text)
+            else:
+                with open(self.path, "w", encoding="utf-8", newline="") as fh:
+                    fh.write(text)
+        METRICS.count("files_written")
+        METRICS.count("bytes_written", len(text.encode("utf-8")))
+        self.set_text(text)
+
+    def set_text(self, text: str) -> None:
+        self._text = text
+        self._lines = None
+        self._theory = None
+        self.read_error = None
+
+    def reload(self) -> None:
+        self._text = None
+        self._lines = None
+        self._theory = None
+        self.read_error = None
+
+
+def preload(files: List[ContentFile], threads: int = loader.DEFAULT_THREADS) -> int:
+    """Read the files not read yet concurrently (loader.load); return how many were read."""
+    todo = {cf.path: cf for cf in files if not cf.loaded}
+    with METRICS.phase("read"):
+        for path, text, error in loader.load(list(todo), threads):
+            todo[path]._loaded(text, error)
+    return len(todo)
+
+
+class Module:
+    """content/<name>/v1/ with whichever of theory/demos/drills exist."""
+
+    def __init__(self, name: str, path: Path, present: Optional[Dict[str, Path]] = None):
+        self.name = name
+        self.path = path
+        self.files: Dict[str, ContentFile] = {}
+        for kind, fname in FILENAMES.items():
+            # present: the directory listing from loader.discover(), saves a stat per file
+            if present is not None:
+                p = present.get(fname)
+            else:
+                p = path / fname
+                p = p if p.exists() else None
+            if p is not None:
+                self.files[kind] = ContentFile(p, module=name, kind=kind)
+
+    def get(self, kind: str) -> Optional[ContentFile]:
+        return self.files.get(kind)
+
+
+class Corpus:
+    """All modules under a content root, in stable (sorted) order."""
+
+    def __init__(self, root: Path = CONTENT_DIR, modules: Optional[List[str]] = None):
+        self.root = Path(root)
+        self.modules: List[Module] = []
+        if modules is not None:
+            # look the named modules up directly: cost follows len(modules), not the root
+            for name in sorted(set(modules)):
+                mod_dir = self.root / name / "v1"
+                if name and "/" not in name and name not in (".", "..") and mod_dir.is_dir():
+                    self.modules.append(Module(name, mod_dir))
+        else:
+            for name, mod_dir, present in loader.discover(self.root, FILENAMES.values()):
+                self.modules.append(Module(name, mod_dir, present))
+        self._by_name = {m.name: m for m in self.modules}
+
+    def files(self, kind: str) -> List[ContentFile]:
+        return [m.files[kind] for m in self.modules if kind in m.files]
+
+    def all_files(self, kinds: Optional[Tuple[str, ...]] = None) -> List[ContentFile]:
+        """Files of the given kinds (default all) in module order."""
+        return [f for m in self.modules for k, f in m.files.items() if kinds is None or k in kinds]
+
+    def preload(self, kinds: Optional[Tuple[str, ...]] = None, threads: int = loader.DEFAULT_THREADS) -> int:
+        """Read every file of the given kinds (default all) concurrently; see preload()."""
+        return preload(self.all_files(kinds), threads)
+
+    def module(self, name: str) -> Optional[Module]:
+        return self._by_name.get(name)
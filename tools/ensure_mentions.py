@@ -1,9 +1,34 @@
 #!/usr/bin/env python3
+# tools/ensure_mentions.py
+# дописывает в theory.md строку с базовыми семействами и размерами, если чего-то не хватает;
+# упоминания берутся из общего индекса (ContentFile.theory), что и в validate_content
+import argparse, sys
 from pathlib import Path
-NEED = ["size_down_dry","size_up_wet","small_cbet_33","half_pot_50","big_bet_75"]
-for md in Path("content").glob("**/v1/theory.md"):
-    txt = md.read_text(encoding="utf-8")
-    if not all(k in txt for k in NEED):
-        txt = txt.rstrip()+"\n\n_This module uses the fixed families and sizes: size_down_dry, size_up_wet; small_cbet_33, half_pot_50, big_bet_75._\n"
-        md.write_text(txt, encoding="utf-8")
-        print(f"[MENTIONS] {md}")
+from spec import CONTENT_DIR
+from corpus import Corpus
+
+NOTE = "\n\n_This module uses the fixed families and sizes: size_down_dry, size_up_wet; small_cbet_33, half_pot_50, big_bet_75._\n"
+
+def run(corpus: Corpus, write: bool = True) -> int:
+    """Append NOTE to every theory.md missing a THEORY_MENTIONS token; return how many."""
+    changed = 0
+    corpus.preload(("theory",))
+    for f in corpus.files("theory"):
+        if f.read_error is not None or not f.theory.missing_mentions():
+            continue
+        if write:
+            f.write_text(f.text.rstrip() + NOTE, atomic=True)
+        print(f"[MENTIONS] {f.path}")
+        changed += 1
+    return changed
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="ensure_mentions", description="Append the size family note to theory.md files missing it.")
+    ap.add_argument("--root", default=str(CONTENT_DIR), help="content root (default: repo content/)")
+    ap.add_argument("--check", action="store_true", help="list files that would change, do not write (exit 1 if any)")
+    args = ap.parse_args(argv)
+    changed = run(Corpus(Path(args.root)), write=not args.check)
+    return 1 if changed and args.check else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
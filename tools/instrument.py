@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Per-phase timing and counters for the content tools.
+
+Tools record into the process-wide METRICS object:
+
+    with METRICS.phase("parse"):          # wall + CPU time, call count
+        ...
+    METRICS.count("lines_parsed", n)      # plain counters
+    METRICS.module_time(module, secs)     # per-module wall time
+
+Recording is always on and cheap (phases wrap whole files, not lines).
+Nothing is written unless a tool runs inside session() with a path:
+
+    with session("validate_content", timings="build/timings.json",
+                 profile="build/validate.prof"):
+        ...
+
+--timings writes JSON:
+  {"tool", "argv", "wall", "cpu",
+   "phases":   {name: {"wall", "cpu", "calls"}},
+   "counters": {name: int},
+   "modules":  {module: wall_seconds}}
+--profile dumps cProfile stats (python3 -m pstats FILE to read them).
+
+CPU time is time.process_time() of this process; work done in worker
+processes (validate_content --jobs) shows up as wall time only.
+
+Stdlib only.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import json
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+
+class Metrics:
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.phases: Dict[str, Dict[str, float]] = {}
+        self.counters: Dict[str, int] = {}
+        self.modules: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        w0, c0 = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            ent = self.phases.get(name)
+            if ent is None:
+                ent = self.phases[name] = {"wall": 0.0, "cpu": 0.0, "calls": 0}
+            ent["wall"] += time.perf_counter() - w0
+            ent["cpu"] += time.process_time() - c0
+            ent["calls"] += 1
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def module_time(self, module: str, secs: float) -> None:
+        if module:
+            self.modules[module] = self.modules.get(module, 0.0) + secs
+
+    def to_dict(self) -> dict:
+        return {
+            "phases": {
+                k: {"wall": round(v["wall"], 6), "cpu": round(v["cpu"], 6), "calls": int(v["calls"])}
+                for k, v in sorted(self.phases.items())
+            },
+            "counters": dict(sorted(self.counters.items())),
+            "modules": {k: round(v, 6) for k, v in sorted(self.modules.items())},
+        }
+
+
+METRICS = Metrics()
+
+
+def add_arguments(ap) -> None:
+    """Add --timings / --profile to an argparse parser."""
+    ap.add_argument("--timings", metavar="FILE", default=None,
+                    help="write per-phase wall/CPU times and counters as JSON")
+    ap.add_argument("--profile", metavar="FILE", default=None,
+                    help="write cProfile stats for the whole run")
+
+
+def pop_arguments(argv: list) -> tuple:
+    """Strip --timings/--profile FILE from a hand-parsed argv; return (argv, timings, profile)."""
+    rest, found = [], {"--timings": None, "--profile": None}
+    it = iter(argv)
+    for a in it:
+        key, eq, val = a.partition("=")
+        if key in found:
+            found[key] = val if eq else next(it, None)
+        else:
+            rest.append(a)
+    return rest, found["--timings"], found["--profile"]
+
+
+@contextmanager
+def session(tool: str, timings: Optional[str] = None, profile: Optional[str] = None) -> Iterator[Metrics]:
+    """Time a whole tool run; write --timings JSON / --profile stats on exit."""
+    prof = cProfile.Profile() if profile else None
+    w0, c0 = time.perf_counter(), time.process_time()
+    if prof is not None:
+        prof.enable()
+    try:
+        yield METRICS
+    finally:
+        if prof is not None:
+            prof.disable()
+            Path(profile).parent.mkdir(parents=True, exist_ok=True)
+            prof.dump_stats(profile)
+        if timings:
+            data = {
+                "tool": tool,
+                "argv": sys.argv[1:],
+                "wall": round(time.perf_counter() - w0, 6),
+                "cpu": round(time.process_time() - c0, 6),
+            }
+            data.update(METRICS.to_dict())
+            Path(timings).parent.mkdir(parents=True, exist_ok=True)
+            Path(timings).write_text(json.dumps(data, indent=2) + "\n", encoding="utf-8")
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Shared JSON codec for the content tools.
+
+loads() uses the fastest installed parser and falls back to stdlib json:
+
+- Backend is chosen once at import: $CONTENT_JSON_BACKEND (json|orjson)
+  or, by default, orjson when installed, else stdlib json.
+- orjson only accepts strict RFC 8259 JSON, a subset of what stdlib json
+  accepts. Anything it rejects (NaN/Infinity, ints beyond 64 bit, BOM, real
+  syntax errors) is re-parsed by stdlib json, so results and errors are the
+  same as json.loads: JSONDecodeError is always the stdlib class, with the
+  stdlib message and line/column positions (jsonl_guard._format_bad and
+  validate_content depend on them).
+- dumps() is always stdlib json.dumps so rewrites (e.g. migrate_tokens with
+  ensure_ascii=False) stay byte-identical whatever backend is installed.
+
+Lenient parsers (ujson, simplejson with extensions) are not used: they
+accept input stdlib rejects, which would hide bad lines.
+
+Stdlib only; orjson is optional.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, Callable, Optional
+
+JSONDecodeError = json.JSONDecodeError
+
+BACKENDS = ("json", "orjson")
+BOM = "\ufeff"
+
+
+def _load_backend(name: str) -> Optional[Callable[[str], Any]]:
+    if name == "orjson":
+        try:
+            import orjson  # type: ignore
+        except ImportError:
+            return None
+        return orjson.loads
+    return None
+
+
+def _select() -> tuple:
+    wanted = os.environ.get("CONTENT_JSON_BACKEND", "").strip().lower()
+    if wanted in ("", "auto"):
+        for name in BACKENDS[1:]:
+            fast = _load_backend(name)
+            if fast is not None:
+                return name, fast
+        return "json", None
+    if wanted not in BACKENDS:
+        raise SystemExit(f"CONTENT_JSON_BACKEND={wanted!r}: choose from {', '.join(BACKENDS)} or auto")
+    if wanted == "json":
+        return "json", None
+    fast = _load_backend(wanted)
+    if fast is None:
+        raise SystemExit(f"CONTENT_JSON_BACKEND={wanted}: module not installed")
+    return wanted, fast
+
+
+BACKEND, _fast_loads = _select()
+ACCELERATED = _fast_loads is not None
+
+
+def loads(s: str) -> Any:
+    """Parse one JSON document; same result and errors as json.loads(s)."""
+    if _fast_loads is not None and not s.startswith(BOM):
+        try:
+            return _fast_loads(s)
+        except Exception:
+            pass
+    return json.loads(s)
+
+
+def dumps(obj: Any, **kwargs: Any) -> str:
+    """Serialize with stdlib json (byte-identical output on every backend)."""
+    return json.dumps(obj, **kwargs)
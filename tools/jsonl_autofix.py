@@ -1,46 +1,202 @@
 # tools/jsonl_autofix.py
-import re, json, glob, pathlib
-
-def fix_line(s:str)->str:
-    # normalize quotes
-    s = s.replace("“","\"").replace("”","\"").replace("„","\"")
-    s = s.replace("’","'").replace("‘","'")
-    # remove trailing commas before } ]
-    s = re.sub(r',\s*([}\]])', r'\1', s)
-    # single-quoted KEYS -> double
-    s = re.sub(r"(?P<prefix>[{,\s])'([A-Za-z0-9_]+)'\s*:", r'\g<prefix>"\2":', s)
-    # single-quoted string VALUES -> double (keeps escapes)
-    s = re.sub(r':\s*\'([^\'\\]*(?:\\.[^\'\\]*)*)\'', r': "\1"', s)
-    # Python literals -> JSON
-    s = re.sub(r'\bTrue\b', 'true', s)
-    s = re.sub(r'\bFalse\b', 'false', s)
-    s = re.sub(r'\bNone\b', 'null', s)
-    return s
-
-def try_json(s):
-    try: json.loads(s); return True
-    except: return False
-
-changed=0; still_bad=[]
-for p in glob.glob('content/**/d*.jsonl', recursive=True):
-    path=pathlib.Path(p)
-    lines=path.read_text(encoding='utf-8').splitlines()
-    out=[]
-    for i,ln in enumerate(lines,1):
-        s=ln.rstrip('\n')
-        if not s.strip():
-            out.append(s); continue
-        if try_json(s):
-            out.append(s); continue
-        s2 = fix_line(s)
-        if s2!=s and try_json(s2):
-            out.append(s2); changed+=1
+"""
+Repair JSON-ish lines in content JSONL files (imported dumps, hand edits).
+
+Only lines that do not parse are touched. Each one goes through repair(), a
+single left-to-right tokenizer pass that:
+  - treats “ ” „ as double quotes and ‘ ’ as single quotes outside strings
+    (inside a string they are text and stay as they are)
+  - turns 'single-quoted' keys and values into JSON strings
+  - maps the Python literals True / False / None to true / false / null
+  - drops trailing commas before } and ]
+The pass is linear in the line length and gives up after --budget-ms per
+line; a line that still does not parse is reported and left as it was.
+
+Files are rewritten only when a line changed, atomically, with their
+original newlines and BOM, so a clean tree sees no writes and no mtime churn.
+
+Usage:
+  python3 tools/jsonl_autofix.py [--check|--fix] [--budget-ms 50] [paths/globs ...]
+  (default: --fix over content/**/d*.jsonl; exit 1 if a line stays bad,
+   or with --check if any file would change)
+"""
+import argparse, glob, re, sys, time
+from pathlib import Path
+from typing import List, Optional
+
+import jsoncodec
+from corpus import ContentFile
+from records import iter_lines
+
+OPEN_DQ = {"\"", "“", "„"}
+OPEN_SQ = {"'", "‘", "’"}
+# где строка может кончиться: после обычной " -- только ", после «умной» -- ещё ” “,
+# после одинарной -- ' ’ (апостроф внутри текста не закрывает: см. _closes); плюс escape
+DQ_STOPS = re.compile(r'["\\]')
+SMART_STOPS = re.compile(r'["”“\\]')
+SQ_STOPS = re.compile(r"['’\\]")
+WORD = re.compile(r"\w+")
+PY_LITERALS = {"True": "true", "False": "false", "None": "null"}
+BUDGET_CHECK = 4096  # символов между проверками времени
+
+class BudgetExceeded(Exception):
+    pass
+
+DQ_ESCAPES = re.compile(r'\\(.)|\\$|"', re.S)
+
+def _dq_sub(m) -> str:
+    esc = m.group(1)
+    if esc is not None:
+        return "'" if esc == "'" else "\\" + esc   # \' -> ', прочие escape как есть
+    return '\\"' if m.group() == '"' else "\\\\"
+
+def _dq(text: str) -> str:
+    # содержимое строки в JSON-строку: экранируем " и одинокий \ в конце
+    return '"' + DQ_ESCAPES.sub(_dq_sub, text) + '"'
+
+def _closes(s: str, j: int) -> bool:
+    # кавычка закрывает строку, только если дальше (после пробелов) , : } ] или конец строки
+    n = len(s)
+    while j < n and s[j] in " \t":
+        j += 1
+    return j >= n or s[j] in ",:}]"
+
+def repair(s: str, budget: float = 0.05) -> str:
+    """One tokenizer pass over s (see module docstring); raises BudgetExceeded after budget seconds."""
+    deadline = time.perf_counter() + budget
+    out: List[str] = []
+    comma = -1  # позиция в out висящей запятой (кандидат в trailing comma)
+    i, n = 0, len(s)
+    tick = BUDGET_CHECK
+    while i < n:
+        if i >= tick:
+            if time.perf_counter() > deadline:
+                raise BudgetExceeded(s[:40])
+            tick = i + BUDGET_CHECK
+        ch = s[i]
+        if ch in OPEN_DQ or ch in OPEN_SQ:
+            # строка: прыжками по кандидатам на конец (regex в C), escape пропускаем как есть
+            stops = DQ_STOPS if ch == "\"" else (SMART_STOPS if ch in OPEN_DQ else SQ_STOPS)
+            j = i + 1
+            while True:
+                m = stops.search(s, j)
+                if m is None:
+                    j = n
+                    break
+                j = m.start()
+                if j >= tick:
+                    if time.perf_counter() > deadline:
+                        raise BudgetExceeded(s[:40])
+                    tick = j + BUDGET_CHECK
+                c = s[j]
+                if c == "\\":
+                    j += 2
+                    continue
+                # обычную " закрывает только "; прочие кавычки -- если дальше , : } ] или конец
+                if c == "\"" or _closes(s, j + 1):
+                    break
+                j += 1
+            body = s[i + 1:j]
+            out.append("\"" + body + "\"" if ch == "\"" and j < n else _dq(body))
+            comma = -1
+            i = j + 1
+        elif ch.isalpha() or ch == "_":
+            j = WORD.match(s, i).end()
+            word = s[i:j]
+            out.append(PY_LITERALS.get(word, word))
+            comma = -1
+            i = j
+        elif ch == ",":
+            out.append(ch)
+            comma = len(out) - 1
+            i += 1
+        elif ch in "}]":
+            if comma >= 0:
+                out[comma] = ""
+                comma = -1
+            out.append(ch)
+            i += 1
         else:
-            out.append(s2); still_bad.append((p,i,s2))
-    path.write_text('\n'.join(out)+'\n', encoding='utf-8')
-
-print(f'patched: {changed} lines')
-if still_bad:
-    print('\nSTILL BAD:')
-    for p,i,s in still_bad:
-        print(f'{p}:{i}\n{s}\n')
+            out.append(ch)
+            if not ch.isspace():
+                comma = -1
+            i += 1
+    return "".join(out)
+
+def _parses(s: str) -> bool:
+    try:
+        jsoncodec.loads(s)
+        return True
+    except ValueError:
+        return False
+
+def fix_file(cf: ContentFile, budget: float, still_bad: list) -> int:
+    """Repair the bad lines of one file in memory; return how many were fixed."""
+    out = []
+    fixed = 0
+    for ln in iter_lines(cf):
+        prefix = ln.raw[:len(ln.raw) - len(ln.body)]  # BOM строки 1 остаётся на месте
+        if ln.blank or ln.ok:
+            out.append(ln.raw + ln.nl)
+            continue
+        try:
+            s2 = repair(ln.body, budget)
+        except BudgetExceeded:
+            still_bad.append((cf.path, ln.no, ln.body, "repair budget exceeded"))
+            out.append(ln.raw + ln.nl)
+            continue
+        if s2 != ln.body and _parses(s2):
+            out.append(prefix + s2 + ln.nl)
+            fixed += 1
+        else:
+            still_bad.append((cf.path, ln.no, s2, "still not valid JSON"))
+            out.append(ln.raw + ln.nl)
+    if fixed:
+        cf.set_text("".join(out))
+    return fixed
+
+def expand(patterns: List[str]) -> List[Path]:
+    seen, out = set(), []
+    for pat in patterns:
+        for p in sorted(glob.glob(pat, recursive=True)) or [pat]:
+            path = Path(p)
+            if path.is_file() and path not in seen:
+                seen.add(path)
+                out.append(path)
+    return out
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="jsonl_autofix", description="Repair JSON-ish lines in content JSONL files.")
+    mode = ap.add_mutually_exclusive_group()
+    mode.add_argument("--fix", action="store_true", help="rewrite files with repaired lines (default)")
+    mode.add_argument("--check", action="store_true", help="report what would change, do not write (exit 1 if anything would)")
+    ap.add_argument("--budget-ms", type=float, default=50.0, metavar="MS", help="repair time budget per line (default 50)")
+    ap.add_argument("paths", nargs="*", help="paths or globs; default: content/**/d*.jsonl")
+    args = ap.parse_args(argv)
+
+    budget = args.budget_ms / 1000.0
+    patched = files = 0
+    still_bad: list = []
+    for path in expand(args.paths or ["content/**/d*.jsonl"]):
+        cf = ContentFile(path)
+        if not cf.text and cf.read_error is not None:
+            print(f"[read error] {path}: {cf.read_error}", file=sys.stderr)
+            continue
+        fixed = fix_file(cf, budget, still_bad)
+        if fixed:
+            patched += fixed
+            files += 1
+            if not args.check:
+                cf.write_text(cf.text, atomic=True)
+            print(f"[{'would patch' if args.check else 'patched'}] {path}: {fixed} line(s)")
+
+    verb = "would patch" if args.check else "patched"
+    print(f"{verb}: {patched} lines in {files} files")
+    if still_bad:
+        print("\nSTILL BAD:")
+        for p, i, s, why in still_bad:
+            print(f"{p}:{i} ({why})\n{s}\n")
+    return 1 if still_bad or (args.check and patched) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,6 +11,11 @@ Behavior:
   2) Remove trailing commas before '}' or ']'
   3) Insert missing comma between "spot_kind": "..." and "steps":
 
+Files larger than STREAM_THRESHOLD (or all files with --stream) are processed
+line by line in constant memory: fixed lines go to a temp file next to the
+original, which atomically replaces it only when every line is valid. BAD lines
+are reported as soon as they are read.
+
 Exit codes:
 - 0 if all lines in all files are valid after optional fixes
 - 1 if any invalid line remains (prints precise diagnostics)
@@ -23,16 +28,43 @@ from __future__ import annotations
 import argparse
 import glob
 import json
+import json.scanner
 import os
 import re
+import shutil
 import sys
+import tempfile
+import time
 from pathlib import Path
-from typing import Iterable, List, Tuple
+from typing import Iterable, List, Optional, Tuple
+
+import jsoncodec
+import loader
+from corpus import BOM, ContentFile, preload, split_lines
+from instrument import METRICS, add_arguments, session
+import shard
 
 
 TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
 MISSING_COMMA_SPOT_STEPS_RE = re.compile(r'("spot_kind"\s*:\s*"[^"]+")\s*("steps"\s*:)')
 
+# Files above this size are streamed instead of loaded whole
+STREAM_THRESHOLD = 32 * 1024 * 1024
+# Files read ahead at a time: what loader.load keeps in flight, so memory is
+# bounded by one batch rather than by every file below STREAM_THRESHOLD
+PRELOAD_BATCH = 2 * loader.DEFAULT_THREADS * loader.CHUNK
+
+# BAD lines of this run as (path, line, col, reason), for --json
+reported: List[Tuple[Path, int, int, str]] = []
+
+# Whole-file fast path: one scanner walks the buffer value by value
+_SCAN_ONCE = json.scanner.make_scanner(json.JSONDecoder())
+LEADING_WS_RE = re.compile(r"[ \t\r\n]*")
+# after a value: optional spaces, then a line break (plus blank lines) or EOF
+LINE_END_RE = re.compile(r"[ \t]*(?:[\r\n][ \t\r\n]*|\Z)")
+# str.splitlines() breaks on these too; files containing them take the slow path
+ODD_LINE_BREAKS = ("\x0b", "\x0c", "\x1c", "\x1d", "\x1e", "\x85", "\u2028", "\u2029")
+
 
 def _expand_paths(inputs: Iterable[str]) -> List[Path]:
     paths: List[Path] = []
@@ -56,72 +88,115 @@ def _format_bad(path: Path, line_no: int, col_no: int, msg: str, line: str) -> s
     return f"BAD {path}:{line_no}:{col_no} -> {reason}\n{line}\n{caret}"
 
 
+def _report_bad(path: Path, line_no: int, col_no: int, msg: str, line: str) -> None:
+    print(_format_bad(path, line_no, col_no, msg, line), file=sys.stderr)
+    reported.append((Path(path), line_no, col_no, msg.strip().splitlines()[0]))
+
+
 def _try_parse(line: str) -> Tuple[bool, str, int]:
     try:
-        json.loads(line)
+        jsoncodec.loads(line)
         return True, "", 1
     except json.JSONDecodeError as e:
         # e.colno is 1-based
         return False, e.msg, e.colno or 1
 
 
-def _process_file(path: Path, fix: bool) -> Tuple[int, bool]:
-    """Validate a single file.
+def _fast_valid(text: str) -> bool:
+    """True if every non-blank line of text is exactly one valid JSON value.
 
-    Returns (bad_count, changed)
+    Walks the whole buffer with the decoder's scanner instead of calling
+    json.loads per line. Any doubt (BOM, a value spanning lines, junk after a
+    value, unusual line breaks) returns False and the caller falls back to
+    the per-line path, which produces the diagnostics.
     """
-    original_text = path.read_text(encoding="utf-8")
-    lines = original_text.splitlines(keepends=True)
+    if text.startswith(BOM):
+        return False
+    if jsoncodec.ACCELERATED:
+        # an accelerated per-line parser beats the stdlib scanner walk
+        loads = jsoncodec.loads
+        try:
+            for raw in text.splitlines():
+                if raw.strip():
+                    loads(raw)
+        except ValueError:
+            return False
+        return True
+    if any(ch in text for ch in ODD_LINE_BREAKS):
+        return False
+    find = text.find
+    line_end = LINE_END_RE.match
+    pos = LEADING_WS_RE.match(text).end()
+    n = len(text)
+    try:
+        while pos < n:
+            _, end = _SCAN_ONCE(text, pos)
+            if find("\n", pos, end) >= 0 or find("\r", pos, end) >= 0:
+                return False
+            m = line_end(text, end)
+            if m is None:
+                return False
+            pos = m.end()
+    except (StopIteration, ValueError):
+        return False
+    return True
+
+
+def _fix_line(body: str) -> Tuple[bool, str, int, str]:
+    """Apply the safe fixers in order until the line parses.
+
+    Returns (ok, msg, col, line); line is the fixed line on success and the
+    original body otherwise (msg/col then describe the last candidate tried).
+    """
+    # 1) strip trailing spaces (BOM is handled by the caller)
+    candidate = body.rstrip(" \t")
+    ok, msg, col = _try_parse(candidate)
+    if ok:
+        return ok, msg, col, candidate
+    # 2) remove trailing commas
+    candidate = TRAILING_COMMA_RE.sub(r"\1", candidate)
+    ok, msg, col = _try_parse(candidate)
+    if ok:
+        return ok, msg, col, candidate
+    # 3) insert missing comma between spot_kind and steps
+    fixed3 = MISSING_COMMA_SPOT_STEPS_RE.sub(r"\1, \2", candidate)
+    ok, msg, col = _try_parse(fixed3)
+    if ok:
+        return ok, msg, col, fixed3
+    return ok, msg, col, body
+
+
+def check_file(cf: ContentFile, fix: bool) -> Tuple[int, bool]:
+    """Validate (and optionally fix) a single corpus file.
+
+    Lines are taken from the corpus, so an already parsed file is not parsed
+    again; fixers only run on lines that failed. Returns (bad_count, changed).
+    """
+    if not cf.parsed:
+        text = cf.text
+        with METRICS.phase("guard.fast_path"):
+            fast_ok = _fast_valid(text)
+        METRICS.count("guard.fast_path_hits" if fast_ok else "guard.fast_path_misses")
+        if fast_ok:
+            return 0, False
+    path = cf.path
     out_lines: List[str] = []
     bad = 0
     changed = False
+    saw_bom = cf.has_bom
 
-    saw_bom = False
-    if lines:
-        first = lines[0]
-        if first.startswith("\ufeff"):
-            saw_bom = True
-            lines[0] = first.replace("\ufeff", "", 1)
-
-    for idx, raw in enumerate(lines, start=1):
-        # Keep the original newline, operate on the content only
-        if raw.endswith("\r\n"):
-            nl = "\r\n"
-            body = raw[:-2]
-        elif raw.endswith("\n") or raw.endswith("\r"):
-            nl = raw[-1]
-            body = raw[:-1]
-        else:
-            nl = ""
-            body = raw
-
-        if body.strip() == "":
+    for ln in cf.lines:
+        body, nl = ln.body, ln.nl
+        if ln.blank:
             out_lines.append(body + nl)
             continue
 
-        # Try original first
-        ok, msg, col = _try_parse(body)
         candidate = body
-
-        # Apply fixers in order only if needed
+        ok = ln.ok
         if not ok:
-            # 1) strip trailing spaces (BOM already handled above)
-            fixed1 = candidate.rstrip(" \t")
-            ok, msg, col = _try_parse(fixed1)
-            if ok:
-                candidate = fixed1
-            else:
-                # 2) remove trailing commas
-                fixed2 = TRAILING_COMMA_RE.sub(r"\1", fixed1)
-                ok, msg, col = _try_parse(fixed2)
-                if ok:
-                    candidate = fixed2
-                else:
-                    # 3) insert missing comma between spot_kind and steps
-                    fixed3 = MISSING_COMMA_SPOT_STEPS_RE.sub(r"\1, \2", fixed2)
-                    ok, msg, col = _try_parse(fixed3)
-                    if ok:
-                        candidate = fixed3
+            with METRICS.phase("guard.fixers"):
+                ok, msg, col, candidate = _fix_line(body)
+            METRICS.count("guard.fixes_applied" if ok else "guard.bad_lines")
 
         if ok:
             if candidate != body or saw_bom:
@@ -129,7 +204,7 @@ def _process_file(path: Path, fix: bool) -> Tuple[int, bool]:
             out_lines.append(candidate + nl)
         else:
             # Report precise error, show the latest candidate used for parsing
-            print(_format_bad(path, idx, col, msg, candidate), file=sys.stderr)
+            _report_bad(path, ln.no, col, msg, candidate)
             bad += 1
             out_lines.append(body + nl)
 
@@ -138,23 +213,116 @@ def _process_file(path: Path, fix: bool) -> Tuple[int, bool]:
         bak = path.with_suffix(path.suffix + ".bak")
         try:
             if not bak.exists():
-                bak.write_text(original_text, encoding="utf-8")
+                shutil.copyfile(path, bak)
         except Exception:
             # If backup fails, do not block the fix; proceed to write
             pass
-        Path(path).write_text("".join(out_lines), encoding="utf-8")
+        cf.write_text("".join(out_lines))
+
+    return bad, changed
+
 
+def _process_file(path: Path, fix: bool) -> Tuple[int, bool]:
+    """Validate a single file.
+
+    Returns (bad_count, changed)
+    """
+    return check_file(ContentFile(path), fix=fix)
+
+
+def stream_file(path: Path, fix: bool) -> Tuple[int, bool]:
+    """Validate (and optionally fix) a file line by line in constant memory.
+
+    Same rules and output as check_file(): BOM stripped from line 1, original
+    newlines kept, one .bak of the original before the first fix. With fix,
+    lines are written to a temp file that replaces the original only if the
+    file changed and no BAD line remains. Returns (bad_count, changed).
+    """
+    path = Path(path)
+    bad = 0
+    changed = False
+    out = None
+    tmp: Optional[str] = None
+    if fix:
+        fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=path.name + ".")
+        out = os.fdopen(fd, "w", encoding="utf-8", newline="")
+    try:
+        no = 0
+        # newline="" keeps \r\n / \r as read; split_lines() re-splits each
+        # chunk so line numbers match str.splitlines() exactly
+        with open(path, "r", encoding="utf-8", newline="") as fh:
+            for chunk in fh:
+                for body, nl in split_lines(chunk):
+                    no += 1
+                    if no == 1 and body.startswith(BOM):
+                        body = body[1:]
+                        changed = True
+                    line = body
+                    if body.strip() != "":
+                        ok, msg, col = _try_parse(body)
+                        METRICS.count("lines_parsed")
+                        if not ok:
+                            with METRICS.phase("guard.fixers"):
+                                ok, msg, col, line = _fix_line(body)
+                            METRICS.count("guard.fixes_applied" if ok else "guard.bad_lines")
+                        if not ok:
+                            _report_bad(path, no, col, msg, body)
+                            bad += 1
+                        elif line != body:
+                            changed = True
+                    if out is not None:
+                        out.write(line + nl)
+        if out is not None:
+            out.close()
+            out = None
+            if changed and bad == 0:
+                bak = path.with_suffix(path.suffix + ".bak")
+                try:
+                    if not bak.exists():
+                        shutil.copyfile(path, bak)
+                except Exception:
+                    # If backup fails, do not block the fix; proceed to write
+                    pass
+                shutil.copymode(path, tmp)
+                os.replace(tmp, path)
+    finally:
+        if out is not None:
+            out.close()
+        if tmp is not None and os.path.exists(tmp):
+            os.unlink(tmp)
     return bad, changed
 
 
-def validate_paths(paths: List[str], fix: bool) -> int:
+def validate_files(files: List[ContentFile], fix: bool) -> int:
+    any_bad = 0
+    preload([cf for cf in files if not cf.parsed])
+    for cf in files:
+        t0 = time.perf_counter()
+        bad, _ = check_file(cf, fix=fix)
+        METRICS.module_time(cf.module, time.perf_counter() - t0)
+        any_bad += bad
+    return 0 if any_bad == 0 else 1
+
+
+def validate_paths(paths: List[str], fix: bool, stream: bool = False, only: Optional[set] = None) -> int:
     files = _expand_paths(paths)
+    if only is not None:
+        files = [p for p in files if p.parent.parent.name in only]
     if not files:
         return 0
     any_bad = 0
-    for p in files:
-        bad, _ = _process_file(Path(p), fix=fix)
-        any_bad += bad
+    for i in range(0, len(files), PRELOAD_BATCH):
+        batch = files[i:i + PRELOAD_BATCH]
+        loaded = {} if stream else {p: ContentFile(p) for p in batch if p.stat().st_size <= STREAM_THRESHOLD}
+        preload(list(loaded.values()))
+        for p in batch:
+            t0 = time.perf_counter()
+            if p not in loaded:
+                bad, _ = stream_file(p, fix=fix)
+            else:
+                bad, _ = check_file(loaded.pop(p), fix=fix)  # dropped once checked
+            METRICS.module_time(p.parent.parent.name, time.perf_counter() - t0)
+            any_bad += bad
     return 0 if any_bad == 0 else 1
 
 
@@ -167,11 +335,20 @@ def main(argv: List[str]) -> int:
     mode = parser.add_mutually_exclusive_group()
     mode.add_argument("--fix", action="store_true", help="apply safe fixes (default)")
     mode.add_argument("--check", action="store_true", help="do not modify files")
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help=f"process every file line by line (default only above {STREAM_THRESHOLD // (1024 * 1024)} MiB)",
+    )
+    parser.add_argument("--shard", type=shard.parse_spec, metavar="I/N",
+                        help="only files of the modules in shard I of N (tools/shard.py)")
+    parser.add_argument("--json", metavar="FILE", help="also write BAD lines as a shard result (tools/shard.py merge)")
     parser.add_argument(
         "paths",
         nargs="*",
         help="paths or globs; default: content/*/v1/drills.jsonl",
     )
+    add_arguments(parser)
     args = parser.parse_args(argv)
 
     if args.check:
@@ -180,7 +357,15 @@ def main(argv: List[str]) -> int:
         fix = True
 
     inputs = args.paths if args.paths else ["content/*/v1/drills.jsonl"]
-    rc = validate_paths(inputs, fix=fix)
+    files = _expand_paths(inputs)
+    mods = shard.select(sorted({p.parent.parent.name for p in files}), args.shard)
+    with session("jsonl_guard", timings=args.timings, profile=args.profile):
+        rc = validate_paths(inputs, fix=fix, stream=args.stream, only=set(mods) if args.shard else None)
+    if args.json:
+        result = shard.ShardResult("jsonl_guard", args.shard, mods)
+        for path, no, col, reason in reported:
+            result.add("ERR", "jsonl.bad-line", path.parent.parent.name, str(path), no, f"{reason} (col {col})")
+        result.save(args.json, rc)
     if rc == 0:
         print("OK")
     return rc
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Multi-keyword matcher (Aho-Corasick) for the content checks.
+
+Compiles named word sets (e.g. the hint/evidence sets from spec.py) into one
+automaton. scan() makes a single pass over the lowercased text and returns
+every category with at least one word occurring as a substring, so the cost
+per record is linear in the text length regardless of how many words the sets
+hold.
+
+Matching is case-insensitive substring matching, identical to
+    any(w.lower() in text.lower() for w in words)
+for each category.
+
+Stdlib only.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import Dict, FrozenSet, Iterable, List, Mapping
+
+
+class KeywordMatcher:
+    def __init__(self, categories: Mapping[str, Iterable[str]]):
+        goto: List[Dict[str, int]] = [{}]
+        out: List[set] = [set()]
+        self.categories: FrozenSet[str] = frozenset(categories)
+        always = set()  # categories holding the empty word match any text
+
+        # 1) trie of all words, each terminal state tagged with its categories
+        for cat, words in categories.items():
+            for w in words:
+                w = w.lower()
+                if not w:
+                    always.add(cat)
+                    continue
+                state = 0
+                for ch in w:
+                    nxt = goto[state].get(ch)
+                    if nxt is None:
+                        nxt = len(goto)
+                        goto[state][ch] = nxt
+                        goto.append({})
+                        out.append(set())
+                    state = nxt
+                out[state].add(cat)
+
+        # 2) failure links (BFS), outputs merged along them, and a full
+        #    transition table so scanning is one dict lookup per character
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict(goto[0])] + [{} for _ in goto[1:]]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            f = fail[state]
+            out[state] |= out[f]
+            delta[state] = dict(delta[f])
+            delta[state].update(goto[state])
+            for ch, nxt in goto[state].items():
+                fail[nxt] = delta[f].get(ch, 0) if state else 0
+                queue.append(nxt)
+
+        self._delta = delta
+        self._out = [frozenset(o) for o in out]
+        self._always = frozenset(always)
+
+    def scan(self, text: str) -> FrozenSet[str]:
+        """Return the categories with at least one word found in text."""
+        hits = set(self._always)
+        want = len(self.categories)
+        delta, out = self._delta, self._out
+        state = 0
+        for ch in text.lower():
+            state = delta[state].get(ch, 0)
+            if out[state]:
+                hits |= out[state]
+                if len(hits) == want:
+                    break
+        return frozenset(hits)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Dependency manifest for generated files (allowlists, dispatcher).
+
+Records, per path, the (mtime_ns, size) and content hash a generator last saw
+plus whatever it derived from the file (e.g. the targets of a drills file, the
+allowlist hashes a dispatcher was rendered from). A later run can then trust
+an entry without opening the file, and skip outputs whose inputs did not
+change -- a no-op run only stats files and writes nothing.
+
+Each tree has its own manifest, <tree>/build/cache/manifest.json (see
+manifest_path), so runs over a temporary copy of the content never touch the
+repo's. Layout (JSON), one section per generator:
+  {"sections": {"<tool>": {"version": "<v>",
+     "files": {"<abs path>": {"mtime_ns": N, "size": N, "seen_ns": N,
+                              "sha1": "<hex>", "data": <json>}}}}}
+
+A section whose version differs is dropped. As in git's index, an entry
+whose mtime is within RACY_NS of the moment it was recorded is not trusted
+by stat alone (the file could change again within the same timestamp);
+callers then compare content hashes. On save, entries the run did not look
+at are dropped if their file no longer exists. Writes are atomic and only
+happen when an entry changed. Stdlib only.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from cache import CACHE_DIR, content_hash
+
+MANIFEST_PATH = CACHE_DIR / "manifest.json"  # the repo tree's
+RACY_NS = 2_000_000_000
+
+
+def _key(path) -> str:
+    return os.path.abspath(path)
+
+
+def manifest_path(root) -> Path:
+    """Manifest of the tree at root (the directory holding content/ and build/)."""
+    return Path(root).resolve() / "build" / "cache" / "manifest.json"
+
+
+def _stat(path) -> Optional[os.stat_result]:
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+class Manifest:
+    def __init__(self, tool: str, version: str, path: Path = MANIFEST_PATH):
+        self.path = Path(path)
+        self.tool = tool
+        self.version = version
+        self.sections: Dict[str, Any] = {}
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self._seen: set = set()  # keys looked up or recorded by this run
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        sections = data.get("sections") if isinstance(data, dict) else None
+        if not isinstance(sections, dict):
+            return
+        self.sections = sections
+        own = sections.get(self.tool)
+        if isinstance(own, dict) and own.get("version") == self.version and isinstance(own.get("files"), dict):
+            self.files = own["files"]
+
+    def fresh(self, path) -> Optional[Dict[str, Any]]:
+        """Entry for path if the file is unchanged by (mtime, size); no read."""
+        self._seen.add(_key(path))
+        ent = self.files.get(_key(path))
+        if ent is None:
+            return None
+        st = _stat(path)
+        if st is None or st.st_mtime_ns != ent["mtime_ns"] or st.st_size != ent["size"]:
+            return None
+        if ent["mtime_ns"] + RACY_NS > ent["seen_ns"]:
+            return None
+        return ent
+
+    def lookup(self, path, text: str) -> Optional[Dict[str, Any]]:
+        """Entry for path if its content hash matches text (stat is refreshed)."""
+        self._seen.add(_key(path))
+        ent = self.files.get(_key(path))
+        if ent is None or ent["sha1"] != content_hash(text):
+            return None
+        return self.record(path, text, ent["data"])
+
+    def record(self, path, text: Optional[str] = None, data: Any = None) -> Dict[str, Any]:
+        """Store path's current stat and hash (reads the file if text is None)."""
+        if text is None:
+            try:
+                text = Path(path).read_text(encoding="utf-8", errors="replace")
+            except OSError:
+                text = ""
+        st = _stat(path)
+        ent = {
+            "mtime_ns": st.st_mtime_ns if st else -1,
+            "size": st.st_size if st else -1,
+            "seen_ns": time.time_ns(),
+            "sha1": content_hash(text),
+            "data": data,
+        }
+        self._seen.add(_key(path))
+        old = self.files.get(_key(path))
+        if old is not None and old["seen_ns"] - old["mtime_ns"] >= RACY_NS and \
+                all(old[k] == ent[k] for k in ("mtime_ns", "size", "sha1", "data")):
+            return old
+        self.files[_key(path)] = ent
+        self._dirty = True
+        return ent
+
+    def save(self) -> None:
+        # partial runs (--staged, --shard) leave other entries alone unless the file is gone
+        gone = [k for k in self.files if k not in self._seen and _stat(k) is None]
+        for k in gone:
+            del self.files[k]
+        if gone:
+            self._dirty = True
+        if not self._dirty:
+            return
+        own = self.files
+        self._load()  # keep sections other tools saved since we loaded
+        self.files = own
+        self.sections[self.tool] = {"version": self.version, "files": self.files}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        payload = json.dumps({"sections": self.sections}, ensure_ascii=True, sort_keys=True)
+        fd, tmp = tempfile.mkstemp(dir=str(self.path.parent), prefix=self.path.name + ".")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                fh.write(payload)
+            os.replace(tmp, self.path)
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+        self._dirty = False
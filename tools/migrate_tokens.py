@@ -1,6 +1,14 @@
 #!/usr/bin/env python3
-import json, sys, re
+import argparse, os, sys, re
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
+from typing import Optional
+
+import jsoncodec
+from corpus import Corpus, ContentFile
+from instrument import METRICS, add_arguments, session
 
 ROOT = Path("content")
 ALLOWED = {
@@ -71,57 +79,154 @@ DIRECT_MAP = {
  "a5s_defend":"call","ace_blocker_better":"double_barrel_good",
 }
 
+# Эвристики smart_map в порядке приоритета, как данные:
+# (группы подстрок: сработает любая группа, где есть все подстроки,
+#  префикс, запрещённая при префиксе подстрока, результат, результат для "_ip_")
+HEURISTICS = (
+    ((("overbet",), ("big", "bet")), None, None, "big_bet_75", None),
+    ((("small", "bet"), ("small_cbet",)), None, None, "small_cbet_33", None),
+    ((("half",), ("medium",)), None, None, "half_pot_50", None),
+    ((("probe",),), None, None, "probe_turns", None),
+    ((("delay",), ("check_back",)), None, None, "delay_turn", None),
+    ((("check_raise",),), None, None, "big_bet_75", None),
+    ((("protect",),), "check_", "call", "protect_check_range", None),
+    ((), "3bet", None, "3bet_oop_12bb", "3bet_ip_9bb"),
+    ((), "4bet", None, "4bet_oop_24bb", "4bet_ip_21bb"),
+    ((("squeeze",), ("iso",)), None, None, "3bet_oop_12bb", "3bet_ip_9bb"),
+    ((("fold",),), None, None, "fold", None),
+    ((("call",), ("float",), ("bluffcatch",)), None, None, "call", None),
+    ((("double",), ("second_barrel",)), None, None, "double_barrel_good", None),
+    ((("triple",), ("polarize",)), None, None, "triple_barrel_scare", None),
+)
+DEFAULT = "call"  # last-resort default
+
+# точные совпадения (ALLOWED побеждает DIRECT_MAP) одной таблицей
+DECISIONS = {**DIRECT_MAP, **{t: t for t in ALLOWED}}
+
+def _heuristic(t:str)->str:
+    for groups, prefix, forbid, result, ip_result in HEURISTICS:
+        hit = any(all(n in t for n in g) for g in groups)
+        if not hit and prefix is not None and t.startswith(prefix):
+            hit = forbid is None or forbid not in t
+        if hit:
+            return ip_result if ip_result is not None and "_ip_" in t else result
+    return DEFAULT
+
+@lru_cache(maxsize=8192)
 def smart_map(tok:str)->str:
+    # импорт тянет тысячи повторов одних и тех же токенов: кэш по сырому токену
     t = tok.strip().lower()
-    if t in ALLOWED: return t
-    if t in DIRECT_MAP: return DIRECT_MAP[t]
-    if "overbet" in t or ("big" in t and "bet" in t): return "big_bet_75"
-    if ("small" in t and "bet" in t) or "small_cbet" in t: return "small_cbet_33"
-    if "half" in t or "medium" in t: return "half_pot_50"
-    if "probe" in t: return "probe_turns"
-    if "delay" in t or "check_back" in t: return "delay_turn"
-    if "check_raise" in t: return "big_bet_75"
-    if "protect" in t or (t.startswith("check_") and "call" not in t): return "protect_check_range"
-    if t.startswith("3bet"): return "3bet_ip_9bb" if "_ip_" in t else "3bet_oop_12bb"
-    if t.startswith("4bet"): return "4bet_ip_21bb" if "_ip_" in t else "4bet_oop_24bb"
-    if "squeeze" in t or "iso" in t: return "3bet_ip_9bb" if "_ip_" in t else "3bet_oop_12bb"
-    if "fold" in t: return "fold"
-    if "call" in t or "float" in t or "bluffcatch" in t: return "call"
-    if "double" in t or "second_barrel" in t: return "double_barrel_good"
-    if "triple" in t or "polarize" in t: return "triple_barrel_scare"
-    # last-resort default
-    return "call"
+    hit = DECISIONS.get(t)
+    return hit if hit is not None else _heuristic(t)
+
+def plan_jsonl(f:ContentFile, changes:Counter, skipped:Optional[list]=None)->Optional[str]:
+    """New file text if any target migrates (else None); counts (old, new) in changes.
 
-def fix_jsonl(path:Path):
-    out_lines=[]
+    Non-string targets (e.g. ["call"]) are left as they are and noted in skipped as (path, line).
+    """
+    path=f.path
+    objs=[]
     changed=False
-    for i,raw in enumerate(path.read_text(encoding="utf-8").splitlines(),1):
-        if not raw.strip(): continue
-        try:
-            obj=json.loads(raw)
-        except Exception as e:
-            print(f"[SKIP-MALFORMED] {path}:{i} {e}", file=sys.stderr)
+    for line in f.lines:
+        if line.blank: continue
+        if line.error is not None:
+            print(f"[SKIP-MALFORMED] {path}:{line.no} {line.error}", file=sys.stderr)
             continue
+        obj=line.obj
         # ensure spot_kind
         obj.setdefault("spot_kind","l2_core_rules_check")
         # migrate target
         if "target" in obj:
             old=obj["target"]
+            if not isinstance(old, str):
+                # список/число в target не мапим: пусть чинит человек (validate_content даёт ERR)
+                print(f"[SKIP-NONSTRING] {path}:{line.no}", file=sys.stderr)
+                if skipped is not None:
+                    skipped.append((path, line.no))
+                objs.append(obj)
+                continue
             new=smart_map(old)
             if new not in ALLOWED:
                 new="call"
             if new!=old:
                 changed=True
+                changes[(old,new)]+=1
                 obj["target"]=new
         # sanity for demos: normalize step tokens inside 'steps' text (optional)
-        out_lines.append(json.dumps(obj, ensure_ascii=False))
-    if changed:
-        path.write_text("\n".join(out_lines)+"\n", encoding="utf-8")
-        print(f"[FIXED] {path}")
+        objs.append(obj)
+    if not changed:
+        return None  # unchanged files are never re-serialized
+    return "\n".join(jsoncodec.dumps(obj, ensure_ascii=False) for obj in objs)+"\n"
+
+def fix_jsonl(f:ContentFile):
+    text=plan_jsonl(f, Counter())
+    if text is not None:
+        f.write_text(text, atomic=True)
+        print(f"[FIXED] {f.path}")
+
+def print_report(changes:Counter, files:int, dry_run:bool, skipped:list=()):
+    verb = "would change" if dry_run else "changed"
+    print(f"Migration report ({'dry run' if dry_run else 'applied'}): "
+          f"{sum(changes.values())} targets in {files} files {verb}")
+    if changes:
+        # repr() keeps stray whitespace/case in legacy tokens visible
+        width=max(len(repr(old)) for old, _ in changes)
+        for (old,new),n in sorted(changes.items(), key=lambda kv: (-kv[1], kv[0])):
+            print(f"  {old!r:<{width}} -> {new:<20} {n}")
+    if skipped:
+        print(f"Skipped {len(skipped)} non-string targets (left as is):")
+        for path, no in skipped:
+            print(f"  {path}:{no}")
+
+def run(corpus:Optional[Corpus]=None, dry_run:bool=False, jobs:int=1, report:bool=False)->Counter:
+    """Migrate targets in demos/drills; returns (old, new) -> count.
+
+    Files are planned in module order in this process (the token table is
+    cached), then written atomically by `jobs` threads; [FIXED] lines keep
+    module order. dry_run plans only.
+    """
+    if corpus is None:
+        corpus=Corpus(ROOT)
+    changes=Counter()
+    skipped=[]
+    todo=[]
+    corpus.preload(("demos","drills"))
+    with METRICS.phase("migrate.plan"):
+        for mod in corpus.modules:
+            for kind in ("demos","drills"):
+                f=mod.get(kind)
+                if f is None: continue
+                text=plan_jsonl(f, changes, skipped)
+                if text is not None:
+                    todo.append((f, text))
+    METRICS.count("migrate.files_changed", len(todo))
+    if not dry_run:
+        with METRICS.phase("migrate.write"):
+            if jobs > 1 and len(todo) > 1:
+                with ThreadPoolExecutor(max_workers=jobs) as pool:
+                    list(pool.map(lambda ft: ft[0].write_text(ft[1], atomic=True), todo))
+            else:
+                for f, text in todo:
+                    f.write_text(text, atomic=True)
+        for f, _ in todo:
+            print(f"[FIXED] {f.path}")
+    if dry_run or report:
+        print_report(changes, len(todo), dry_run, skipped)
+    return changes
 
-def run():
-    for p in ROOT.glob("**/v1/*.jsonl"):
-        fix_jsonl(p)
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="migrate_tokens", description="Migrate legacy target tokens in demos/drills.")
+    ap.add_argument("--dry-run", action="store_true", help="print the legacy -> canonical report, write nothing")
+    ap.add_argument("--report", action="store_true", help="also print the report after writing")
+    ap.add_argument("--root", default=str(ROOT), help="content root (default: content/)")
+    ap.add_argument("--jobs", "-j", type=int, default=1, metavar="N",
+                    help="write files with N threads (0 = all cores)")
+    add_arguments(ap)
+    args = ap.parse_args(argv)
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    with session("migrate_tokens", timings=args.timings, profile=args.profile):
+        run(Corpus(Path(args.root)), dry_run=args.dry_run, jobs=jobs, report=args.report)
+    return 0
 
 if __name__=="__main__":
-    run()
+    sys.exit(main())
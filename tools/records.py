@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Compact drill records for tools that hold the whole corpus in memory.
+
+A parsed JSONL line (corpus.Line: the raw string plus a json dict with its
+own key and value strings) costs over a kilobyte per drill. DrillTable keeps
+what corpus-scale tools look at in array columns instead:
+
+  file       index into table.files (the ContentFile, hence path and module)
+  line       1-based line number
+  start/end  character span of the line in the file text
+  status     OK, BAD_JSON (line does not parse) or NOT_OBJECT
+  target     symbol code of "target"   (MISSING if absent or "", NOT_STR if
+  spot_kind  symbol code of "spot_kind" not a string, e.g. ["call"])
+
+Symbol codes come from one process-wide Symbols table seeded with
+spec.TOKENS, so a token is the same small int in every table and the string
+exists once. Everything else (id, question, rationale, ...) is decoded from
+the line text when asked for and not kept: table[i] is a Drill view whose
+.obj parses the line on each access.
+
+Per drill the columns take 25 bytes; the file texts, which Corpus holds
+anyway, are the rest. For 1M synthetic drills (197 MB of JSONL) a table
+peaks at ~450 MB RSS; cached parsed lines took ~1.4 GB.
+
+iter_lines() is the matching streaming read: it yields corpus.Line objects
+for a file without caching them on the ContentFile (a file that is already
+parsed hands out its cached lines), so a pass over every file no longer pins
+every parsed line until the corpus is dropped.
+
+Stdlib only.
+"""
+
+from __future__ import annotations
+
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import jsoncodec
+from corpus import ContentFile, Line, split_lines
+from spec import TOKENS
+
+OK, BAD_JSON, NOT_OBJECT = 0, 1, 2
+MISSING, NOT_STR = 0, 1  # reserved symbol codes
+
+
+class Symbols:
+    """Interned strings <-> small int codes; codes are never reused."""
+
+    def __init__(self, seed: Iterable[str] = ()):
+        self.names: List[Optional[str]] = [None, None]  # MISSING, NOT_STR
+        self.codes: Dict[str, int] = {}
+        for s in seed:
+            self.code(s)
+
+    def code(self, value: Any) -> int:
+        if value is None or value == "":
+            return MISSING
+        if not isinstance(value, str):
+            return NOT_STR
+        c = self.codes.get(value)
+        if c is None:
+            c = self.codes[value] = len(self.names)
+            self.names.append(value)
+        return c
+
+    def name(self, code: int) -> Optional[str]:
+        return self.names[code]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+SYMBOLS = Symbols(sorted(TOKENS))
+
+
+def iter_lines(cf: ContentFile) -> Iterator[Line]:
+    """Lines of cf, parsed one at a time and not cached (unless cf already is)."""
+    if cf.parsed:
+        yield from cf.lines
+        return
+    for no, (raw, nl) in enumerate(split_lines(cf.text), start=1):
+        yield Line(no, raw, nl)
+
+
+class Drill:
+    """View of one row of a DrillTable; text fields are decoded on access."""
+
+    __slots__ = ("table", "i")
+
+    def __init__(self, table: "DrillTable", i: int):
+        self.table = table
+        self.i = i
+
+    def __repr__(self) -> str:
+        return f"Drill({self.path}:{self.line})"
+
+    @property
+    def file(self) -> ContentFile:
+        return self.table.files[self.table.file[self.i]]
+
+    @property
+    def path(self) -> str:
+        return str(self.file.path)
+
+    @property
+    def module(self) -> str:
+        return self.file.module
+
+    @property
+    def line(self) -> int:
+        return self.table.line[self.i]
+
+    @property
+    def status(self) -> int:
+        return self.table.status[self.i]
+
+    @property
+    def raw(self) -> str:
+        t = self.table
+        return t.files[t.file[self.i]].text[t.start[self.i]:t.end[self.i]]
+
+    @property
+    def target(self) -> Optional[str]:
+        return SYMBOLS.name(self.table.target[self.i])
+
+    @property
+    def spot_kind(self) -> Optional[str]:
+        return SYMBOLS.name(self.table.spot_kind[self.i])
+
+    @property
+    def obj(self) -> Any:
+        """The parsed line (a new object on every access); None if it does not parse."""
+        return Line(self.line, self.raw, "").obj
+
+    @property
+    def error(self) -> Optional[jsoncodec.JSONDecodeError]:
+        return Line(self.line, self.raw, "").error
+
+    def get(self, key: str, default: Any = None) -> Any:
+        obj = self.obj
+        return obj.get(key, default) if isinstance(obj, dict) else default
+
+
+class DrillTable:
+    """Column store of the non-blank lines of drills files."""
+
+    def __init__(self, files: Iterable[ContentFile] = ()):
+        self.files: List[ContentFile] = []
+        self.first = array("I")  # first row of each file; len(self) closes the last one
+        self.file = array("I")
+        self.line = array("I")
+        self.start = array("I")
+        self.end = array("I")
+        self.status = array("B")
+        self.target = array("I")
+        self.spot_kind = array("I")
+        for cf in files:
+            self.add(cf)
+
+    def __len__(self) -> int:
+        return len(self.line)
+
+    def __getitem__(self, i: int) -> Drill:
+        if not 0 <= i < len(self.line):
+            raise IndexError(i)
+        return Drill(self, i)
+
+    def __iter__(self) -> Iterator[Drill]:
+        return (Drill(self, i) for i in range(len(self.line)))
+
+    def add(self, cf: ContentFile) -> int:
+        """Append the rows of one drills file; return its file index."""
+        file_no = len(self.files)
+        self.files.append(cf)
+        self.first.append(len(self.line))
+        code = SYMBOLS.code
+        pos = 0
+        for ln in iter_lines(cf):
+            start = pos + (len(ln.raw) - len(ln.body))  # a BOM on line 1 is not part of the record
+            pos += len(ln.raw) + len(ln.nl)
+            if ln.blank:
+                continue
+            obj = ln.obj
+            self.file.append(file_no)
+            self.line.append(ln.no)
+            self.start.append(start)
+            self.end.append(start + len(ln.body))
+            if ln.error is not None:
+                self.status.append(BAD_JSON)
+            elif not isinstance(obj, dict):
+                self.status.append(NOT_OBJECT)
+            else:
+                self.status.append(OK)
+                self.target.append(code(obj.get("target")))
+                self.spot_kind.append(code(obj.get("spot_kind")))
+                continue
+            self.target.append(MISSING)
+            self.spot_kind.append(MISSING)
+        return file_no
+
+    def rows(self, file_no: int) -> range:
+        """Row indexes of one file."""
+        end = self.first[file_no + 1] if file_no + 1 < len(self.first) else len(self.line)
+        return range(self.first[file_no], end)
+
+    def bad(self, file_no: int) -> List[Drill]:
+        """Rows of a file that are not JSON objects."""
+        return [Drill(self, i) for i in self.rows(file_no) if self.status[i] != OK]
+
+    def targets(self, file_no: int) -> List[Optional[str]]:
+        """Sorted distinct targets of a file's records; None stands for a non-string target."""
+        codes = {self.target[i] for i in self.rows(file_no) if self.status[i] == OK} - {MISSING}
+        names = sorted(SYMBOLS.name(c) for c in codes if c != NOT_STR)
+        return names + [None] if NOT_STR in codes else names
+
+    def nbytes(self) -> int:
+        """Bytes held by the columns (the file texts not included)."""
+        cols = (self.first, self.file, self.line, self.start, self.end, self.status, self.target, self.spot_kind)
+        return sum(c.itemsize * len(c) for c in cols)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Streaming issue reporters for validate_content.
+
+Issues are written the moment they are emitted, never collected, so memory
+stays flat however many issues a run finds. Formats:
+
+  text   [ERR] <path>[:line] :: <message>, then "Summary: ..." (the historic output)
+  jsonl  one {"type": "issue", ...} object per line, then one {"type": "summary", ...}
+  sarif  SARIF 2.1.0; results are streamed inside the runs[0].results array
+
+Every issue is (level, where, message, rule). Options shared by all formats:
+
+  suppress    rule ids or fnmatch patterns ("drills.*") that are dropped
+              entirely (not shown, not counted, never fail the run)
+  max_issues  stop the run after this many reported issues
+  fail_fast   stop the run at the first reported ERR
+  tee         also called with every reported issue (shard.ShardResult)
+
+A stopped run says so in its summary; `stopped` tells the producer to quit.
+
+Stdlib only.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from fnmatch import fnmatchcase
+from typing import Callable, Dict, Iterable, Optional, TextIO, Tuple
+
+FORMATS = ("text", "jsonl", "sarif")
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+SARIF_LEVEL = {"ERR": "error", "WARN": "warning"}
+
+
+def split_where(where: str) -> Tuple[str, Optional[int]]:
+    """'<path>:<line>' -> (path, line); a bare path gives line None."""
+    path, sep, tail = where.rpartition(":")
+    if sep and tail.isdigit():
+        return path, int(tail)
+    return where, None
+
+
+class Reporter:
+    def __init__(self, out: TextIO, suppress: Iterable[str] = (), max_issues: int = 0, fail_fast: bool = False,
+                 tee: Optional[Callable[[tuple], None]] = None):
+        self.out = out
+        self.tee = tee
+        self.suppress = tuple(suppress)
+        self.max_issues = max_issues
+        self.fail_fast = fail_fast
+        self.errors = 0
+        self.warnings = 0
+        self.suppressed = 0
+        self.stopped: Optional[str] = None
+        self._muted: Dict[str, bool] = {}
+
+    def _is_suppressed(self, rule: str) -> bool:
+        hit = self._muted.get(rule)
+        if hit is None:
+            hit = self._muted[rule] = any(fnmatchcase(rule, pat) for pat in self.suppress)
+        return hit
+
+    def emit(self, issue) -> bool:
+        """Report one issue; return False once the run should stop."""
+        if self.stopped:
+            return False
+        level, where, msg, rule = issue
+        if self._is_suppressed(rule):
+            self.suppressed += 1
+            return True
+        if level == "ERR":
+            self.errors += 1
+        else:
+            self.warnings += 1
+        self.write(level, where, msg, rule)
+        if self.tee is not None:
+            self.tee(issue)
+        if self.fail_fast and level == "ERR":
+            self.stopped = "--fail-fast: first error"
+        elif self.max_issues and self.errors + self.warnings >= self.max_issues:
+            self.stopped = f"--max-issues {self.max_issues} reached"
+        return not self.stopped
+
+    def write(self, level: str, where: str, msg: str, rule: str) -> None:
+        raise NotImplementedError
+
+    def close(self) -> int:
+        """Finish the output; return the exit code (1 if any ERR was reported)."""
+        return 1 if self.errors else 0
+
+
+class TextReporter(Reporter):
+    def write(self, level, where, msg, rule):
+        self.out.write(f"[{level}] {where} :: {msg}\n")
+
+    def close(self) -> int:
+        note = f" (stopped: {self.stopped})" if self.stopped else ""
+        self.out.write(f"\nSummary: {self.errors} errors, {self.warnings} warnings{note}\n")
+        if self.suppressed:
+            self.out.write(f"Suppressed: {self.suppressed}\n")
+        self.out.flush()
+        return super().close()
+
+
+class JsonlReporter(Reporter):
+    def write(self, level, where, msg, rule):
+        path, line = split_where(where)
+        self.out.write(json.dumps({"type": "issue", "level": level, "rule": rule, "path": path,
+                                   "line": line, "message": msg}, ensure_ascii=False) + "\n")
+
+    def close(self) -> int:
+        self.out.write(json.dumps({"type": "summary", "errors": self.errors, "warnings": self.warnings,
+                                   "suppressed": self.suppressed, "stopped": self.stopped}) + "\n")
+        self.out.flush()
+        return super().close()
+
+
+class SarifReporter(Reporter):
+    def __init__(self, out: TextIO, tool: str, version: str, rules: Dict[str, str], **kw):
+        super().__init__(out, **kw)
+        driver = {"name": tool, "version": version,
+                  "rules": [{"id": rid, "shortDescription": {"text": text}} for rid, text in rules.items()]}
+        head = json.dumps({"$schema": SARIF_SCHEMA, "version": "2.1.0",
+                           "runs": [{"tool": {"driver": driver}, "results": []}]}, ensure_ascii=False)
+        # stream results into the (empty) array: everything before its "]" now, the rest in close()
+        cut = head.rindex("[]") + 1
+        self.out.write(head[:cut])
+        self._tail = head[cut:]
+        self._first = True
+
+    def write(self, level, where, msg, rule):
+        path, line = split_where(where)
+        if os.path.isabs(path):
+            rel = os.path.relpath(path)
+            path = path if rel.startswith("..") else rel  # SARIF viewers resolve against the checkout
+        loc = {"artifactLocation": {"uri": path.replace(os.sep, "/")}}
+        if line is not None:
+            loc["region"] = {"startLine": line}
+        res = {"ruleId": rule, "level": SARIF_LEVEL.get(level, "note"), "message": {"text": msg},
+               "locations": [{"physicalLocation": loc}]}
+        self.out.write(("\n" if self._first else ",\n") + json.dumps(res, ensure_ascii=False))
+        self._first = False
+
+    def close(self) -> int:
+        # the tail closes results, the run and the log; invocations go before the run closes
+        inv = {"executionSuccessful": True,  # a --fail-fast/--max-issues stop is not a tool failure
+               "properties": {"errors": self.errors, "warnings": self.warnings,
+                              "suppressed": self.suppressed, "stopped": self.stopped}}
+        self.out.write("\n]," + json.dumps({"invocations": [inv]})[1:-1] + self._tail[1:] + "\n")
+        self.out.flush()
+        return super().close()
+
+
+def make(fmt: str, out: TextIO, tool: str = "", version: str = "", rules: Optional[Dict[str, str]] = None,
+         **kw) -> Reporter:
+    if fmt == "jsonl":
+        return JsonlReporter(out, **kw)
+    if fmt == "sarif":
+        return SarifReporter(out, tool, version, rules or {}, **kw)
+    return TextReporter(out, **kw)
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Deterministic module sharding for CI matrices, and the merge of shard results.
+
+  --shard i/N   (1 <= i <= N) keeps the modules with shard_of(name, N) == i
+
+A module's shard depends only on its name (sha1 of the name, mod N), so
+adding or removing modules never moves the others. validate_content,
+jsonl_guard and allowlists_sync --check take --shard and --json FILE; the
+JSON file is one shard's result:
+
+  {"tool": "validate_content", "shard": "2/4", "modules": [...], "rc": 1,
+   "issues": [{"level": "ERR", "rule": "...", "module": "...",
+               "path": "...", "line": 12, "message": "..."}]}
+
+Issues are listed in the tool's own order (module order). merge combines the
+results of every shard of every tool into one report:
+
+  python3 tools/shard.py merge build/shards/*.json [--json FILE]
+
+It prints the issues per tool in module order, the same order an unsharded
+run reports them in, then one summary line per tool. The exit code is the
+highest shard rc, or 2 if a tool's shards disagree on N or one is missing
+or duplicated (a lost runner must not pass as clean).
+
+A matrix job runs, e.g. with shard: [1, 2, 3, 4]:
+
+  python3 tools/validate_content.py --shard ${{ matrix.shard }}/4 --json build/shards/validate-${{ matrix.shard }}.json
+
+and a final job downloads the artifacts and runs merge.
+
+Stdlib only.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import loader
+
+
+def parse_spec(spec: str) -> Tuple[int, int]:
+    """'i/N' -> (i, N); argparse type for --shard."""
+    try:
+        i, n = (int(x) for x in spec.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected i/N, got {spec!r}")
+    if not 1 <= i <= n:
+        raise argparse.ArgumentTypeError(f"shard {spec!r}: need 1 <= i <= N")
+    return i, n
+
+
+def format_spec(shard: Tuple[int, int]) -> str:
+    return f"{shard[0]}/{shard[1]}"
+
+
+def shard_of(module: str, count: int) -> int:
+    """1-based shard of a module name; stable across runs, machines and Python versions."""
+    return int.from_bytes(hashlib.sha1(module.encode("utf-8")).digest()[:8], "big") % count + 1
+
+
+def select(names: Iterable[str], shard: Optional[Tuple[int, int]]) -> List[str]:
+    """The names that belong to shard (all of them when shard is None), order kept."""
+    if shard is None:
+        return list(names)
+    i, n = shard
+    return [name for name in names if shard_of(name, n) == i]
+
+
+def modules(root: Path, filenames: Iterable[str], shard: Optional[Tuple[int, int]]) -> List[str]:
+    """Module names under root with a v1/ directory that belong to shard."""
+    return select((name for name, _, _ in loader.discover(Path(root), filenames)), shard)
+
+
+class ShardResult:
+    """One tool's result for one shard; save() writes the --json file."""
+
+    def __init__(self, tool: str, shard: Optional[Tuple[int, int]], modules: List[str]):
+        self.tool = tool
+        self.shard = shard or (1, 1)
+        self.modules = list(modules)
+        self.issues: List[Dict[str, Any]] = []
+
+    def add(self, level: str, rule: str, module: str, path: str, line: Optional[int], message: str) -> None:
+        self.issues.append({"level": level, "rule": rule, "module": module, "path": path,
+                            "line": line, "message": message})
+
+    def save(self, path: str, rc: int) -> None:
+        doc = {"tool": self.tool, "shard": format_spec(self.shard), "modules": self.modules,
+               "rc": rc, "issues": self.issues}
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text(json.dumps(doc, ensure_ascii=False, indent=1) + "\n", encoding="utf-8")
+
+
+def merge(docs: List[Dict[str, Any]]) -> Tuple[int, Dict[str, Any], List[str]]:
+    """Combine shard results; return (rc, merged document, problems)."""
+    by_tool: Dict[str, List[Dict[str, Any]]] = {}
+    for doc in docs:
+        by_tool.setdefault(doc["tool"], []).append(doc)
+    rc = 0
+    problems: List[str] = []
+    tools: Dict[str, Any] = {}
+    for tool in sorted(by_tool):
+        shards = by_tool[tool]
+        specs = [parse_spec(d["shard"]) for d in shards]
+        counts = {n for _, n in specs}
+        if len(counts) != 1:
+            problems.append(f"{tool}: shards disagree on N: {sorted(d['shard'] for d in shards)}")
+        else:
+            n = counts.pop()
+            seen = sorted(i for i, _ in specs)
+            if seen != list(range(1, n + 1)):
+                missing = sorted(set(range(1, n + 1)) - set(seen))
+                dup = sorted({i for i in seen if seen.count(i) > 1})
+                problems.append(f"{tool}: shards of {n}: missing {missing}, duplicated {dup}")
+        # the tool's order within a shard is module order: a stable sort by module restores the full run
+        issues = sorted((i for d in shards for i in d["issues"]), key=lambda i: i["module"])
+        errors = sum(1 for i in issues if i["level"] == "ERR")
+        tool_rc = max(d["rc"] for d in shards)
+        tools[tool] = {"shards": len(shards), "modules": sum(len(d["modules"]) for d in shards),
+                       "rc": tool_rc, "errors": errors, "warnings": len(issues) - errors, "issues": issues}
+        rc = max(rc, tool_rc)
+    if problems:
+        rc = 2
+    return rc, {"rc": rc, "problems": problems, "tools": tools}, problems
+
+
+def _where(issue: Dict[str, Any]) -> str:
+    return issue["path"] + (f":{issue['line']}" if issue["line"] else "")
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="shard", description="Merge per-shard --json results into one report.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    mp = sub.add_parser("merge", help="combine shard result files; exit with the highest rc")
+    mp.add_argument("files", nargs="+", help="shard result files (--json output of the tools)")
+    mp.add_argument("--json", metavar="FILE", help="also write the merged report as JSON")
+    args = ap.parse_args(argv)
+
+    docs = []
+    for f in args.files:
+        try:
+            docs.append(json.loads(Path(f).read_text(encoding="utf-8")))
+        except (OSError, ValueError) as e:
+            print(f"[merge] cannot read {f}: {e}", file=sys.stderr)
+            return 2
+    rc, merged, problems = merge(docs)
+    for tool, res in merged["tools"].items():
+        for i in res["issues"]:
+            print(f"[{i['level']}] {_where(i)} :: {i['message']}")
+    for tool, res in merged["tools"].items():
+        print(f"{tool}: {res['errors']} errors, {res['warnings']} warnings "
+              f"({res['modules']} modules in {res['shards']} shards, rc={res['rc']})")
+    for p in problems:
+        print(f"[merge] {p}", file=sys.stderr)
+    if args.json:
+        Path(args.json).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.json).write_text(json.dumps(merged, ensure_ascii=False, indent=1) + "\n", encoding="utf-8")
+    return rc
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,6 @@
 # tools/spec.py
 from pathlib import Path
+import hashlib
 import re
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
@@ -38,4 +39,23 @@ CHKCHK_WORDS = {"chk-chk","chk–chk","check-check","check—check"}
 
 # мягкие рекомендации по связке «таргет ↔ контекст»
 SOFT_STATIC_TARGETS = {"small_cbet_33","size_down_dry"}
-SOFT_DYNAMIC_TARGETS = {"half_pot_50","size_up_wet","big_bet_75","double_barrel_good","triple_barrel_scare"}
\ No newline at end of file
+SOFT_DYNAMIC_TARGETS = {"half_pot_50","size_up_wet","big_bet_75","double_barrel_good","triple_barrel_scare"}
+
+# theory.md: обязательные разделы, обязательные упоминания (в этом порядке) и офф-три размеры
+THEORY_SECTIONS = ("What it is","Why it matters")
+THEORY_HEADINGS = THEORY_SECTIONS + ("Rules of thumb","Mini example","Common mistakes","Mini-glossary","Contrast")
+THEORY_MENTIONS = ("size_down_dry","size_up_wet","small_cbet_33","half_pot_50","big_bet_75")
+# название -> regex; границы слова, чтобы "pot" в обычной речи и токены вроде x_overbet_y не срабатывали
+OFF_TREE_SIZES = {
+    "quarter": r"\bquarter\b",
+    "pot-size": r"\bpot-sized?\b|\bpot[- ]?sized? (?:bets?|raises?|jams?|shoves?)\b|\bpot bets?\b|\b(?:full|1x) pot\b",
+    "1/3 pot": r"(?<![\w/.])1/3 pot\b",
+    "2/3": r"(?<![\w/.])2/3(?![\w/])",
+    "66%": r"(?<![\w.])66%",
+    "80%": r"(?<![\w.])80%",
+    "overbet": r"\boverbet(?:s|ting)?\b",
+    "x pot": r"(?<![\w.])\d+(?:\.\d+)?x pot\b",
+}
+
+# версия набора правил: меняется при любой правке этого файла (ключ кеша validate_content)
+RULESET_VERSION = hashlib.sha1(Path(__file__).read_bytes()).hexdigest()[:12]
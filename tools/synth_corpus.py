@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Synthetic content tree generator for benchmarking the content tools.
+
+Writes, under --out:
+  content/<module>/v1/{theory.md,demos.jsonl,drills.jsonl}
+  prompts/dispatcher/_ALL.txt          (messy on purpose: tabs, trailing
+                                        spaces, blank lines, empty lists)
+  tooling/curriculum_ids.dart          (module id SSOT)
+  tooling/allowlists/                  (empty; allowlists_sync fills it)
+
+Records use the real spec.TOKENS vocabulary and the spec.py hint/evidence
+words, so validate_content exercises every rule. A share of drills lines
+(--bad-ratio) is malformed in ways each jsonl_guard fixer repairs:
+  trailing_comma            {"a": 1, }
+  trailing_space_comma      {"a": 1,}<spaces/tabs>
+  missing_comma_spot_steps  "spot_kind": "..." "steps": [...]
+  bom                       UTF-8 BOM on line 1 (per file)
+and --unfixable-ratio lines no fixer can repair.
+
+Output is deterministic for a given --seed and size.
+
+Usage:
+  python3 tools/synth_corpus.py --out /tmp/synth --modules 950 --drills 16 --demos 14
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+from pathlib import Path
+from typing import List
+
+from spec import (TOKENS, STATIC_HINTS, DYNAMIC_HINTS, EVIDENCE_WORDS,
+                  CHKCHK_WORDS, SIZE_TOKENS, FAMILY_TOKENS)
+
+# today's corpus: ~95 modules, ~16 drills and ~14 demos each
+BASE_MODULES = 95
+BASE_DRILLS = 16
+BASE_DEMOS = 14
+
+PREFIXES = ("core_", "cash_", "mtt_", "icm_", "hu_", "math_", "live_", "online_", "exploit_", "spr_")
+SPOT_KINDS = ("l2_core_rules_check", "l3_flop_cbet", "l3_turn_probe", "l3_river_bluffcatch", "none")
+FILLER = ("versus a capped range", "on the turn", "after a flop check", "with SPR near 3",
+          "in a single-raised pot", "facing a small lead", "out of position", "in position")
+
+TOKENS_SORTED = sorted(TOKENS)
+STATIC_SORTED = sorted(STATIC_HINTS)
+DYNAMIC_SORTED = sorted(DYNAMIC_HINTS)
+EVIDENCE_SORTED = sorted(EVIDENCE_WORDS)
+CHKCHK_SORTED = sorted(CHKCHK_WORDS)
+SIZES_SORTED = sorted(SIZE_TOKENS | FAMILY_TOKENS)
+
+FIXABLE = ("trailing_comma", "trailing_space_comma", "missing_comma_spot_steps")
+
+
+def module_ids(n: int) -> List[str]:
+    return [f"{PREFIXES[i % len(PREFIXES)]}synth_{i:05d}" for i in range(n)]
+
+
+def _sentence(rng: random.Random) -> str:
+    board = rng.choice(STATIC_SORTED if rng.random() < 0.5 else DYNAMIC_SORTED)
+    return f"Board {board} {rng.choice(FILLER)}"
+
+
+def _drill(rng: random.Random, module: str, i: int) -> dict:
+    target = rng.choice(TOKENS_SORTED)
+    rationale = rng.choice(FILLER)
+    if rng.random() < 0.6:
+        rationale += f"; {rng.choice(EVIDENCE_SORTED)}"
+    if rng.random() < 0.3:
+        rationale += f" after {rng.choice(CHKCHK_SORTED)}"
+    if rng.random() < 0.2:
+        rationale += " on a scare card"
+    return {
+        "id": f"{module}_drill_{i:03d}",
+        "spot_kind": rng.choice(SPOT_KINDS),
+        "question": f"{_sentence(rng)}. Best plan?",
+        "target": target,
+        "rationale": rationale,
+    }
+
+
+def _demo(rng: random.Random, module: str, i: int) -> dict:
+    steps = [_sentence(rng) for _ in range(3)]
+    steps.append(f"Hero uses {rng.choice(TOKENS_SORTED)}")
+    if rng.random() < 0.2:
+        steps.append(f"{rng.choice(CHKCHK_SORTED)} then probe_turns")
+    return {"id": f"{module}_demo_{i:03d}", "spot_kind": rng.choice(SPOT_KINDS), "steps": steps}
+
+
+def _malformed(rng: random.Random, obj: dict, kind: str) -> str:
+    line = json.dumps(obj, ensure_ascii=False)
+    if kind == "trailing_comma":
+        return line[:-1] + ", }"
+    if kind == "trailing_space_comma":
+        return line[:-1] + ",}" + rng.choice(("  ", "\t", " \t "))
+    if kind == "missing_comma_spot_steps":
+        rest = {k: v for k, v in obj.items() if k not in ("id", "spot_kind")}
+        return (f'{{"id": {json.dumps(obj["id"])}, "spot_kind": {json.dumps(obj["spot_kind"])} '
+                f'"steps": ["s1", "s2"], ' + json.dumps(rest)[1:])
+    # unfixable: unterminated string
+    return line[:-2]
+
+
+def _theory(rng: random.Random, module: str) -> str:
+    parts = ["What it is", f"{module} covers {rng.choice(FILLER)}.", ""]
+    if rng.random() < 0.9:
+        parts += ["Why it matters", "Sizing discipline compounds.", ""]
+    mentions = [t for t in SIZES_SORTED if rng.random() < 0.9]
+    parts.append("Families and sizes: " + ", ".join(mentions) + ".")
+    if rng.random() < 0.1:
+        parts.append("Some players overbet the pot here.")
+    return "\n".join(parts) + "\n"
+
+
+def _dispatcher_block(rng: random.Random, module: str) -> str:
+    r = rng.random()
+    spots = ["l2_core_rules_check"] if r > 0.2 else []
+    tgts = rng.sample(TOKENS_SORTED, 3) if r > 0.3 else []
+    indent = "\t" if r < 0.1 else "  "
+    trail = "   " if 0.1 <= r < 0.2 else ""
+    lines = [f"module_id: {module}{trail}", "short_scope: TODO", "spotkind_allowlist:"]
+    lines += [f"{indent}{s}" for s in spots]
+    if r > 0.8:
+        lines.append("")
+    lines.append("target_tokens_allowlist:")
+    lines += [f"{indent}{t}{trail}" for t in tgts]
+    if r > 0.9:
+        lines.append(f"GO MODULE: {module}")
+    return "\n".join(lines) + "\n"
+
+
+def generate(out: Path, modules: int, drills: int, demos: int,
+             bad_ratio: float = 0.02, unfixable_ratio: float = 0.0, seed: int = 1) -> dict:
+    rng = random.Random(seed)
+    ids = module_ids(modules)
+    stats = {"modules": modules, "drills": 0, "demos": 0, "bad_lines": 0, "unfixable_lines": 0}
+    content = out / "content"
+    for mod in ids:
+        d = content / mod / "v1"
+        d.mkdir(parents=True, exist_ok=True)
+        (d / "theory.md").write_text(_theory(rng, mod), encoding="utf-8")
+
+        lines = []
+        for i in range(1, drills + 1):
+            obj = _drill(rng, mod, i)
+            r = rng.random()
+            if r < unfixable_ratio:
+                lines.append(_malformed(rng, obj, "unfixable"))
+                stats["unfixable_lines"] += 1
+            elif r < unfixable_ratio + bad_ratio:
+                lines.append(_malformed(rng, obj, rng.choice(FIXABLE)))
+                stats["bad_lines"] += 1
+            else:
+                lines.append(json.dumps(obj, ensure_ascii=False))
+        text = "\n".join(lines) + "\n"
+        if rng.random() < bad_ratio:
+            text = "\ufeff" + text
+            stats["bad_lines"] += 1
+        (d / "drills.jsonl").write_text(text, encoding="utf-8")
+        stats["drills"] += drills
+
+        demo_lines = [json.dumps(_demo(rng, mod, i), ensure_ascii=False) for i in range(1, demos + 1)]
+        (d / "demos.jsonl").write_text("\n".join(demo_lines) + "\n", encoding="utf-8")
+        stats["demos"] += demos
+
+    disp = out / "prompts" / "dispatcher" / "_ALL.txt"
+    disp.parent.mkdir(parents=True, exist_ok=True)
+    disp.write_text("".join(_dispatcher_block(rng, m) for m in ids), encoding="utf-8")
+
+    ssot = out / "tooling" / "curriculum_ids.dart"
+    ssot.parent.mkdir(parents=True, exist_ok=True)
+    ssot.write_text("const List<String> curriculumIds = [\n"
+                    + "".join(f'  "{m}",\n' for m in ids) + "];\n", encoding="utf-8")
+    (out / "tooling" / "allowlists").mkdir(parents=True, exist_ok=True)
+    return stats
+
+
+def main(argv: List[str]) -> int:
+    ap = argparse.ArgumentParser(prog="synth_corpus", description="Generate a synthetic content/ tree.")
+    ap.add_argument("--out", required=True, help="output root (content/, prompts/, tooling/ go under it)")
+    ap.add_argument("--scale", type=float, default=None,
+                    help=f"shortcut: {BASE_MODULES}*SCALE modules at today's per-module size")
+    ap.add_argument("--modules", type=int, default=BASE_MODULES)
+    ap.add_argument("--drills", type=int, default=BASE_DRILLS, help="drills per module")
+    ap.add_argument("--demos", type=int, default=BASE_DEMOS, help="demos per module")
+    ap.add_argument("--bad-ratio", type=float, default=0.02, help="share of fixable malformed drills lines")
+    ap.add_argument("--unfixable-ratio", type=float, default=0.0, help="share of unfixable drills lines")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args(argv)
+
+    modules = max(1, round(BASE_MODULES * args.scale)) if args.scale else args.modules
+    out = Path(args.out)
+    if (out / "content").exists() and any((out / "content").iterdir()):
+        print(f"refusing to write into non-empty {out / 'content'}", file=sys.stderr)
+        return 2
+    stats = generate(out, modules, args.drills, args.demos,
+                     bad_ratio=args.bad_ratio, unfixable_ratio=args.unfixable_ratio, seed=args.seed)
+    print(json.dumps(stats))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
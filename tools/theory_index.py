@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Structural index of a theory.md file, built in one pass.
+
+parse(text) returns a TheoryIndex with
+
+  headings  every heading in document order: ATX ("## Title"), setext
+            (a line underlined with === or ---) and the plain section lines
+            the corpus uses ("Why it matters" on a line of its own, see
+            spec.THEORY_HEADINGS). Each has a level, title, 1-based line and
+            parent, which gives the heading tree. Fenced code is skipped.
+  mentions  token -> [offsets] for spec.THEORY_MENTIONS, matched on word
+            boundaries (small_cbet_33 inside small_cbet_33x does not count)
+  sizing    [(term, offset)] hits of spec.OFF_TREE_SIZES, in text order
+
+Mentions and sizing terms are found by one alternation of named groups run
+once over the text; headings come from the walk that builds the line table.
+ContentFile.theory caches the index, so validate_content.check_theory and
+ensure_mentions parse a file once between them.
+
+Stdlib only.
+"""
+
+from __future__ import annotations
+
+import re
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+
+from spec import OFF_TREE_SIZES, THEORY_HEADINGS, THEORY_MENTIONS
+
+BOM = "\ufeff"
+
+# mentions first: a token never overlaps a sizing term (both sit on word boundaries)
+_SIZE_GROUPS = {f"s{i}": term for i, term in enumerate(OFF_TREE_SIZES)}
+SCAN = re.compile(
+    r"(?<!\w)(?P<m>" + "|".join(re.escape(t) for t in sorted(THEORY_MENTIONS, key=len, reverse=True)) + r")(?!\w)"
+    + "".join(f"|(?P<{g}>(?i:{OFF_TREE_SIZES[term]}))" for g, term in _SIZE_GROUPS.items())
+)
+ATX_RE = re.compile(r"^ {0,3}(#{1,6})(?:[ \t]+(.*?))?[ \t#]*$")
+SETEXT_RE = re.compile(r"^ {0,3}(=+|-+)[ \t]*$")
+FENCE_RE = re.compile(r"^ {0,3}(```|~~~)")
+
+
+def norm_title(title: str) -> str:
+    """Compare titles loosely: case, emphasis, a trailing colon and '-' vs ' ' do not matter."""
+    t = title.strip().strip("*_").strip().rstrip(":").strip()
+    return " ".join(t.lower().replace("-", " ").split())
+
+
+PLAIN_HEADINGS = {norm_title(t) for t in THEORY_HEADINGS}
+
+
+class Heading:
+    __slots__ = ("level", "title", "line", "offset", "parent", "children")
+
+    def __init__(self, level: int, title: str, line: int, offset: int):
+        self.level = level
+        self.title = title
+        self.line = line
+        self.offset = offset
+        self.parent: Optional[Heading] = None
+        self.children: List[Heading] = []
+
+    def __repr__(self) -> str:
+        return f"Heading({self.level}, {self.title!r}, line={self.line})"
+
+
+class TheoryIndex:
+    def __init__(self, headings: List[Heading], mentions: Dict[str, List[int]],
+                 sizing: List[Tuple[str, int]], line_starts: List[int]):
+        self.headings = headings
+        self.roots = [h for h in headings if h.parent is None]
+        self.mentions = mentions
+        self.sizing = sizing
+        self._line_starts = line_starts
+        self._by_title: Dict[str, Heading] = {}
+        for h in headings:
+            self._by_title.setdefault(norm_title(h.title), h)
+
+    def line_of(self, offset: int) -> int:
+        """1-based line number of a character offset."""
+        return bisect_right(self._line_starts, offset)
+
+    def section(self, title: str) -> Optional[Heading]:
+        """First heading with this title (compared with norm_title), or None."""
+        return self._by_title.get(norm_title(title))
+
+    def section_of(self, offset: int) -> Optional[Heading]:
+        """Innermost heading the offset falls under, or None before the first one."""
+        i = bisect_right([h.offset for h in self.headings], offset)
+        return self.headings[i - 1] if i else None
+
+    def missing_mentions(self) -> List[str]:
+        """spec.THEORY_MENTIONS tokens that never occur, in spec order."""
+        return [t for t in THEORY_MENTIONS if not self.mentions[t]]
+
+
+def parse(text: str) -> TheoryIndex:
+    headings: List[Heading] = []
+    line_starts: List[int] = []
+    fence = None
+    prev = None  # (title, line, offset) of the previous paragraph line, a setext candidate
+    offset = 0
+    for no, raw in enumerate(text.splitlines(keepends=True), start=1):
+        line_starts.append(offset)
+        start, offset = offset, offset + len(raw)
+        line = raw.rstrip("\r\n")
+        if no == 1 and line.startswith(BOM):
+            line = line[1:]
+        m = FENCE_RE.match(line)
+        if fence is not None:
+            if m and m.group(1) == fence:
+                fence = None
+            continue
+        if m:
+            fence, prev = m.group(1), None
+            continue
+        if not line.strip():
+            prev = None
+            continue
+        m = ATX_RE.match(line)
+        if m:
+            headings.append(Heading(len(m.group(1)), (m.group(2) or "").strip(), no, start))
+            prev = None
+            continue
+        m = SETEXT_RE.match(line)
+        if m and prev is not None:
+            headings.append(Heading(1 if m.group(1)[0] == "=" else 2, *prev))
+            prev = None
+            continue
+        if norm_title(line) in PLAIN_HEADINGS:
+            headings.append(Heading(1, line.strip().strip("*_").strip().rstrip(":").strip(), no, start))
+            prev = None
+            continue
+        prev = (line.strip(), no, start)
+
+    # heading tree: a heading's parent is the nearest earlier heading of a lower level
+    stack: List[Heading] = []
+    for h in headings:
+        while stack and stack[-1].level >= h.level:
+            stack.pop()
+        if stack:
+            h.parent = stack[-1]
+            stack[-1].children.append(h)
+        stack.append(h)
+
+    mentions: Dict[str, List[int]] = {t: [] for t in THEORY_MENTIONS}
+    sizing: List[Tuple[str, int]] = []
+    for m in SCAN.finditer(text):
+        if m.lastgroup == "m":
+            mentions[m.group()].append(m.start())
+        else:
+            sizing.append((_SIZE_GROUPS[m.lastgroup], m.start()))
+    return TheoryIndex(headings, mentions, sizing, line_starts)
@@ -1,115 +1,339 @@
 # tools/validate_content.py
-import json, sys
+import argparse, hashlib, os, sys, time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from spec import CONTENT_DIR, TOKENS, SIZE_TOKENS, FAMILY_TOKENS, \
+from spec import RULESET_VERSION, CONTENT_DIR, TOKENS, SIZE_TOKENS, FAMILY_TOKENS, \
                  STATIC_HINTS, DYNAMIC_HINTS, JSONL_LINE_RE, \
                  REQUIRES_CHKCHK, REQUIRES_BLOCKERS_OR_FV75, REQUIRES_SCARE, \
-                 EVIDENCE_WORDS, CHKCHK_WORDS, SOFT_STATIC_TARGETS, SOFT_DYNAMIC_TARGETS
+                 EVIDENCE_WORDS, CHKCHK_WORDS, SOFT_STATIC_TARGETS, SOFT_DYNAMIC_TARGETS, THEORY_SECTIONS
+from corpus import FILENAMES, Corpus, ContentFile
+from cache import CACHE_DIR, ResultCache, content_hash
+from keywords import KeywordMatcher
+from records import iter_lines
+from instrument import METRICS, add_arguments, session
+import reporter, shard
+
+# версия для отчётов (SARIF); кеш сбрасывается и без ручного бампа -- см. CODE_VERSION
+TOOL_VERSION = "5"
+# исходники, от которых зависят проверки (spec.py учтён в RULESET_VERSION):
+# любая правка любого из них -- новый ключ кеша, старые результаты не воспроизводятся
+CHECK_SOURCES = ("validate_content.py", "keywords.py", "theory_index.py", "records.py",
+                 "corpus.py", "loader.py", "jsoncodec.py")
+CODE_VERSION = hashlib.sha1(b"".join((Path(__file__).parent / n).read_bytes() for n in CHECK_SOURCES)).hexdigest()[:12]
+CACHE_PATH = CACHE_DIR / "validate_content.json"
 
 WARN, ERR = "WARN","ERR"
-issues = []
+issues = []  # scratch list: check_file() collects one file's issues here
+
+# rule id -> description (--suppress, --list-rules, SARIF rules)
+RULES = {
+    "read-error": "file could not be read as UTF-8",
+    "theory.missing-section": "theory.md lacks a required section",
+    "theory.missing-mention": "theory.md does not mention a core size family",
+    "theory.off-tree-sizing": "theory.md mentions an off-tree sizing",
+    "jsonl.malformed-line": "line is not a single JSON object",
+    "jsonl.parse-error": "line does not parse as JSON",
+    "demos.missing-key": "demo record lacks a required key",
+    "demos.steps-not-list": "demo steps is not a list of strings",
+    "demos.dynamic-target-on-static-hints": "dynamic-style target with static board hints",
+    "demos.static-target-on-dynamic-hints": "static-style target with dynamic board hints",
+    "demos.probe-turns-without-chkchk": "probe_turns demo without a chk-chk mention",
+    "drills.missing-key": "drill record lacks a required key",
+    "drills.unknown-target": "drill target is not a known token",
+    "drills.target-not-string": "drill target is not a string",
+    "drills.requires-chkchk": "target needs a chk-chk mention",
+    "drills.requires-evidence": "target needs blockers/Fv75 evidence",
+    "drills.requires-scare": "target needs a 'scare' mention",
+    "drills.static-target-on-dynamic-hints": "static target with dynamic board hints",
+    "drills.dynamic-target-on-static-hints": "dynamic target with static board hints",
+}
 
-def add(issue_type, path, msg, line=None):
+def add(issue_type, path, msg, line=None, rule=""):
     where = f"{path}" + (f":{line}" if line else "")
-    issues.append((issue_type, where, msg))
+    issues.append((issue_type, where, msg, rule))
 
-def read_text(p: Path) -> str:
-    try: return p.read_text(encoding="utf-8")
-    except Exception as e:
-        add(ERR, p, f"read error: {e}")
-        return ""
+def read_text(f: ContentFile) -> str:
+    txt = f.text
+    if f.read_error is not None:
+        add(ERR, f.path, f"read error: {f.read_error}", rule="read-error")
+    return txt
 
-def check_theory(p: Path):
-    txt = read_text(p)
+def check_theory(f: ContentFile):
+    p = f.path
+    txt = read_text(f)
     if not txt: return
-    # обязательные маркеры
-    required = ["What it is","Why it matters"]
-    for r in required:
-        if r not in txt:
-            add(WARN, p, f"missing section: {r}")
+    idx = f.theory  # один разбор файла: заголовки, упоминания, офф-три размеры
+    # обязательные разделы -- заголовки, а не подстрока где угодно
+    for r in THEORY_SECTIONS:
+        if idx.section(r) is None:
+            add(WARN, p, f"missing section: {r}", rule="theory.missing-section")
     # в теории должны фигурировать базовые семейства и 33/50/75
-    for req in ["size_down_dry","size_up_wet","small_cbet_33","half_pot_50","big_bet_75"]:
-        if req not in txt:
-            add(WARN, p, f"missing mention: {req}")
-    # запрет офф-три размеров
-    bad_sizes = ["quarter","pot ","1/3 pot","2/3","66%","80%","pot-size","overbet","x pot"]
-    if any(bs in txt for bs in bad_sizes):
-        add(WARN, p, f"possible off-tree sizing mention found")
-
-def each_jsonl(path: Path):
-    txt = read_text(path).splitlines()
-    for i, line in enumerate(txt, 1):
-        if not line.strip(): continue
-        if not JSONL_LINE_RE.match(line):
-            add(ERR, path, "malformed JSONL line", i); continue
-        try:
-            yield i, json.loads(line)
-        except Exception as e:
-            add(ERR, path, f"json parse error: {e}", i)
+    for req in idx.missing_mentions():
+        add(WARN, p, f"missing mention: {req}", rule="theory.missing-mention")
+    # запрет офф-три размеров: первое попадание по границам слова, со строкой
+    if idx.sizing:
+        term, off = idx.sizing[0]
+        add(WARN, p, f"possible off-tree sizing mention found: '{term}'", idx.line_of(off), "theory.off-tree-sizing")
 
-def contains_any(text: str, words:set[str]) -> bool:
-    low = text.lower()
-    return any(w.lower() in low for w in words)
+def each_jsonl(f: ContentFile):
+    read_text(f)
+    for ln in iter_lines(f):  # строки не кешируются: память не растёт с размером корпуса
+        if not ln.raw.strip(): continue
+        if not JSONL_LINE_RE.match(ln.raw):
+            add(ERR, f.path, "malformed JSONL line", ln.no, "jsonl.malformed-line"); continue
+        if ln.error is not None:
+            add(ERR, f.path, f"json parse error: {ln.error}", ln.no, "jsonl.parse-error"); continue
+        yield ln.no, ln.obj
 
-def check_demos(p: Path):
-    for ln, obj in each_jsonl(p):
+# все словари подсказок одним автоматом: один проход по тексту на запись
+HINTS = KeywordMatcher({
+    "static": STATIC_HINTS, "dynamic": DYNAMIC_HINTS,
+    "evidence": EVIDENCE_WORDS, "chkchk": CHKCHK_WORDS, "scare": {"scare"},
+    "soft_static": SOFT_STATIC_TARGETS, "soft_dynamic": SOFT_DYNAMIC_TARGETS,
+})
+
+def check_demos(f: ContentFile):
+    p = f.path
+    for ln, obj in each_jsonl(f):
         for key in ("id","spot_kind","steps"):
-            if key not in obj: add(ERR, p, f"missing key: {key}", ln)
+            if key not in obj: add(ERR, p, f"missing key: {key}", ln, "demos.missing-key")
         if "steps" in obj and not isinstance(obj["steps"], list):
-            add(ERR, p, "steps must be list[str]", ln)
+            add(ERR, p, "steps must be list[str]", ln, "demos.steps-not-list")
         # мягкие проверки контекста
         steps = " | ".join(obj.get("steps", []))
-        if contains_any(steps, STATIC_HINTS) and contains_any(steps, SOFT_DYNAMIC_TARGETS):
-            add(WARN, p, "dynamic-style target on static hints (review)", ln)
-        if contains_any(steps, DYNAMIC_HINTS) and contains_any(steps, SOFT_STATIC_TARGETS):
-            add(WARN, p, "static-style target on dynamic hints (review)", ln)
+        hits = HINTS.scan(steps)
+        METRICS.count("hint_scans")
+        if "static" in hits and "soft_dynamic" in hits:
+            add(WARN, p, "dynamic-style target on static hints (review)", ln, "demos.dynamic-target-on-static-hints")
+        if "dynamic" in hits and "soft_static" in hits:
+            add(WARN, p, "static-style target on dynamic hints (review)", ln, "demos.static-target-on-dynamic-hints")
         # probe_turns требует chk-chk в шагах
-        if "probe_turns" in steps and not contains_any(steps, CHKCHK_WORDS):
-            add(WARN, p, "probe_turns without chk-chk sequence mention", ln)
+        if "probe_turns" in steps and "chkchk" not in hits:
+            add(WARN, p, "probe_turns without chk-chk sequence mention", ln, "demos.probe-turns-without-chkchk")
 
-def check_drills(p: Path):
-    for ln, obj in each_jsonl(p):
+def check_drills(f: ContentFile):
+    p = f.path
+    for ln, obj in each_jsonl(f):
         for key in ("id","spot_kind","question","target","rationale"):
-            if key not in obj: add(ERR, p, f"missing key: {key}", ln)
+            if key not in obj: add(ERR, p, f"missing key: {key}", ln, "drills.missing-key")
         tgt = obj.get("target","")
+        if tgt is not None and not isinstance(tgt, str):
+            # как allowlists_sync: список/число в target -- ошибка, дальше проверяем как без таргета
+            add(ERR, p, "target must be a string", ln, "drills.target-not-string")
+            tgt = ""
         if tgt and tgt not in TOKENS:
-            add(ERR, p, f"unknown target token: {tgt}", ln)
+            add(ERR, p, f"unknown target token: {tgt}", ln, "drills.unknown-target")
         q = obj.get("question","")
         rat = obj.get("rationale","")
         body = f"{q} || {rat}"
+        hits = HINTS.scan(body)
+        METRICS.count("hint_scans")
 
         # жёсткие гейты
-        if tgt in REQUIRES_CHKCHK and not contains_any(body, CHKCHK_WORDS):
-            add(WARN, p, f"'{tgt}' without chk-chk mention", ln)
-        if tgt in REQUIRES_BLOCKERS_OR_FV75 and not contains_any(body, EVIDENCE_WORDS):
-            add(WARN, p, f"'{tgt}' without blockers/Fv75 evidence mention", ln)
-        if tgt in REQUIRES_SCARE and "scare" not in body.lower():
-            add(WARN, p, f"'{tgt}' without 'scare' mention", ln)
+        if tgt in REQUIRES_CHKCHK and "chkchk" not in hits:
+            add(WARN, p, f"'{tgt}' without chk-chk mention", ln, "drills.requires-chkchk")
+        if tgt in REQUIRES_BLOCKERS_OR_FV75 and "evidence" not in hits:
+            add(WARN, p, f"'{tgt}' without blockers/Fv75 evidence mention", ln, "drills.requires-evidence")
+        if tgt in REQUIRES_SCARE and "scare" not in hits:
+            add(WARN, p, f"'{tgt}' without 'scare' mention", ln, "drills.requires-scare")
 
         # мягкие рекомендации по тексту вопроса vs таргету
-        if tgt in SOFT_STATIC_TARGETS and contains_any(body, DYNAMIC_HINTS):
-            add(WARN, p, "static target on dynamic hints (review)", ln)
-        if tgt in SOFT_DYNAMIC_TARGETS and contains_any(body, STATIC_HINTS):
-            add(WARN, p, "dynamic target on static hints (review)", ln)
-
-def main():
-    for mod in CONTENT_DIR.glob("*/*"):
-        if mod.name != "v1": continue
-        theory = mod / "theory.md"
-        demos  = mod / "demos.jsonl"
-        drills = mod / "drills.jsonl"
-        if theory.exists(): check_theory(theory)
-        if demos.exists():  check_demos(demos)
-        if drills.exists(): check_drills(drills)
-
-    errs = [i for i in issues if i[0]==ERR]
-    warns= [i for i in issues if i[0]==WARN]
-
-    for t, where, msg in issues:
-        print(f"[{t}] {where} :: {msg}")
-
-    print(f"\nSummary: {len(errs)} errors, {len(warns)} warnings")
-    sys.exit(1 if errs else 0)
+        if tgt in SOFT_STATIC_TARGETS and "dynamic" in hits:
+            add(WARN, p, "static target on dynamic hints (review)", ln, "drills.static-target-on-dynamic-hints")
+        if tgt in SOFT_DYNAMIC_TARGETS and "static" in hits:
+            add(WARN, p, "dynamic target on static hints (review)", ln, "drills.dynamic-target-on-static-hints")
+
+CHECKS = (("theory", check_theory), ("demos", check_demos), ("drills", check_drills))
+CHECK_BY_KIND = dict(CHECKS)
+
+def check_file(f: ContentFile) -> list:
+    """Run the check for f.kind and return its issues (not left in `issues`)."""
+    start = len(issues)
+    with METRICS.phase(f"check.{f.kind}"):
+        CHECK_BY_KIND[f.kind](f)
+    METRICS.count("files_checked")
+    found = issues[start:]
+    del issues[start:]
+    return found
+
+def _check_batch(batch) -> list:
+    # process-pool worker: batch is [(kind, path, text)], one module
+    # returns (issues per file, wall seconds) so the parent can record module time
+    t0 = time.perf_counter()
+    out = []
+    for kind, path, text in batch:
+        f = ContentFile(Path(path), kind=kind)
+        f.set_text(text)
+        out.append(check_file(f))
+    return out, time.perf_counter() - t0
+
+def iter_check_files(files: list, jobs: int = 1):
+    """Yield one issue list per file, in input order, as soon as it is ready.
+
+    With jobs > 1, files are fanned out to a process pool one module per task;
+    results come back in input order so output matches a serial run. Closing
+    the generator early cancels modules not started yet.
+    """
+    if jobs <= 1 or len(files) < 2:
+        for f in files:
+            t0 = time.perf_counter()
+            found = check_file(f)
+            METRICS.module_time(f.module, time.perf_counter() - t0)
+            yield found
+        return
+    batches, slots, solo = [], [], {}
+    for idx, f in enumerate(files):
+        if f.text and f.read_error is None:
+            if not batches or files[slots[-1][-1]].module != f.module:
+                batches.append([]); slots.append([])
+            batches[-1].append((f.kind, str(f.path), f.text))
+            slots[-1].append(idx)
+        else:
+            solo[idx] = check_file(f)  # read errors / empty files: nothing to fan out
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        try:
+            done = iter(zip(slots, pool.map(_check_batch, batches)))
+            nxt = 0
+            for idxs, (found, secs) in done:
+                METRICS.module_time(files[idxs[0]].module, secs)
+                METRICS.count("files_checked", len(idxs))
+                for idx, got in zip(idxs, found):
+                    while nxt < idx:
+                        yield solo.pop(nxt); nxt += 1
+                    yield got; nxt += 1
+            while nxt < len(files):
+                yield solo.pop(nxt); nxt += 1
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+def check_files(files: list, jobs: int = 1) -> list:
+    """Return one issue list per file, in input order (see iter_check_files)."""
+    return list(iter_check_files(files, jobs))
+
+def _collect(issue) -> bool:
+    issues.append(issue)
+    return True
+
+def check_corpus(corpus: Corpus, cache: ResultCache = None, verify: bool = False, jobs: int = 1,
+                 emit=_collect, preload: bool = True) -> list:
+    """Run all checks and emit() every issue in module/kind order as soon as it is known.
+
+    With a cache, stored issues are replayed for unchanged files. With
+    verify=True every file is re-checked and compared against its cache
+    entry. The run stops as soon as emit() returns False. Returns the paths
+    whose cached issues differ from a fresh run.
+    """
+    files = [f for mod in corpus.modules for kind, _ in CHECKS for f in (mod.get(kind),) if f is not None]
+    if preload or jobs > 1:
+        corpus.preload(tuple(k for k, _ in CHECKS))  # concurrent reads; checks below hit memory
+
+    def plan():  # (file, key, digest, cached)
+        for f in files:
+            if cache is None:
+                yield f, None, None, None; continue
+            key, digest = str(f.path), content_hash(f.text)
+            yield f, key, digest, cache.get(key, digest)
+
+    if jobs > 1:
+        entries = list(plan())
+        fresh = iter_check_files([f for f, _, _, cached in entries if cached is None or verify], jobs)
+    else:
+        entries, fresh = plan(), None  # serial: read, check and emit file by file
+
+    mismatches = []
+    try:
+        for f, key, digest, cached in entries:
+            if cached is not None and not verify:
+                if not all(map(emit, map(tuple, cached))):
+                    break
+                continue
+            found = next(fresh) if fresh is not None else next(iter_check_files([f]))
+            stop = not all(map(emit, found))
+            if cache is not None and f.read_error is None:
+                if cached is not None and [list(i) for i in found] != cached:
+                    mismatches.append(key)
+                cache.put(key, digest, [list(i) for i in found])
+            if stop:
+                break
+    finally:
+        if fresh is not None:
+            fresh.close()
+    if cache is not None:
+        METRICS.count("cache_hits", cache.hits)
+        METRICS.count("cache_misses", cache.misses)
+    return mismatches
+
+def run(corpus: Corpus, use_cache: bool = False, verify_cache: bool = False, jobs: int = 1,
+        out: "reporter.Reporter" = None) -> int:
+    """Check the corpus, streaming issues to out (default: text on stdout)."""
+    issues.clear()
+    if out is None:
+        out = reporter.TextReporter(sys.stdout)
+    cache = None
+    if use_cache or verify_cache:
+        cache = ResultCache(CACHE_PATH, f"validate_content:{TOOL_VERSION}:{RULESET_VERSION}:{CODE_VERSION}")
+    # a run that may stop early reads lazily instead of preloading every file
+    try:
+        mismatches = check_corpus(corpus, cache, verify=verify_cache, jobs=jobs, emit=out.emit,
+                                  preload=not (out.fail_fast or out.max_issues))
+    finally:
+        with METRICS.phase("report"):
+            rc = out.close()  # the document is terminated even if a check raises
+    if cache is not None:
+        cache.save()
+        print(f"Cache: {cache.hits} hits, {cache.misses} misses", file=sys.stderr)
+    if mismatches:
+        for key in mismatches:
+            print(f"[cache] stale entry: {key}", file=sys.stderr)
+        print(f"Cache self-check FAILED: {len(mismatches)} file(s) differ", file=sys.stderr)
+        return 2
+    return rc
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="validate_content", description="Validate theory/demos/drills content.")
+    ap.add_argument("--no-cache", action="store_true", help=f"ignore and do not update {CACHE_PATH.relative_to(CONTENT_DIR.parent)}")
+    ap.add_argument("--verify-cache", action="store_true",
+                    help="re-check every file and fail (exit 2) if a cached result differs")
+    ap.add_argument("--root", default=str(CONTENT_DIR), help="content root (default: repo content/)")
+    ap.add_argument("--jobs", "-j", type=int, default=1, metavar="N",
+                    help="check modules in N worker processes (0 = all cores); output is identical to -j1")
+    ap.add_argument("--format", choices=reporter.FORMATS, default="text", help="issue output format (default: text)")
+    ap.add_argument("--output", "-o", metavar="FILE", help="write issues to FILE instead of stdout")
+    ap.add_argument("--fail-fast", action="store_true", help="stop at the first reported error")
+    ap.add_argument("--max-issues", type=int, default=0, metavar="N", help="stop after N reported issues")
+    ap.add_argument("--suppress", action="append", default=[], metavar="RULE",
+                    help="drop issues of a rule id or pattern, e.g. drills.requires-* (repeatable)")
+    ap.add_argument("--list-rules", action="store_true", help="print rule ids and exit")
+    ap.add_argument("--shard", type=shard.parse_spec, metavar="I/N", help="check only the modules of shard I of N (tools/shard.py)")
+    ap.add_argument("--json", metavar="FILE", help="also write the reported issues as a shard result (tools/shard.py merge)")
+    add_arguments(ap)
+    args = ap.parse_args(argv)
+    if args.list_rules:
+        for rid, text in RULES.items():
+            print(f"{rid:<40} {text}")
+        sys.exit(0)
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    root = Path(args.root)
+    corpus = Corpus(root, modules=shard.modules(root, FILENAMES.values(), args.shard) if args.shard else None)
+    result = tee = None
+    if args.json:
+        result = shard.ShardResult("validate_content", args.shard, [m.name for m in corpus.modules])
+        def tee(issue):
+            path, line = reporter.split_where(issue[1])
+            result.add(issue[0], issue[3], Path(path).parent.parent.name, path, line, issue[2])
+    fh = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    rc = 2  # what the shard result records if the run raises
+    try:
+        out = reporter.make(args.format, fh, "validate_content", TOOL_VERSION, RULES, suppress=args.suppress,
+                            max_issues=args.max_issues, fail_fast=args.fail_fast, tee=tee)
+        with session("validate_content", timings=args.timings, profile=args.profile):
+            rc = run(corpus, use_cache=not args.no_cache, verify_cache=args.verify_cache, jobs=jobs, out=out)
+    finally:
+        if fh is not sys.stdout:
+            fh.close()
+        if result is not None:
+            result.save(args.json, rc)  # a crashed shard must not look like a missing one to shard.py merge
+    sys.exit(rc)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
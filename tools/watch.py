@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+Watch mode for the content tools: keep the corpus parsed in memory and
+revalidate only files that change.
+
+  python3 tools/watch.py [--root content] [--interval 0.5] [--no-inotify]
+
+The daemon loads content/*/v1/{theory.md,demos.jsonl,drills.jsonl} once, runs
+the validate_content checks per file and prints the issues. It then waits for
+changes: inotify (Linux, via ctypes) when available, else polling mtime/size
+every --interval seconds. A changed file is re-read, re-parsed and re-checked
+alone; its new issues and the running totals are printed.
+
+It also serves a local Unix socket (build/watch.sock). Clients send one JSON
+line and get one JSON line back:
+
+  {"cmd": "status"}      totals and every issue
+  {"cmd": "file", "path": "content/<m>/v1/drills.jsonl"}
+  {"cmd": "allowlists"}  modules whose tooling/allowlists file would change
+                         (or whose drills need jsonl_guard) -- the
+                         allowlists_sync --write/--check gate
+  {"cmd": "subscribe"}   stream: one JSON line per revalidated file
+
+Before answering, the daemon re-stats every tracked file, so answers never
+lag behind a save that inotify has not reported yet.
+
+  python3 tools/watch.py --query [status|allowlists] [--json]
+
+is the client. Exit codes: 0 clean, 1 issues (ERR in status, any outdated
+allowlist), 3 no daemon running. The client imports nothing beyond the
+stdlib socket/json modules, so a query returns in a few tens of ms. The
+pre-commit hook does not rely on it: a clean answer says nothing about
+dispatcher blocks or what is staged, so the hook always runs
+allowlists_sync --staged.
+
+Stdlib only.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+TOOLS_DIR = Path(__file__).resolve().parent
+REPO_ROOT = TOOLS_DIR.parent
+SOCKET_PATH = REPO_ROOT / "build" / "watch.sock"
+NOT_RUNNING = 3
+
+
+# --- client (kept import-light: the pre-commit hook runs this) --------------
+
+def query(request: dict, path: Path = SOCKET_PATH, timeout: float = 5.0) -> Optional[dict]:
+    """Send one request to a running daemon; None if none is listening."""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.settimeout(timeout)
+            s.connect(str(path))
+            s.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            buf = b""
+            while not buf.endswith(b"\n"):
+                chunk = s.recv(65536)
+                if not chunk:
+                    break
+                buf += chunk
+    except OSError:
+        return None
+    return json.loads(buf) if buf else None
+
+
+def _client(argv: List[str]) -> int:
+    cmd = next((a for a in argv if not a.startswith("-")), "status")
+    as_json = "--json" in argv
+    reply = query({"cmd": cmd})
+    if reply is None:
+        print(f"watch: no daemon on {SOCKET_PATH}", file=sys.stderr)
+        return NOT_RUNNING
+    if as_json:
+        print(json.dumps(reply, indent=2))
+    elif cmd == "status":
+        for t, where, msg, *_ in reply.get("issues", []):
+            print(f"[{t}] {where} :: {msg}")
+        print(f"\nSummary: {reply['errors']} errors, {reply['warnings']} warnings")
+    elif cmd == "allowlists":
+        for line in reply.get("outdated", []):
+            print(line)
+    else:
+        print(json.dumps(reply))
+    return 0 if reply.get("ok") else 1
+
+
+# --- daemon ----------------------------------------------------------------
+
+class _Inotify:
+    """Minimal inotify via ctypes; raises OSError where unavailable."""
+
+    MASK = 0x00000008 | 0x00000080 | 0x00000100 | 0x00000200 | 0x00000040  # CLOSE_WRITE|MOVED_TO|CREATE|DELETE|MOVED_FROM
+
+    def __init__(self) -> None:
+        import ctypes
+        import ctypes.util
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is Linux-only")
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add = libc.inotify_add_watch
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.dirs: Dict[int, Path] = {}
+
+    def watch(self, path: Path) -> None:
+        wd = self._add(self.fd, str(path).encode(), self.MASK)
+        if wd >= 0:
+            self.dirs[wd] = path
+
+    def wait(self, timeout: float) -> List[Path]:
+        """Directories with events (may be empty on timeout)."""
+        import select
+        import struct
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return []
+        out, pos = [], 0
+        while pos + 16 <= len(data):
+            wd, _mask, _cookie, size = struct.unpack_from("iIII", data, pos)
+            pos += 16 + size
+            if wd in self.dirs and self.dirs[wd] not in out:
+                out.append(self.dirs[wd])
+        return out
+
+
+class Watcher:
+    def __init__(self, root: Path, allow_dir: Path):
+        import threading
+        import validate_content
+        from corpus import Corpus
+        self._vc = validate_content
+        self._Corpus = Corpus
+        self.root = root
+        self.allow_dir = allow_dir
+        self.lock = threading.RLock()
+        self.stat: Dict[str, tuple] = {}
+        self.files: Dict[str, object] = {}  # path -> ContentFile
+        self.issues: Dict[str, list] = {}
+        self.drills: Dict[str, object] = {}  # path -> records.DrillTable, built on first allowlists query
+        self.subscribers: List[socket.socket] = []
+        self.generation = 0
+
+    # -- state --
+
+    def _check(self, cf) -> list:
+        # a checker bug on one file is that file's ERR; the daemon keeps serving
+        scratch = self._vc.issues
+        start = len(scratch)
+        try:
+            found = self._vc.check_file(cf)
+        except Exception as e:
+            del scratch[start:]
+            return [["ERR", str(cf.path), f"checker crashed: {type(e).__name__}: {e}", "checker-crash"]]
+        return [list(i) for i in found]
+
+    def load(self) -> None:
+        with self.lock:
+            corpus = self._Corpus(self.root)
+            corpus.preload()
+            self.files.clear()
+            self.stat.clear()
+            self.drills.clear()
+            for mod in corpus.modules:
+                for cf in mod.files.values():
+                    key = str(cf.path)
+                    self.files[key] = cf
+                    self.stat[key] = _stat(key)
+                    self.issues[key] = self._check(cf)
+            for key in set(self.issues) - set(self.files):
+                del self.issues[key]
+            self.generation += 1
+
+    def rescan(self, dirs: Optional[List[Path]] = None) -> List[str]:
+        """Revalidate files whose (mtime, size) changed; return their paths."""
+        with self.lock:
+            if self._layout_changed():
+                before = dict(self.issues)
+                self.load()
+                keys = set(before) | set(self.issues)
+                return sorted(k for k in keys if before.get(k) != self.issues.get(k))
+            changed = []
+            for key, cf in self.files.items():
+                if dirs is not None and cf.path.parent not in dirs:
+                    continue
+                st = _stat(key)
+                if st != self.stat[key]:
+                    self.stat[key] = st
+                    cf.reload()
+                    self.drills.pop(key, None)
+                    self.issues[key] = self._check(cf)
+                    changed.append(key)
+            if changed:
+                self.generation += 1
+            return changed
+
+    def _layout_changed(self) -> bool:
+        # modules or files added/removed
+        from corpus import FILENAMES
+        present = set()
+        if self.root.is_dir():
+            for mod_dir in self.root.glob("*/v1"):
+                for fname in FILENAMES.values():
+                    p = mod_dir / fname
+                    if p.exists():
+                        present.add(str(p))
+        return present != set(self.files)
+
+    def totals(self) -> tuple:
+        errs = sum(1 for v in self.issues.values() for i in v if i[0] == "ERR")
+        warns = sum(1 for v in self.issues.values() for i in v if i[0] == "WARN")
+        return errs, warns
+
+    def status(self) -> dict:
+        errs, warns = self.totals()
+        issues = [i for key in self.files for i in self.issues.get(key, [])]
+        return {"ok": errs == 0, "errors": errs, "warnings": warns,
+                "generation": self.generation, "issues": issues}
+
+    def allowlists(self) -> dict:
+        """What allowlists_sync --write would change, from compact drill records in memory."""
+        from records import BAD_JSON, DrillTable
+        outdated = []
+        for key, cf in self.files.items():
+            if cf.kind != "drills":
+                continue
+            table = self.drills.get(key)
+            if table is None:
+                table = self.drills[key] = DrillTable([cf])
+            bad = table.bad(0)
+            if cf.has_bom or any(r.status == BAD_JSON for r in bad):
+                outdated.append(f"[guard] {key}")
+                continue
+            targets = table.targets(0)
+            if bad or (targets and targets[-1] is None):
+                outdated.append(f"[non-string-target] {key}")  # the full run reports these
+                continue
+            if not targets:
+                outdated.append(f"[no-targets] {key}")
+                continue
+            allow = self.allow_dir / f"target_tokens_allowlist_{cf.module}.txt"
+            want = "\n".join(targets) + "\n"
+            try:
+                have = allow.read_text(encoding="utf-8")
+            except OSError:
+                have = ""
+            if want != have or not want.isascii():
+                outdated.append(f"[outdated] {allow}")
+        return {"ok": not outdated, "outdated": outdated, "generation": self.generation}
+
+    # -- output --
+
+    def publish(self, changed: List[str]) -> None:
+        errs, warns = self.totals()
+        for key in changed:
+            found = self.issues.get(key)
+            if found is None:
+                print(f"[watch] {key}: removed")
+                continue
+            print(f"[watch] {key}: {sum(1 for i in found if i[0] == 'ERR')} errors, "
+                  f"{sum(1 for i in found if i[0] == 'WARN')} warnings")
+            for t, where, msg, *_ in found:
+                print(f"  [{t}] {where} :: {msg}")
+        print(f"[watch] total: {errs} errors, {warns} warnings", flush=True)
+        if not self.subscribers:
+            return
+        dead = []
+        for sub in self.subscribers:
+            for key in changed:
+                event = {"path": key, "issues": self.issues.get(key), "errors": errs,
+                         "warnings": warns, "generation": self.generation}
+                try:
+                    sub.sendall(json.dumps(event).encode("utf-8") + b"\n")
+                except OSError:
+                    dead.append(sub)
+                    break
+        for sub in dead:
+            self.subscribers.remove(sub)
+
+    def handle(self, request: dict, conn: socket.socket) -> Optional[dict]:
+        cmd = request.get("cmd", "status")
+        with self.lock:
+            changed = self.rescan()
+            if changed:
+                self.publish(changed)
+            if cmd == "status":
+                return self.status()
+            if cmd == "allowlists":
+                return self.allowlists()
+            if cmd == "file":
+                key = str(request.get("path", ""))
+                found = self.issues.get(key)
+                if found is None:
+                    return {"ok": False, "error": f"not tracked: {key}"}
+                return {"ok": not any(i[0] == "ERR" for i in found), "issues": found,
+                        "generation": self.generation}
+            if cmd == "subscribe":
+                self.subscribers.append(conn)
+                return None
+        return {"ok": False, "error": f"unknown cmd: {cmd}"}
+
+
+def _stat(path: str) -> tuple:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return (None, None)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _serve(watcher: Watcher, path: Path) -> None:
+    import socketserver
+    import threading
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            line = self.rfile.readline()
+            try:
+                request = json.loads(line) if line.strip() else {}
+            except ValueError:
+                request = {"cmd": "?"}
+            reply = watcher.handle(request, self.connection)
+            if reply is None:  # subscriber: keep the connection open
+                self.rfile.read()
+                return
+            self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+
+    class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        if query({"cmd": "status"}, path, timeout=1.0) is not None:
+            raise SystemExit(f"watch: a daemon is already serving {path}")
+        path.unlink()
+    server = Server(str(path), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+
+def _daemon(argv: List[str]) -> int:
+    import argparse
+    sys.path.insert(0, str(TOOLS_DIR))
+    from spec import CONTENT_DIR
+
+    ap = argparse.ArgumentParser(prog="watch", description="Revalidate content files as they change.")
+    ap.add_argument("--root", default=str(CONTENT_DIR), help="content root (default: repo content/)")
+    ap.add_argument("--allowlists", default=str(REPO_ROOT / "tooling" / "allowlists"),
+                    help="allowlist dir compared by the 'allowlists' query")
+    ap.add_argument("--interval", type=float, default=0.5, help="poll interval in seconds")
+    ap.add_argument("--no-inotify", action="store_true", help="always poll")
+    ap.add_argument("--socket", default=str(SOCKET_PATH), help="Unix socket path")
+    ap.add_argument("--once", action="store_true", help="load, print the summary and exit (no watching)")
+    args = ap.parse_args(argv)
+
+    watcher = Watcher(Path(args.root), Path(args.allowlists))
+    watcher.load()
+    watcher.publish([k for k in watcher.files if watcher.issues.get(k)])
+    if args.once:
+        return 1 if watcher.totals()[0] else 0
+
+    sock = Path(args.socket)
+    _serve(watcher, sock)
+    notify = None
+    if not args.no_inotify:
+        try:
+            notify = _Inotify()
+            notify.watch(watcher.root)
+            for mod_dir in watcher.root.glob("*"):
+                notify.watch(mod_dir)
+                if (mod_dir / "v1").is_dir():
+                    notify.watch(mod_dir / "v1")
+        except OSError:
+            notify = None
+    mode = "inotify" if notify is not None else f"polling every {args.interval:g}s"
+    print(f"[watch] {len(watcher.files)} files, {mode}, socket {sock}", flush=True)
+    import signal
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))  # run the finally below: remove the socket
+    try:
+        while True:
+            if notify is not None:
+                dirs = notify.wait(args.interval * 10)
+                if not dirs:
+                    continue
+                if any(d == watcher.root or d.parent == watcher.root for d in dirs):
+                    for mod_dir in watcher.root.glob("*"):  # new modules: watch them too
+                        notify.watch(mod_dir)
+                        if (mod_dir / "v1").is_dir():
+                            notify.watch(mod_dir / "v1")
+                    changed = watcher.rescan()
+                else:
+                    changed = watcher.rescan(dirs)
+            else:
+                import time
+                time.sleep(args.interval)
+                changed = watcher.rescan()
+            if changed:
+                with watcher.lock:
+                    watcher.publish(changed)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        try:
+            sock.unlink()
+        except OSError:
+            pass
+    return 0
+
+
+def main(argv: List[str]) -> int:
+    if "--query" in argv:
+        return _client([a for a in argv if a != "--query"])
+    return _daemon(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))